@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""校企合作分析图表的并行导出
+
+每张图表是一个只依赖传入数据的绘制函数，用面向对象的Agg接口（Figure + FigureCanvasAgg）
+构建，不经过pyplot的全局状态，因此可以在进程池中一个进程绘制一张图。
+绘制调用与原先的pyplot写法一一对应，相同格式和分辨率下输出逐像素一致。
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# 工作进程以spawn方式启动时不会继承主进程的设置，这里与分析脚本保持一致
+matplotlib.rcParams["font.family"] = ["SimHei"]
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+# 支持的输出格式
+FORMATS = ('png', 'svg', 'pdf')
+DEFAULT_DPI = 300
+# 快速预览使用的分辨率
+PREVIEW_DPI = 72
+
+
+def _new_figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _label_bars(ax, bars):
+    # 在柱状图上添加数值标签
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                f'{int(height)}', ha='center', va='bottom')
+
+
+def draw_monthly_trend(monthly):
+    """月度趋势图，monthly为含date和count列的DataFrame"""
+    fig = _new_figure((14, 6))
+    ax = fig.add_subplot()
+    ax.plot(monthly['date'], monthly['count'], marker='o', linestyle='-', color='#1f77b4')
+    ax.set_title('西南财经大学与金融机构合作月度趋势（2020-2025）', fontsize=16)
+    ax.set_xlabel('日期', fontsize=12)
+    ax.set_ylabel('合作数量', fontsize=12)
+    ax.grid(True, alpha=0.3)
+
+    # 设置x轴刻度为每个数据点对应的月份
+    ax.set_xticks(monthly['date'])
+    ax.set_xticklabels([date.strftime('%Y-%m') for date in monthly['date']],
+                       rotation=45, ha='right', fontsize=8)
+    fig.tight_layout()
+    return fig
+
+
+def draw_yearly_trend(yearly):
+    """年度趋势图，yearly为含year和count列的DataFrame"""
+    fig = _new_figure((10, 6))
+    ax = fig.add_subplot()
+    bars = ax.bar(yearly['year'].astype(str), yearly['count'], color='#2ca02c', alpha=0.8)
+    ax.set_title('西南财经大学与金融机构合作年度趋势（2020-2025）', fontsize=16)
+    ax.set_xlabel('年份', fontsize=12)
+    ax.set_ylabel('合作数量', fontsize=12)
+    _label_bars(ax, bars)
+    fig.tight_layout()
+    return fig
+
+
+def draw_model_distribution(model_counts):
+    """合作模式饼图，model_counts为各合作模式数量"""
+    fig = _new_figure((10, 8))
+    ax = fig.add_subplot()
+    ax.pie(model_counts.values, labels=model_counts.index, autopct='%1.1f%%',
+           startangle=90, shadow=True)
+    ax.set_title('西南财经大学与金融机构合作模式分布', fontsize=16)
+    ax.axis('equal')
+    fig.tight_layout()
+    return fig
+
+
+def draw_institution_distribution(inst_counts):
+    """机构类型柱状图，inst_counts为各机构类型数量"""
+    fig = _new_figure((12, 6))
+    ax = fig.add_subplot()
+    bars = ax.bar(inst_counts.index, inst_counts.values, color='#9467bd', alpha=0.8)
+    ax.set_title('合作金融机构类型分布', fontsize=16)
+    ax.set_xlabel('机构类型', fontsize=12)
+    ax.set_ylabel('合作数量', fontsize=12)
+    _label_bars(ax, bars)
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
+    fig.tight_layout()
+    return fig
+
+
+def draw_radar_chart(evaluation):
+    """评估指标雷达图，evaluation为成果落地评估结果"""
+    metrics = ['模式多样性', '机构多样性', '合作持续性']
+    scores = [
+        evaluation['model_diversity'] / max(2, evaluation['model_diversity']),
+        evaluation['institution_diversity'] / max(2, evaluation['institution_diversity']),
+        evaluation['continuity_score']
+    ]
+
+    # 确保所有得分在0-1之间
+    scores = [min(1, max(0, score)) for score in scores]
+
+    # 雷达图数据准备
+    angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False).tolist()
+    scores = scores + scores[:1]
+    angles = angles + angles[:1]
+    metrics = metrics + metrics[:1]
+
+    fig = _new_figure((10, 8))
+    ax = fig.add_subplot(111, polar=True)
+    ax.plot(angles, scores, 'o-', linewidth=2, color='#e377c2')
+    ax.fill(angles, scores, alpha=0.25, color='#e377c2')
+    ax.set_thetagrids(np.degrees(angles[:-1]), metrics[:-1])
+    ax.set_ylim(0, 1)
+    ax.set_title('校企合作成果落地评估雷达图', fontsize=16, pad=20)
+    fig.tight_layout()
+    return fig
+
+
+# 图表名称（同时是输出文件名）到绘制函数的映射
+CHARTS = {
+    'monthly_trend': draw_monthly_trend,
+    'yearly_trend': draw_yearly_trend,
+    'cooperation_model_distribution': draw_model_distribution,
+    'institution_type_distribution': draw_institution_distribution,
+    'implementation_radar_chart': draw_radar_chart,
+}
+
+
+def render_chart(name, data, output_path, fmt='png', dpi=DEFAULT_DPI):
+    """
+    绘制并保存一张图表（可作为进程池任务）
+
+    返回:
+    tuple - (图表名称, 输出路径, 耗时秒数)
+    """
+    start = time.perf_counter()
+    fig = CHARTS[name](data)
+    fig.savefig(output_path, dpi=dpi, format=fmt)
+    return name, output_path, time.perf_counter() - start
+
+
+def export_charts(charts, output_dir='results', fmt='png', dpi=DEFAULT_DPI, workers=None):
+    """
+    导出一组图表
+
+    参数:
+    charts: dict - {图表名称: 绘制数据}
+    output_dir: str - 输出目录
+    fmt: str - 输出格式（png/svg/pdf）
+    dpi: int - 分辨率
+    workers: int - 进程数，默认每张图表一个进程；为1时在当前进程中依次绘制
+
+    返回:
+    dict - {图表名称: {'path': 输出路径, 'seconds': 耗时}}
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的图表格式：{fmt}，可选：{', '.join(FORMATS)}")
+    unknown = set(charts) - set(CHARTS)
+    if unknown:
+        raise KeyError(f"未知的图表：{', '.join(sorted(unknown))}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(name, data, os.path.join(output_dir, f'{name}.{fmt}'), fmt, dpi) for name, data in charts.items()]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        results = [render_chart(*task) for task in tasks]
+    else:
+        # 调用方可能在线程池中调用（如pipeline_runner的图表步骤），在多线程进程中fork子进程
+        # 可能继承其他线程持有的锁而死锁，因此总是用spawn方式启动子进程
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = list(executor.map(render_chart, *zip(*tasks)))
+    return {name: {'path': path, 'seconds': seconds} for name, path, seconds in results}
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""national_data工作簿的解析结果缓存
+
+每个.xls只用xlrd解析一次：解析后的数据（时间列已转换为datetime64）按数据类型
+分组写成列优先(Fortran order)的.npy文件，之后的调用直接以内存映射方式加载。
+源文件的修改时间或内容哈希发生变化时，旧缓存被丢弃并重新解析。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# 以本文件位置为基准定位数据目录，避免依赖当前工作目录
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(MODULE_DIR, '..', '..'))
+NATIONAL_DATA_DIR = os.path.join(REPO_ROOT, 'data', 'national_data')
+
+# 缓存格式版本号，格式变化时递增即可让所有旧缓存失效
+CACHE_VERSION = 1
+CACHE_DIR_NAME = '.cache'
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_signature(path, with_hash=True):
+    """
+    计算源文件签名
+
+    参数:
+    path: str - 源文件路径
+    with_hash: bool - 是否计算内容哈希（sha1）
+
+    返回:
+    dict - 包含修改时间(mtime_ns)、文件大小(size)和可选的sha1
+    """
+    stat = os.stat(path)
+    signature = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        signature['sha1'] = sha1.hexdigest()
+    return signature
+
+
+def cache_dir_for(path):
+    """返回源文件对应的缓存目录：<源文件目录>/.cache/<文件名>/"""
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME, os.path.basename(path))
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache_dir, manifest):
+    # 先写临时文件再替换，保证并发读取时不会看到写了一半的清单
+    tmp_path = os.path.join(cache_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST_NAME))
+
+
+def _is_valid(path, manifest, date_column, date_format):
+    """
+    检查缓存是否仍然有效
+
+    修改时间和大小都没变时直接命中；否则再比较内容哈希，
+    内容没变（例如只是被touch过）时刷新清单中的修改时间，避免重新解析。
+    """
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return False
+    if manifest.get('date_column') != date_column or manifest.get('date_format') != date_format:
+        return False
+
+    cached = manifest['source']
+    current = file_signature(path, with_hash=False)
+    if current['mtime_ns'] == cached['mtime_ns'] and current['size'] == cached['size']:
+        return True
+
+    current = file_signature(path)
+    if current['sha1'] != cached.get('sha1'):
+        return False
+    manifest['source'] = current
+    _write_manifest(cache_dir_for(path), manifest)
+    return True
+
+
+def _parse_source(path, date_column, date_format, reader):
+    """用xlrd解析工作簿，并把时间列转换为datetime64"""
+    df = reader(path)
+    if date_column is not None and date_column in df.columns:
+        df[date_column] = pd.to_datetime(df[date_column], format=date_format, errors='coerce')
+    return df
+
+
+def build_cache(path, date_column='时间', date_format='%Y年%m月', reader=pd.read_excel):
+    """
+    解析源文件并（重新）写入缓存
+
+    相同数据类型的列合并为一个二维数组，按列优先顺序保存，
+    这样加载时每一列都是内存映射文件上连续的一段。
+
+    返回:
+    DataFrame - 刚解析出的数据
+    """
+    df = _parse_source(path, date_column, date_format, reader)
+    cache_dir = cache_dir_for(path)
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir)
+
+    blocks = {}
+    columns = []
+    for name in df.columns:
+        values = df[name].to_numpy()
+        kind = 'native'
+        if values.dtype == object:
+            # 文本列以定长unicode保存，缺失值记为空字符串
+            values = np.asarray(df[name].fillna('').astype(str).to_numpy(), dtype=str)
+            kind = 'str'
+        key = values.dtype.str
+        if key not in blocks:
+            blocks[key] = []
+        columns.append({'name': str(name), 'block': key, 'index': len(blocks[key]), 'kind': kind})
+        blocks[key].append(values)
+
+    block_files = {}
+    for i, (key, arrays) in enumerate(blocks.items()):
+        file_name = f'block_{i}.npy'
+        np.save(os.path.join(cache_dir, file_name), np.column_stack(arrays).copy(order='F'))
+        block_files[key] = file_name
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'source': file_signature(path),
+        'date_column': date_column,
+        'date_format': date_format,
+        'n_rows': len(df),
+        'blocks': block_files,
+        'columns': columns,
+    }
+    # 清单最后写入，存在清单即表示缓存完整
+    _write_manifest(cache_dir, manifest)
+    return df
+
+
+def _load_from_cache(cache_dir, manifest, mmap):
+    mmap_mode = 'c' if mmap else None
+    blocks = {key: np.load(os.path.join(cache_dir, file_name), mmap_mode=mmap_mode)
+              for key, file_name in manifest['blocks'].items()}
+
+    data = {}
+    for column in manifest['columns']:
+        values = blocks[column['block']][:, column['index']]
+        if column['kind'] == 'str':
+            values = np.asarray(values, dtype=object)
+        data[column['name']] = values
+    # copy=False时pandas不合并数据块，每一列直接引用内存映射数组（copy-on-write，修改不会写回文件）
+    return pd.DataFrame(data, copy=False)
+
+
+def load_excel_cached(path, date_column='时间', date_format='%Y年%m月', use_cache=True, mmap=True,
+                      reader=pd.read_excel):
+    """
+    带缓存地读取national_data工作簿
+
+    参数:
+    path: str - .xls文件路径
+    date_column: str - 需要解析为日期的列名，None表示不解析
+    date_format: str - 日期格式，默认为'%Y年%m月'
+    use_cache: bool - False时直接解析源文件，不读写缓存
+    mmap: bool - 是否以内存映射方式加载缓存
+    reader: callable - 解析源文件的函数，默认为pd.read_excel
+
+    返回:
+    DataFrame - 时间列已解析为datetime64，行顺序与源文件一致
+    """
+    if not use_cache:
+        return _parse_source(path, date_column, date_format, reader)
+
+    cache_dir = cache_dir_for(path)
+    manifest = _read_manifest(cache_dir)
+    if _is_valid(path, manifest, date_column, date_format):
+        try:
+            return _load_from_cache(cache_dir, manifest, mmap)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"缓存读取失败，重新解析源文件：{e}")
+
+    try:
+        build_cache(path, date_column, date_format, reader)
+    except OSError as e:
+        # 数据目录只读等情况下退化为直接解析
+        print(f"缓存写入失败，直接使用解析结果：{e}")
+        return _parse_source(path, date_column, date_format, reader)
+    return _load_from_cache(cache_dir, _read_manifest(cache_dir), mmap)
+
+
+def cached_signature(path):
+    """返回缓存清单中记录的源文件签名，没有缓存时返回None"""
+    manifest = _read_manifest(cache_dir_for(path))
+    return None if manifest is None else manifest['source']
+
+
+def invalidate_cache(path):
+    """删除源文件对应的缓存，返回是否删除了缓存"""
+    cache_dir = cache_dir_for(path)
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+        return True
+    return False
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""累计指标的派生序列
+
+national_data中的工作簿大多发布年初至今的累计值（如'国家财政收入累计值(亿元)'）。
+本模块为每个累计值列统一计算：
+- 当月值：同一年内相邻两期累计值之差（每年第一期即为当年累计值，覆盖1-2月合并发布的情况）
+- 当月同比(%)、当月环比(%)：基于当月值
+- 滚动12个月合计：当期累计值 + 上年全年累计值 - 上年同期累计值
+
+计算在按月份编号展开的稠密数组上进行，分组差分全部向量化；
+结果保存在原始数据的解析缓存目录中，源文件不变时直接加载，源文件变化时随解析缓存一起失效。
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_cache import cache_dir_for, cached_signature
+from national_data_catalog import DATE_COLUMN, get_catalog
+
+# 派生算法版本号，算法变化时递增即可让已保存的结果失效
+DERIVED_VERSION = 1
+DERIVED_VALUES = 'derived_values.npy'
+DERIVED_META = 'derived_meta.json'
+
+DERIVED_SUFFIXES = ('当月值', '当月同比(%)', '当月环比(%)', '滚动12个月合计')
+
+
+def derived_column_names(meta):
+    """累计值列对应的派生列名"""
+    unit = f'({meta.unit})' if meta.unit else ''
+    return [
+        f'{meta.indicator}当月值{unit}',
+        f'{meta.indicator}当月同比(%)',
+        f'{meta.indicator}当月环比(%)',
+        f'{meta.indicator}滚动12个月合计{unit}',
+    ]
+
+
+def _shift(values, periods):
+    """在稠密月份数组上向后平移，空出的位置为NaN"""
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def derive_cumulative(keys, cumulative):
+    """
+    由累计值计算派生序列
+
+    参数:
+    keys: ndarray - 升序的整数月份编号（年*12+月-1）
+    cumulative: ndarray - 形状为(期数, 列数)的累计值
+
+    返回:
+    ndarray - 形状为(期数, 列数*4)，每个累计值列依次对应当月值、当月同比、当月环比、滚动12个月合计
+    """
+    n_rows, n_cols = cumulative.shape
+    if n_rows == 0:
+        return np.empty((0, n_cols * 4))
+
+    # 展开到连续的月份网格上，缺失月份为NaN
+    k0 = keys[0]
+    position = keys - k0
+    size = position[-1] + 1
+    grid = np.full((size, n_cols), np.nan)
+    grid[position] = cumulative
+    month0 = (k0 + np.arange(size)) % 12  # 0表示1月
+    year_start = np.arange(size) - month0  # 当年1月在网格中的位置（可能为负）
+
+    # 同一年内此前是否已有观测：在每年的起点处重置的累计计数
+    observed = ~np.isnan(grid)
+    counts = np.vstack([np.zeros((1, n_cols)), np.cumsum(observed, axis=0)])
+    seen_before = counts[np.arange(size)] - counts[np.maximum(year_start, 0)]
+    first_in_year = observed & (seen_before == 0)
+
+    # 当月值：上月在同一年内有数据时取差分，当年第一期直接取累计值，其他情况（年内断档）为NaN
+    previous = _shift(grid, 1)
+    previous[month0 == 0] = np.nan
+    flow = np.where(first_in_year, grid, grid - previous)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy = (flow / _shift(flow, 12) - 1) * 100
+        mom = (flow / _shift(flow, 1) - 1) * 100
+
+    # 滚动12个月合计 = 当期累计 + 上年12月累计 - 上年同期累计
+    december = np.arange(size) - month0 - 1
+    last_december = np.full_like(grid, np.nan)
+    valid = december >= 0
+    last_december[valid] = grid[december[valid]]
+    rolling = grid + last_december - _shift(grid, 12)
+    rolling[month0 == 11] = grid[month0 == 11]
+
+    stacked = np.stack([flow, yoy, mom, rolling], axis=2).reshape(size, n_cols * 4)
+    return stacked[position]
+
+
+def compute_derived(series):
+    """
+    为一个指标的全部累计值列计算派生序列
+
+    参数:
+    series: IndicatorSeries - 目录中的指标
+
+    返回:
+    DataFrame - 时间列加上每个累计值列的四个派生列
+    """
+    df = series.frame
+    metas = [meta for meta in series.columns if meta.measure == '累计值']
+    dates = pd.DatetimeIndex(df[DATE_COLUMN])
+    keys = dates.year.to_numpy(dtype=np.int64) * 12 + dates.month.to_numpy(dtype=np.int64) - 1
+    # 同一月份重复时保留最后一条
+    keep = np.ones(len(keys), dtype=bool)
+    keep[:-1] = keys[1:] != keys[:-1]
+    cumulative = df[[meta.column for meta in metas]].to_numpy(dtype=np.float64)[keep]
+
+    values = derive_cumulative(keys[keep], cumulative)
+    columns = [name for meta in metas for name in derived_column_names(meta)]
+    derived = pd.DataFrame(values, columns=columns)
+    derived.insert(0, DATE_COLUMN, df[DATE_COLUMN].to_numpy()[keep])
+    return derived
+
+
+def _store_paths(series):
+    cache_dir = cache_dir_for(series.path)
+    return cache_dir, os.path.join(cache_dir, DERIVED_VALUES), os.path.join(cache_dir, DERIVED_META)
+
+
+def load_derived(name, catalog=None, use_cache=True):
+    """
+    读取（必要时计算并保存）指标的派生序列
+
+    参数:
+    name: str - 指标名称，如'国家财政预算收入'
+    catalog: NationalDataCatalog - 默认使用共享目录
+    use_cache: bool - False时总是重新计算，不读写保存的结果
+
+    返回:
+    DataFrame - 时间列加派生列；没有累计值列的指标只返回时间列
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    series = catalog[name]
+    # 先加载原始数据：这一步会校验并在需要时重建解析缓存
+    series.load()
+    if not use_cache:
+        return compute_derived(series)
+
+    cache_dir, values_path, meta_path = _store_paths(series)
+    signature = cached_signature(series.path)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if (signature is not None and meta['version'] == DERIVED_VERSION
+                and meta['source_sha1'] == signature.get('sha1')):
+            values = np.load(values_path, mmap_mode='c')
+            derived = pd.DataFrame({column: values[:, i] for i, column in enumerate(meta['columns'])}, copy=False)
+            derived.insert(0, DATE_COLUMN, pd.to_datetime(meta['months'], format='%Y-%m'))
+            return derived
+    except (OSError, ValueError, KeyError):
+        pass
+
+    derived = compute_derived(series)
+    if signature is not None and os.path.isdir(cache_dir):
+        try:
+            value_columns = [c for c in derived.columns if c != DATE_COLUMN]
+            np.save(values_path, derived[value_columns].to_numpy(dtype=np.float64).copy(order='F'))
+            meta = {
+                'version': DERIVED_VERSION,
+                'source_sha1': signature.get('sha1'),
+                'columns': value_columns,
+                'months': derived[DATE_COLUMN].dt.strftime('%Y-%m').tolist(),
+            }
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"派生序列保存失败：{e}")
+    return derived
+
+
+def materialize_all(catalog=None):
+    """为目录中所有含累计值列的指标计算并保存派生序列，返回{指标名称: 派生列数}"""
+    if catalog is None:
+        catalog = get_catalog()
+    summary = {}
+    for series in catalog:
+        if series.column_names('累计值'):
+            summary[series.name] = load_derived(series.name, catalog).shape[1] - 1
+    return summary
+
+
+def reference_derived(series):
+    """
+    逐列按年份分组差分的pandas参考实现，用于核对compute_derived
+
+    返回:
+    DataFrame - 与compute_derived的结果行列一致
+    """
+    df = series.frame
+    months = df[DATE_COLUMN].dt.to_period('M')
+    keep = ~months.duplicated(keep='last').to_numpy()
+    result = pd.DataFrame({DATE_COLUMN: df[DATE_COLUMN].to_numpy()[keep]})
+    for meta in series.columns:
+        if meta.measure != '累计值':
+            continue
+        observed = pd.Series(df[meta.column].to_numpy(dtype=np.float64)[keep], index=months[keep])
+        dense = observed.reindex(pd.period_range(observed.index.min(), observed.index.max(), freq='M'))
+        year = dense.index.year
+        # 当年第一期取累计值，其余为与上月之差（上月缺失时为NaN）
+        first = dense.notna() & (dense.notna().groupby(year).cumsum() == 1)
+        flow = dense.groupby(year).diff().where(~first, dense)
+        december = dense[dense.index.month == 12]
+        last_december = pd.Series(december.to_numpy(), index=december.index.year + 1).reindex(year).to_numpy()
+        rolling = (dense + last_december - dense.shift(12)).where(dense.index.month != 12, dense)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns = [flow, (flow / flow.shift(12) - 1) * 100, (flow / flow.shift(1) - 1) * 100, rolling]
+        for name, values in zip(derived_column_names(meta), columns):
+            result[name] = values.reindex(observed.index).to_numpy()
+    return result
+
+
+def check_against_reference(catalog=None):
+    """
+    对目录中每个含累计值列的指标，比较compute_derived、load_derived（保存的结果）与参考实现
+
+    返回:
+    dict - {指标名称: 是否一致}
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    report = {}
+    for series in catalog:
+        if not series.column_names('累计值'):
+            continue
+        expected = reference_derived(series)
+        report[series.name] = all(
+            actual.columns.equals(expected.columns)
+            and actual[DATE_COLUMN].equals(expected[DATE_COLUMN])
+            and np.allclose(actual.iloc[:, 1:].to_numpy(dtype=np.float64),
+                            expected.iloc[:, 1:].to_numpy(dtype=np.float64), equal_nan=True)
+            for actual in (compute_derived(series), load_derived(series.name, catalog)))
+    return report
+
+
+if __name__ == "__main__":
+    report = check_against_reference()
+    for name, ok in report.items():
+        print(f"{name}: 派生序列与按年分组差分的参考实现{'一致' if ok else '不一致'}")
@@ -1,3 +1,21 @@
+from instrumentation import instrumented
+
+FISCAL_REVENUE_NAME = '国家财政预算收入'
+
+
+@instrumented('helper.load_fiscal_revenue', rows='result')
+def _load_fiscal_revenue():
+    """
+    从national_data目录读取国家财政预算收入数据
+
+    数据在进程内只加载一次并共享（见national_data_catalog.py），
+    底层解析结果带缓存，源文件变化时自动失效（见data_cache.py）；
+    返回浅拷贝，调用方新增列不会影响共享数据
+    """
+    from national_data_catalog import get_catalog
+    return get_catalog()[FISCAL_REVENUE_NAME].frame.copy(deep=False)
+
+
 def visualize_monthly_revenue(month):
     """ 
     读取国家财政预算收入数据并可视化每年特定月份的数据
@@ -13,15 +31,13 @@ def visualize_monthly_revenue(month):
     5. 绘制指定月份的国家财政收入累计值趋势图
     """
     import matplotlib.pyplot as plt 
-    import pandas as pd 
     # 设置中文字体以正常显示中文标签和负号
     plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签 
     plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
-    # 读取数据 
-    df = pd.read_excel('../data/national_data/国家财政预算收入.xls') 
+    # 读取数据（时间列已在缓存中转换为日期类型）
+    df = _load_fiscal_revenue()
     
-    # 将时间列转换为日期类型并提取月份和年份 
-    df['时间'] = pd.to_datetime(df['时间'], format='%Y年%m月') 
+    # 提取月份和年份 
     df['月份'] = df['时间'].dt.month 
     df['年份'] = df['时间'].dt.year 
     
@@ -53,17 +69,12 @@ def visualize_fiscal_revenue():
     4. 绘制国家财政收入累计值趋势图
     """
     import matplotlib.pyplot as plt 
-    import pandas as pd 
     # 设置中文字体以正常显示中文标签和负号
     plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签 
     plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
 
-    # 读取数据 
-    df = pd.read_excel('../data/national_data/国家财政预算收入.xls') 
-    
-    # 将中文日期格式转换为标准日期格式 
-    # 推荐使用这个方法，处理'年'和'月'的中文格式
-    df['时间'] = pd.to_datetime(df['时间'], format='%Y年%m月') 
+    # 读取数据（缓存中的时间列已按'%Y年%m月'格式转换为标准日期格式）
+    df = _load_fiscal_revenue()
     
     # 按时间排序数据
     df = df.sort_values('时间') 
@@ -88,7 +99,6 @@ def visualize_fiscal_growth():
     2. 将时间列转换为日期类型并排序
     3. 绘制国家财政收入累计增长趋势图
     """
-    import pandas as pd 
     import matplotlib.pyplot as plt 
     import matplotlib as mpl 
     
@@ -97,10 +107,9 @@ def visualize_fiscal_growth():
     mpl.rcParams['axes.unicode_minus'] = False 
     
     # 读取数据 
-    df = pd.read_excel('../data/national_data/国家财政预算收入.xls') 
+    df = _load_fiscal_revenue()
     
-    # 将时间列转换为日期类型并排序 
-    df['时间'] = pd.to_datetime(df['时间'], format='%Y年%m月') 
+    # 按时间排序（时间列已在缓存中转换为日期类型）
     df = df.sort_values('时间') 
     
     # 创建可视化 
@@ -114,7 +123,119 @@ def visualize_fiscal_growth():
     plt.tight_layout() 
     plt.show()
 
+@instrumented('helper.load_fiscal_data', rows='result')
 def load_fiscal_data():
-    import pandas as pd
-    df = pd.read_excel('../data/national_data/国家财政预算收入.xls')
+    """
+    读取国家财政预算收入数据
+
+    返回:
+    DataFrame - 时间列已转换为日期类型
+    """
+    df = _load_fiscal_revenue()
     return df
+
+@instrumented('helper.build_monthly_revenue_pivot', rows='result')
+def build_monthly_revenue_pivot():
+    """
+    构建国家财政收入累计值的年份×月份透视表
+
+    返回:
+    DataFrame - 行为年份，列为月份（1-12），缺失月份为NaN
+    """
+    df = _load_fiscal_revenue()
+    return df.pivot_table(index=df['时间'].dt.year.rename('年份'),
+                          columns=df['时间'].dt.month.rename('月份'),
+                          values='国家财政收入累计值(亿元)')
+
+def _render_monthly_revenue_chart(month, years, values, output_path=None, dpi=100):
+    """
+    使用非交互的Agg画布绘制单个月份的图表（供进程池调用，必须定义在模块顶层）
+
+    返回:
+    tuple - (月份, PNG字节或输出路径, 耗时秒数)
+    """
+    import io
+    import time
+    import matplotlib as mpl 
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    start = time.perf_counter()
+    # 设置中文字体以正常显示中文标签和负号
+    mpl.rcParams['font.sans-serif'] = ['SimHei'] 
+    mpl.rcParams['axes.unicode_minus'] = False 
+
+    # 与visualize_monthly_revenue相同的图表样式，但不经过pyplot，不会弹出窗口
+    fig = Figure(figsize=(12, 6)) 
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(years, values, marker='o', linestyle='-', linewidth=2) 
+    ax.set_title(f'每年{month}月份国家财政收入累计值') 
+    ax.set_xlabel('年份') 
+    ax.set_ylabel('国家财政收入累计值(亿元)') 
+    ax.set_xticks(years)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(True, linestyle='--', alpha=0.7) 
+    fig.tight_layout() 
+
+    if output_path is None:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        result = buffer.getvalue()
+    else:
+        fig.savefig(output_path, dpi=dpi)
+        result = output_path
+    return month, result, time.perf_counter() - start
+
+@instrumented('helper.render_monthly_revenue_batch', rows='result')
+def render_monthly_revenue_batch(months=None, output_dir=None, dpi=100, workers=None):
+    """ 
+    批量、无界面地绘制多个月份的国家财政收入累计值图表
+    
+    参数:
+    months: list - 要绘制的月份（1-12），默认为全部12个月
+    output_dir: str - 图片保存目录；为None时返回PNG字节而不写文件
+    dpi: int - 输出分辨率
+    workers: int - 进程池大小；为None或1时在当前进程依次绘制
+    
+    函数功能：
+    1. 只读取一次数据并构建年份×月份透视表
+    2. 用Agg画布绘制每个月份的趋势图（不调用plt.show()）
+    3. 可选地分发到进程池并行绘制
+    4. 记录每张图表的绘制耗时
+    
+    返回:
+    dict - output_dir为None时为{月份: {'image': PNG字节, 'seconds': 耗时}}，
+           否则为{月份: {'path': 文件路径, 'seconds': 耗时}}
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    if months is None:
+        months = list(range(1, 13))
+    # 没有数据的月份对应全为NaN的列，绘制为空图
+    pivot = build_monthly_revenue_pivot().reindex(columns=months)
+
+    # 每个任务只携带该月份的年份和数值，避免向子进程传递整张表
+    jobs = []
+    for month in months:
+        column = pivot[month].dropna()
+        output_path = None
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, f'monthly_revenue_{month:02d}.png')
+        jobs.append((month, column.index.to_numpy(), column.to_numpy(), output_path, dpi))
+
+    if workers is None or workers <= 1:
+        outputs = [_render_monthly_revenue_chart(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render_monthly_revenue_chart, *job) for job in jobs]
+            outputs = [future.result() for future in futures]
+
+    results = {}
+    for month, result, seconds in outputs:
+        key = 'image' if output_dir is None else 'path'
+        results[month] = {key: result, 'seconds': seconds}
+        print(f"{month}月图表绘制完成，耗时{seconds * 1000:.1f}毫秒")
+    return results
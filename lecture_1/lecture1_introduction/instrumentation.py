@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""分析脚本的性能埋点
+
+stage上下文管理器和instrumented装饰器为每个命名阶段记录墙钟时间、CPU时间、
+内存（阶段开始/结束时的RSS和阶段内的峰值RSS）以及处理的行数，阶段可以嵌套。
+记录可以写成JSON，或写成Chrome trace格式（在chrome://tracing或ui.perfetto.dev中打开）；
+还可以为指定阶段生成cProfile统计或采样调用栈（折叠栈格式，可直接生成火焰图）。
+
+只有调用过configure（命令行参数或环境变量也会调用）之后才测量和保留记录；
+未开启时stage只产生一个不保存的空记录，不启动采样线程，适合长期运行的进程（如Streamlit看板）。
+
+除了在代码中调用configure，也可以用环境变量开启：
+PERF_REPORT - 进程退出时写出记录的路径，以.trace.json结尾时写Chrome trace格式
+PERF_PROFILE - 需要剖析的阶段名称
+PERF_PROFILE_MODE - cprofile（默认）或sample
+PERF_PROFILE_OUT - 剖析结果路径，默认为<阶段名>.prof或<阶段名>.stacks.txt
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+# 阶段进行期间RSS的采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.005
+# 采样剖析的调用栈采样间隔（秒）
+STACK_SAMPLE_INTERVAL = 0.001
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:
+    psutil = None
+
+
+def current_rss():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    if psutil is not None:
+        return _process.memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _to_mb(value):
+    return None if value is None else round(value / MB, 2)
+
+
+class StageRecord:
+    """一个阶段的测量结果，阶段内可以设置rows记录处理的行数"""
+
+    __slots__ = ('name', 'parent', 'depth', 'thread', 'start', 'wall', 'cpu',
+                 'rss_start', 'rss_end', 'rss_peak', 'rows')
+
+    def __init__(self, name, parent, depth, rows=None):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.thread = threading.get_ident()
+        self.start = None
+        self.wall = None
+        self.cpu = None
+        self.rss_start = None
+        self.rss_end = None
+        self.rss_peak = None
+        self.rows = rows
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'thread': self.thread,
+            'start': round(self.start, 6),
+            'wall_seconds': round(self.wall, 6),
+            'cpu_seconds': round(self.cpu, 6),
+            'rss_start_mb': _to_mb(self.rss_start),
+            'rss_end_mb': _to_mb(self.rss_end),
+            'peak_rss_mb': _to_mb(self.rss_peak),
+            'rows': self.rows,
+        }
+
+
+class _RssSampler(threading.Thread):
+    """有阶段正在进行时周期性读取RSS，更新这些阶段的峰值"""
+
+    def __init__(self, recorder):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.recorder = recorder
+
+    def run(self):
+        while True:
+            with self.recorder._lock:
+                active = list(self.recorder._active)
+                if not active:
+                    self.recorder._sampler = None
+                    return
+            rss = current_rss()
+            if rss is not None:
+                for record in active:
+                    if record.rss_peak is None or rss > record.rss_peak:
+                        record.rss_peak = rss
+            time.sleep(RSS_SAMPLE_INTERVAL)
+
+
+class _StackSampler(threading.Thread):
+    """定时采样目标线程的调用栈，累计为折叠栈计数"""
+
+    def __init__(self, thread_id):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(STACK_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Recorder:
+    """收集全部阶段记录，进程内共享一个实例（RECORDER）"""
+
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self.origin = time.perf_counter()
+        self.profile_stage = None
+        self.profile_mode = 'cprofile'
+        self.profile_out = None
+        self._lock = threading.Lock()
+        self._active = []
+        self._sampler = None
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start_sampler(self):
+        if self._sampler is None:
+            self._sampler = _RssSampler(self)
+            self._sampler.start()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            # 未开启时不测量，记录对象只用于接收rows赋值，随即丢弃
+            yield StageRecord(name, None, 0, rows)
+            return
+        stack = self._stack()
+        record = StageRecord(name, stack[-1].name if stack else None, len(stack), rows)
+        record.rss_start = current_rss()
+        record.rss_peak = record.rss_start
+        with self._lock:
+            self._active.append(record)
+            self._start_sampler()
+        stack.append(record)
+
+        profiler = sampler = None
+        if name == self.profile_stage:
+            if self.profile_mode == 'sample':
+                sampler = _StackSampler(threading.get_ident())
+                sampler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+        record.start = time.perf_counter() - self.origin
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - wall_start
+            record.cpu = time.process_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                path = self.profile_out or f'{name}.prof'
+                profiler.dump_stats(path)
+                print(f"阶段{name}的cProfile统计已写入{path}")
+            if sampler is not None:
+                sampler.stop()
+                path = self.profile_out or f'{name}.stacks.txt'
+                sampler.dump(path)
+                print(f"阶段{name}的采样调用栈已写入{path}")
+            record.rss_end = current_rss()
+            if record.rss_end is not None and (record.rss_peak is None or record.rss_end > record.rss_peak):
+                record.rss_peak = record.rss_end
+            stack.pop()
+            with self._lock:
+                self._active.remove(record)
+                self.records.append(record)
+
+    def to_json(self):
+        return {'pid': os.getpid(), 'stages': [record.as_dict() for record in self.records]}
+
+    def to_chrome_trace(self):
+        events = []
+        for record in self.records:
+            events.append({
+                'name': record.name,
+                'ph': 'X',
+                'ts': round(record.start * 1e6, 1),
+                'dur': round(record.wall * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': record.thread,
+                'args': {key: value for key, value in record.as_dict().items()
+                         if key in ('cpu_seconds', 'peak_rss_mb', 'rss_start_mb', 'rss_end_mb', 'rows')},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path):
+        """写出全部记录，路径以.trace.json结尾时使用Chrome trace格式"""
+        payload = self.to_chrome_trace() if path.endswith('.trace.json') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"性能记录已写入{path}（{len(self.records)}个阶段）")
+
+    def summary(self):
+        """按阶段名称汇总：调用次数、总墙钟时间、总CPU时间、最大峰值RSS、总行数"""
+        totals = {}
+        for record in self.records:
+            item = totals.setdefault(record.name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss_mb': None, 'rows': None})
+            item['calls'] += 1
+            item['wall'] += record.wall
+            item['cpu'] += record.cpu
+            peak = _to_mb(record.rss_peak)
+            if peak is not None and (item['peak_rss_mb'] is None or peak > item['peak_rss_mb']):
+                item['peak_rss_mb'] = peak
+            if record.rows is not None:
+                item['rows'] = (item['rows'] or 0) + record.rows
+        return totals
+
+    def print_summary(self):
+        print(f"{'阶段':<40}{'次数':>6}{'墙钟(秒)':>12}{'CPU(秒)':>12}{'峰值RSS(MB)':>14}{'行数':>10}")
+        for name, item in sorted(self.summary().items(), key=lambda kv: -kv[1]['wall']):
+            peak = '-' if item['peak_rss_mb'] is None else f"{item['peak_rss_mb']:.1f}"
+            rows = '-' if item['rows'] is None else item['rows']
+            print(f"{name:<40}{item['calls']:>6}{item['wall']:>12.4f}{item['cpu']:>12.4f}{peak:>14}{rows:>10}")
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+
+
+RECORDER = Recorder()
+
+
+def stage(name, rows=None):
+    """
+    记录一个阶段的上下文管理器
+
+    用法:
+    with stage('merge') as s:
+        merged = ...
+        s.rows = len(merged)
+    """
+    return RECORDER.stage(name, rows)
+
+
+def _count_rows(value):
+    if value is None:
+        return None
+    if isinstance(value, tuple):
+        counts = [_count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def instrumented(name=None, rows=None):
+    """
+    把函数的每次调用记录为一个阶段的装饰器
+
+    参数:
+    name: str - 阶段名称，默认为函数的限定名
+    rows: 行数的取法：
+          'result' - 返回值的长度（返回元组时为各元素长度之和）；
+          其他字符串 - 第一个参数（通常是self）上同名属性的长度；
+          callable - 以(返回值, *args, **kwargs)调用，返回行数
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with RECORDER.stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                try:
+                    if rows == 'result':
+                        record.rows = _count_rows(result)
+                    elif isinstance(rows, str):
+                        record.rows = _count_rows(getattr(args[0], rows, None))
+                    elif rows is not None:
+                        record.rows = rows(result, *args, **kwargs)
+                except Exception:
+                    # 行数只是附加信息，取不到时不影响被测函数
+                    record.rows = None
+                return result
+        return wrapper
+    return decorator
+
+
+def configure(report=None, profile=None, profile_mode='cprofile', profile_out=None):
+    """
+    开启阶段记录，并可选地写出记录和剖析指定阶段
+
+    参数:
+    report: str - 进程退出时写出记录的路径（.trace.json为Chrome trace格式，否则为JSON）
+    profile: str - 需要剖析的阶段名称
+    profile_mode: str - cprofile或sample
+    profile_out: str - 剖析结果路径
+    """
+    if profile_mode not in ('cprofile', 'sample'):
+        raise ValueError(f"不支持的剖析方式：{profile_mode}")
+    RECORDER.enabled = True
+    RECORDER.profile_stage = profile
+    RECORDER.profile_mode = profile_mode
+    RECORDER.profile_out = profile_out
+    if report:
+        atexit.register(RECORDER.write, report)
+
+
+def add_arguments(parser):
+    """为命令行脚本添加性能记录相关的参数"""
+    group = parser.add_argument_group('性能记录')
+    group.add_argument('--perf-report', help='写出各阶段耗时和内存的路径（.trace.json为Chrome trace格式）')
+    group.add_argument('--profile-stage', help='需要剖析的阶段名称')
+    group.add_argument('--profile-mode', choices=['cprofile', 'sample'], default='cprofile', help='剖析方式')
+    group.add_argument('--profile-out', help='剖析结果路径')
+
+
+def configure_from_args(args):
+    """按add_arguments添加的参数开启性能记录，未指定时保留环境变量中的设置"""
+    if args.perf_report or args.profile_stage:
+        configure(args.perf_report, args.profile_stage, args.profile_mode, args.profile_out)
+    if args.perf_report:
+        atexit.register(RECORDER.print_summary)
+
+
+if os.environ.get('PERF_REPORT') or os.environ.get('PERF_PROFILE'):
+    configure(os.environ.get('PERF_REPORT'), os.environ.get('PERF_PROFILE'),
+              os.environ.get('PERF_PROFILE_MODE', 'cprofile'), os.environ.get('PERF_PROFILE_OUT'))
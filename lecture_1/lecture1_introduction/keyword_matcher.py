@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""多关键词组单遍匹配（Aho-Corasick自动机）
+
+把若干组关键词一次性编译为一个自动机，每篇文档只扫描一遍，
+返回该文档命中了哪些关键词组的位掩码（第i组命中则第i位为1）。
+筛选、合作模式分类和机构类型分类都由同一个位掩码推导，
+成本只与语料长度有关，而不是语料长度 × 类别数。
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class KeywordMatcher:
+    """
+    由多组关键词构建的Aho-Corasick自动机
+
+    参数:
+    groups: dict - {组名: 关键词列表}，组的顺序决定位号
+    case_sensitive: bool - 是否区分大小写（默认不区分，与str.contains(case=False)一致）
+    """
+
+    def __init__(self, groups, case_sensitive=False):
+        self.groups = list(groups)
+        self.case_sensitive = case_sensitive
+        self.bits = {name: 1 << i for i, name in enumerate(self.groups)}
+        self.all_bits = (1 << len(self.groups)) - 1
+
+        # goto[state]为{字符: 下一状态}，output[state]为到达该状态时命中的组位掩码
+        goto = [{}]
+        output = [0]
+        for name, keywords in groups.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                keyword = keyword if case_sensitive else keyword.lower()
+                state = 0
+                for ch in keyword:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        output.append(0)
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                output[state] |= self.bits[name]
+
+        # 按广度优先计算失败链接，并把失败链接上的输出并入当前状态；
+        # 同时把转移补全为确定性自动机，扫描时每个字符只需一次字典查找
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            for ch, target in goto[state].items():
+                queue.append(target)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[target] = goto[f][ch] if ch in goto[f] and goto[f][ch] != target else 0
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+
+        self._delta = delta
+        self._output = output
+
+    def scan(self, text):
+        """扫描一段文本，返回命中的组位掩码"""
+        if not isinstance(text, str) or not text:
+            return 0
+        if not self.case_sensitive:
+            text = text.lower()
+        delta = self._delta
+        output = self._output
+        root = delta[0]
+        state = 0
+        mask = 0
+        for ch in text:
+            state = delta[state].get(ch) or root.get(ch, 0)
+            if state:
+                hit = output[state]
+                if hit:
+                    mask |= hit
+                    if mask == self.all_bits:
+                        break
+        return mask
+
+    def scan_documents(self, *columns):
+        """
+        对若干等长的文本列逐行扫描（例如标题和正文），各列的命中结果按位或合并
+
+        返回:
+        ndarray - 每篇文档的位掩码（int64）
+        """
+        n = len(columns[0]) if columns else 0
+        masks = np.zeros(n, dtype=np.int64)
+        for column in columns:
+            # 每列单独扫描，避免关键词跨越标题和正文的边界
+            masks |= np.fromiter((self.scan(text) for text in column), dtype=np.int64, count=n)
+        return masks
+
+    def has(self, masks, name):
+        """位掩码中是否命中指定组（向量化）"""
+        return (masks & self.bits[name]) != 0
+
+    def has_any(self, masks, names):
+        """位掩码中是否命中任意一个指定组（向量化）"""
+        combined = 0
+        for name in names:
+            combined |= self.bits[name]
+        return (masks & combined) != 0
+
+    def classify(self, masks, names, default):
+        """
+        按组顺序为每篇文档分类：后面的组覆盖前面的组，与逐个类别依次赋值的结果一致
+
+        参数:
+        masks: ndarray - 文档位掩码
+        names: list - 参与分类的组名（按优先级从低到高）
+        default: str - 未命中任何组时的类别
+
+        返回:
+        ndarray - 每篇文档的类别（object数组）
+        """
+        labels = np.full(len(masks), default, dtype=object)
+        for name in names:
+            labels[self.has(masks, name)] = name
+        return labels
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""对比默认模式与精简模式（--lean）的内存占用
+
+把swufe_news语料复制若干倍（link加后缀保持唯一）生成放大的语料，
+在两个独立的子进程中分别以默认模式和精简模式执行 加载 -> 预处理 -> 趋势 -> 分类 -> 评估，
+记录每个阶段的峰值RSS（见instrumentation.py）、进程峰值RSS以及DataFrame本身（逐列）的内存占用，
+并检查两种模式的分析结果一致。
+
+精简模式节省的是DataFrame本身的内存；进程峰值RSS还包括解析CSV时的临时缓冲区和pyarrow的内存池，
+不一定随之降低，报告末尾会给出两种模式峰值RSS的比较结论。
+
+用法:
+python lean_memory_report.py --scale 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(MODULE_DIR, '..', '..', 'data', 'swufe', 'swufe_news.csv')
+STAGES = ['analyzer.load_data', 'analyzer.preprocess_data', 'analyzer.analyze_trend',
+          'analyzer.analyze_cooperation_models', 'analyzer.analyze_institution_types']
+RESULT_PREFIX = 'RESULT '
+
+
+def build_enlarged_corpus(source, scale, output_path):
+    """把语料复制scale倍写入output_path，返回行数"""
+    news = pd.read_csv(source)
+    copies = []
+    for k in range(scale):
+        copy = news.copy()
+        copy['link'] = copy['link'].astype(str) + f'#{k}'
+        copies.append(copy)
+    enlarged = pd.concat(copies, ignore_index=True)
+    enlarged.to_csv(output_path, index=False)
+    return len(enlarged)
+
+
+def process_peak_rss_mb(stages):
+    """
+    进程峰值RSS（MB）
+
+    resource模块只在类Unix系统上可用；没有时（如Windows）取instrumentation各阶段采样到的峰值中的最大值
+    """
+    try:
+        import resource
+    except ImportError:
+        peaks = [peak for peak in stages.values() if peak is not None]
+        return max(peaks) if peaks else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 if sys.platform != 'darwin' else peak / 1024 / 1024, 1)
+
+
+def column_memory_mb(df):
+    """每列（含索引）的memory_usage(deep=True)，单位MB"""
+    return {str(column): round(value / 1024 / 1024, 3) for column, value in df.memory_usage(deep=True).items()}
+
+
+def measure(data_path, lean):
+    """在当前进程中执行一次分析并返回内存统计（由子进程调用）"""
+    from instrumentation import RECORDER, configure
+    from university_industry_cooperation_analysis import UniversityIndustryCooperationAnalyzer
+
+    # 开启阶段记录以取得各阶段的峰值内存
+    configure()
+    analyzer = UniversityIndustryCooperationAnalyzer()
+    analyzer.data_path = data_path
+    analyzer.lean = lean
+    analyzer.load_data()
+    analyzer.preprocess_data()
+    analyzer.analyze_trend()
+    analyzer.analyze_cooperation_models()
+    analyzer.analyze_institution_types()
+    analyzer.evaluate_implementation()
+
+    stages = {name: item['peak_rss_mb'] for name, item in RECORDER.summary().items()}
+    return {
+        'peak_rss_mb': process_peak_rss_mb(stages),
+        'stages': stages,
+        'data_mb': round(analyzer.data.memory_usage(deep=True).sum() / 1024 / 1024, 2),
+        'filtered_mb': round(analyzer.filtered_data.memory_usage(deep=True).sum() / 1024 / 1024, 2),
+        'data_columns': column_memory_mb(analyzer.data),
+        'filtered_columns': column_memory_mb(analyzer.filtered_data),
+        'filtered_rows': len(analyzer.filtered_data),
+        'model_counts': analyzer.cooperation_model_data['counts'].to_dict(),
+        'institution_counts': analyzer.institution_type_data['counts'].to_dict(),
+        'evaluation': {key: float(value) for key, value in analyzer.implementation_evaluation.items()},
+    }
+
+
+def run_mode(data_path, lean):
+    """在独立子进程中测量一种模式，避免两种模式的峰值内存相互影响"""
+    command = [sys.executable, os.path.abspath(__file__), '--measure', '--data', data_path]
+    if lean:
+        command.append('--lean')
+    output = subprocess.run(command, capture_output=True, text=True, check=True, cwd=MODULE_DIR).stdout
+    line = next(line for line in reversed(output.splitlines()) if line.startswith(RESULT_PREFIX))
+    return json.loads(line[len(RESULT_PREFIX):])
+
+
+def print_report(default, lean):
+    print(f"\n{'指标':<40}{'默认模式':>12}{'精简模式':>12}{'节省':>10}")
+    rows = [('进程峰值RSS(MB)', default['peak_rss_mb'], lean['peak_rss_mb']),
+            ('原始数据DataFrame(MB)', default['data_mb'], lean['data_mb']),
+            ('筛选结果DataFrame(MB)', default['filtered_mb'], lean['filtered_mb'])]
+    rows += [(f'{name} 峰值RSS(MB)', default['stages'].get(name), lean['stages'].get(name)) for name in STAGES]
+    for label, before, after in rows:
+        if before is None or after is None:
+            continue
+        saved = f"{(1 - after / before) * 100:.1f}%" if before else '-'
+        print(f"{label:<40}{before:>12.2f}{after:>12.2f}{saved:>10}")
+
+    for title, key in (('原始数据', 'data_columns'), ('筛选结果', 'filtered_columns')):
+        print(f"\n{title}逐列内存(MB, memory_usage(deep=True))")
+        for column in dict.fromkeys(list(default[key]) + list(lean[key])):
+            before, after = default[key].get(column), lean[key].get(column)
+            before_text = '-' if before is None else f"{before:.3f}"
+            after_text = '-' if after is None else f"{after:.3f}"
+            saved = f"{(1 - after / before) * 100:.1f}%" if before and after is not None else '-'
+            print(f"  {column:<38}{before_text:>12}{after_text:>12}{saved:>10}")
+
+    if default['peak_rss_mb'] is not None and lean['peak_rss_mb'] is not None:
+        if lean['peak_rss_mb'] >= default['peak_rss_mb']:
+            print(f"\n注意：精简模式没有降低进程峰值RSS（{default['peak_rss_mb']:.1f} -> {lean['peak_rss_mb']:.1f}MB），"
+                  f"节省只体现在DataFrame本身的内存占用上")
+        else:
+            print(f"\n精简模式的进程峰值RSS降低了{default['peak_rss_mb'] - lean['peak_rss_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='对比默认模式与精简模式的内存占用')
+    parser.add_argument('--data', default=DEFAULT_DATA, help='新闻CSV路径')
+    parser.add_argument('--scale', type=int, default=50, help='语料放大倍数')
+    parser.add_argument('--lean', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(RESULT_PREFIX + json.dumps(measure(args.data, args.lean), ensure_ascii=False))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        enlarged_path = os.path.join(tmp_dir, 'swufe_news_enlarged.csv')
+        n_rows = build_enlarged_corpus(args.data, args.scale, enlarged_path)
+        print(f"放大后的语料：{n_rows}行（{args.scale}倍），{os.path.getsize(enlarged_path) / 1024 / 1024:.1f}MB")
+        default = run_mode(enlarged_path, lean=False)
+        lean = run_mode(enlarged_path, lean=True)
+
+    print_report(default, lean)
+    same = all(default[key] == lean[key] for key in
+               ('filtered_rows', 'model_counts', 'institution_counts', 'evaluation'))
+    print(f"\n两种模式的分析结果{'一致' if same else '不一致'}（筛选出{default['filtered_rows']}条）")
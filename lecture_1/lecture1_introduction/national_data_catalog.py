@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""data/national_data指标工作簿目录
+
+自动发现national_data目录下的全部工作簿（制造业PMI、发电量、货币供应量、进出口、房地产等），
+每个工作簿对应一个按名称访问、惰性加载的指标序列：创建目录时只列出文件名，
+某个指标第一次被访问时才解析（经由data_cache的解析缓存），之后在进程内共享同一份结果。
+"""
+
+import os
+import re
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from data_cache import NATIONAL_DATA_DIR, load_excel_cached
+
+DATE_COLUMN = '时间'
+DATE_FORMAT = '%Y年%m月'
+WORKBOOK_EXTENSIONS = ('.xls', '.xlsx')
+
+# 常用简称到工作簿名称的映射
+ALIASES = {
+    'PMI': '制造业采购经理人指数',
+    '财政收入': '国家财政预算收入',
+    '财政支出': '国家财政支出',
+    'M2': '货币供应量',
+}
+
+# 列名中的统计口径，按匹配优先级排列
+MEASURES = ['当期值', '累计值', '期末值', '同比增长', '累计增长']
+
+# 列的标准化元数据
+# column: 原始列名; indicator: 指标名称; measure: 统计口径（当期值/累计值/期末值/同比增长/累计增长/指数）;
+# unit: 单位; cumulative: 是否为年初至今的累计口径
+ColumnMeta = namedtuple('ColumnMeta', ['column', 'indicator', 'measure', 'unit', 'cumulative'])
+
+_COLUMN_PATTERN = re.compile(r'^(?P<body>.*?)\((?P<unit>[^()]*)\)$')
+
+
+def parse_column(column):
+    """
+    把国家统计局风格的列名拆分为标准化元数据
+
+    例如'发电量累计值(亿千瓦时)' -> 指标'发电量'、口径'累计值'、单位'亿千瓦时'；
+    没有口径后缀的列（如PMI各分项'生产指数(%)'）口径记为'指数'
+    """
+    match = _COLUMN_PATTERN.match(column)
+    body, unit = (match.group('body'), match.group('unit')) if match else (column, '')
+    for measure in MEASURES:
+        if body.endswith(measure):
+            indicator = body[:-len(measure)]
+            return ColumnMeta(column, indicator, measure, unit, measure in ('累计值', '累计增长'))
+    return ColumnMeta(column, body, '指数', unit, False)
+
+
+def format_month_labels(dates):
+    """把日期序列格式化为源数据使用的'2025年6月'样式标签"""
+    return dates.dt.year.astype(str) + '年' + dates.dt.month.astype(str) + '月'
+
+
+class IndicatorSeries:
+    """单个指标工作簿的惰性视图，首次访问frame或columns时才读取数据"""
+
+    def __init__(self, name, path, use_cache=True, catalog=None):
+        self.name = name
+        self.path = path
+        self.use_cache = use_cache
+        # 所属目录，派生序列从同一目录读取源数据
+        self._catalog = catalog
+        self._frame = None
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        state = '已加载' if self.loaded else '未加载'
+        return f"IndicatorSeries({self.name!r}, {state})"
+
+    @property
+    def loaded(self):
+        return self._frame is not None
+
+    def load(self):
+        """
+        读取并标准化工作簿数据
+
+        时间列解析为日期类型，按时间升序排列并重建索引；
+        结果在进程内缓存，调用方如需增删列请先copy()
+        """
+        if self._frame is None:
+            with self._lock:
+                if self._frame is None:
+                    df = load_excel_cached(self.path, date_column=DATE_COLUMN, date_format=DATE_FORMAT,
+                                           use_cache=self.use_cache)
+                    df = df.dropna(subset=[DATE_COLUMN]).sort_values(DATE_COLUMN).reset_index(drop=True)
+                    self._columns = [parse_column(c) for c in df.columns if c != DATE_COLUMN]
+                    self._frame = df
+        return self._frame
+
+    @property
+    def frame(self):
+        return self.load()
+
+    @property
+    def columns(self):
+        """除时间列外各列的标准化元数据（ColumnMeta列表）"""
+        self.load()
+        return self._columns
+
+    def column_names(self, measure=None):
+        """返回指定口径（如'累计值'）的列名，measure为None时返回全部数据列"""
+        return [meta.column for meta in self.columns if measure is None or meta.measure == measure]
+
+    def series(self, column):
+        """返回以时间为索引的单列序列"""
+        df = self.frame
+        return pd.Series(df[column].to_numpy(), index=pd.DatetimeIndex(df[DATE_COLUMN]), name=column)
+
+    @property
+    def derived(self):
+        """累计值列的派生序列（当月值、同比、环比、滚动12个月合计），见derived_series.py"""
+        from derived_series import load_derived
+        return load_derived(self.name, catalog=self._catalog, use_cache=self.use_cache)
+
+    def invalidate(self):
+        """丢弃进程内缓存，下次访问时重新加载"""
+        with self._lock:
+            self._frame = None
+            self._columns = None
+
+
+class NationalDataCatalog:
+    """national_data目录下全部指标工作簿的目录"""
+
+    def __init__(self, data_dir=NATIONAL_DATA_DIR, use_cache=True):
+        self.data_dir = os.path.abspath(data_dir)
+        self.use_cache = use_cache
+        self._series = {}
+        # 只列出文件名，不读取任何工作簿内容
+        for file_name in sorted(os.listdir(self.data_dir)):
+            stem, ext = os.path.splitext(file_name)
+            if ext.lower() in WORKBOOK_EXTENSIONS and not file_name.startswith(('.', '~$')):
+                self._series[stem] = IndicatorSeries(stem, os.path.join(self.data_dir, file_name), use_cache, self)
+
+    def __repr__(self):
+        return f"NationalDataCatalog({self.data_dir!r}, {len(self)}个指标)"
+
+    def __len__(self):
+        return len(self._series)
+
+    def __iter__(self):
+        return iter(self._series.values())
+
+    def __contains__(self, name):
+        return ALIASES.get(name, name) in self._series
+
+    def __getitem__(self, name):
+        key = ALIASES.get(name, name)
+        if key not in self._series:
+            raise KeyError(f"未找到指标'{name}'，可用指标：{', '.join(self.names())}")
+        return self._series[key]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def names(self):
+        return list(self._series)
+
+    def loaded_names(self):
+        return [name for name, series in self._series.items() if series.loaded]
+
+    def frame(self, name):
+        """指标的标准化数据表，等价于catalog[name].frame"""
+        return self[name].frame
+
+    def describe(self):
+        """
+        汇总全部指标的列元数据
+
+        注意：会触发所有工作簿的加载
+        """
+        rows = []
+        for series in self:
+            for meta in series.columns:
+                rows.append({'名称': series.name, **meta._asdict()})
+        return pd.DataFrame(rows)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(data_dir=NATIONAL_DATA_DIR):
+    """返回进程内共享的目录实例（按数据目录记忆化）"""
+    key = os.path.abspath(data_dir)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = NationalDataCatalog(key)
+        return _catalogs[key]
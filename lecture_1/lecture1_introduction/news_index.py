@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""swufe_news新闻语料的持久化倒排索引
+
+以字符n-gram（单字和双字）为词项，倒排表记录每次出现的位置编码
+(文档号 << 25 | 字段 << 24 | 字符位置)，字段0为标题、1为正文。
+任意关键词都可以由其双字词项的位置链精确匹配（不会跨越标题和正文的边界），
+因此关键词筛选和临时查询只需求倒排表的交集，不必重新扫描文本。
+
+索引保存在源文件解析缓存目录下的news_index/中，加载时以内存映射方式打开。
+每行新闻按row_keys得到的键识别（link加出现次序，没有link时用标题和日期），
+只把未见过的行追加进索引；标题或正文变化的行删去旧文档后重新加入。
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_cache import cache_dir_for
+
+# 索引格式版本号，格式变化时递增即可让旧索引失效
+INDEX_VERSION = 2
+INDEX_DIR_NAME = 'news_index'
+FIELDS = ('title', 'text')
+NGRAM_SIZES = (1, 2)
+
+POSITION_BITS = 24
+DOC_SHIFT = POSITION_BITS + 1
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+
+def index_dir_for(path):
+    """返回新闻CSV对应的索引目录"""
+    return os.path.join(cache_dir_for(path), INDEX_DIR_NAME)
+
+
+def row_keys(data):
+    """
+    每条新闻的唯一键：link加上该link在数据中是第几次出现，重复抓取的新闻各算一条；
+    link缺失时用标题和日期代替
+
+    参数:
+    data: DataFrame - 含link、title和原始date列的新闻数据
+
+    返回:
+    Index - 与data逐行对应的字符串键
+    """
+    links = data['link'].astype(object)
+    missing = links.isna()
+    if missing.any():
+        links = links.where(~missing, '\x00' + data['title'].astype(str) + '|' + data['date'].astype(str))
+    occurrence = links.groupby(links, sort=False).cumcount()
+    return pd.Index((links.astype(str) + '#' + occurrence.astype(str)).to_numpy())
+
+
+def content_hashes(data):
+    """标题和正文的64位哈希，用于发现内容变化的行"""
+    return pd.util.hash_pandas_object(data[list(FIELDS)].astype(object), index=False).to_numpy()
+
+
+def _ngram_postings(columns, first_doc):
+    """
+    为一批文档生成(词项, 位置编码)
+
+    参数:
+    columns: list - 每个字段一列文本（与FIELDS对应）
+    first_doc: int - 第一篇文档的文档号
+
+    返回:
+    tuple - (词项列表, int64位置编码数组)
+    """
+    terms = []
+    keys = []
+    for field, column in enumerate(columns):
+        for i, text in enumerate(column):
+            if not isinstance(text, str) or not text:
+                continue
+            text = text.lower()
+            if len(text) > POSITION_MASK:
+                raise ValueError(f"第{first_doc + i}篇文档的{FIELDS[field]}过长，无法编码字符位置")
+            base = ((first_doc + i) << DOC_SHIFT) | (field << POSITION_BITS)
+            for n in NGRAM_SIZES:
+                for pos in range(len(text) - n + 1):
+                    terms.append(text[pos:pos + n])
+                    keys.append(base | pos)
+    return terms, np.array(keys, dtype=np.int64)
+
+
+class NewsIndex:
+    """
+    新闻语料的字符n-gram倒排索引
+
+    参数:
+    index_dir: str - 索引目录；目录中已有同版本的索引时以内存映射方式加载
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.terms = []
+        self.keys = []
+        self.links = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.int64)
+        self.dates = np.empty(0, dtype='datetime64[us]')
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self._term_ids = {}
+        self._doc_ids = {}
+        self._load()
+
+    def __repr__(self):
+        return f"NewsIndex({self.index_dir!r}, {len(self)}篇文档, {len(self.terms)}个词项)"
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        try:
+            with open(self._path('meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != INDEX_VERSION:
+                return
+            with open(self._path('terms.json'), 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+            with open(self._path('keys.json'), 'r', encoding='utf-8') as f:
+                keys = json.load(f)
+            with open(self._path('links.json'), 'r', encoding='utf-8') as f:
+                links = json.load(f)
+            offsets = np.load(self._path('offsets.npy'), mmap_mode='r')
+            postings = np.load(self._path('postings.npy'), mmap_mode='r')
+            dates = np.load(self._path('dates.npy'), mmap_mode='r')
+            hashes = np.load(self._path('hashes.npy'), mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return
+        if (len(offsets) != len(terms) + 1 or offsets[-1] != len(postings)
+                or not len(keys) == len(links) == len(dates) == len(hashes)):
+            print(f"索引文件不一致，将重新建立：{self.index_dir}")
+            return
+        self.terms, self.keys, self.links = terms, keys, links
+        self.offsets, self.postings, self.dates, self.hashes = offsets, postings, dates, hashes
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self._doc_ids = {key: i for i, key in enumerate(keys)}
+
+    def save(self):
+        """写入索引文件，元数据最后写入"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        for name, values in (('offsets.npy', self.offsets), ('postings.npy', self.postings),
+                             ('dates.npy', self.dates), ('hashes.npy', self.hashes)):
+            tmp_path = self._path(name + '.tmp.npy')
+            np.save(tmp_path, np.ascontiguousarray(values))
+            os.replace(tmp_path, self._path(name))
+        for name, values in (('terms.json', self.terms), ('keys.json', self.keys), ('links.json', self.links)):
+            with open(self._path(name), 'w', encoding='utf-8') as f:
+                json.dump(values, f, ensure_ascii=False)
+        meta = {'version': INDEX_VERSION, 'n_docs': len(self.keys), 'n_terms': len(self.terms),
+                'n_postings': int(len(self.postings))}
+        with open(self._path('meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def _drop(self, docs):
+        """删去指定文档的倒排表和元数据，其余文档按原顺序重新编号"""
+        keep = np.ones(len(self), dtype=bool)
+        keep[docs] = False
+        remap = np.cumsum(keep) - 1
+        postings = np.asarray(self.postings)
+        term_ids = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        doc = postings >> DOC_SHIFT
+        kept = keep[doc]
+        # 重新编号保持文档号的相对顺序，每个词项的倒排表仍然有序
+        self.postings = (remap[doc[kept]] << DOC_SHIFT) | (postings[kept] & ((1 << DOC_SHIFT) - 1))
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(term_ids[kept], minlength=len(self.terms)))])
+        self.keys = [key for key, k in zip(self.keys, keep) if k]
+        self.links = [link for link, k in zip(self.links, keep) if k]
+        self.dates = np.asarray(self.dates)[keep]
+        self.hashes = np.asarray(self.hashes)[keep]
+        self._doc_ids = {key: i for i, key in enumerate(self.keys)}
+
+    def update(self, data, dates=None, keys=None):
+        """
+        把未见过的新闻追加进索引，标题或正文变化的新闻重新建立索引
+
+        参数:
+        data: DataFrame - 含link、title、text和原始date列的新闻数据
+        dates: Series - 与data对齐的已解析日期（datetime64），None时日期记为NaT
+        keys: Index - 与data对齐的行键，None时由row_keys计算
+
+        返回:
+        int - 新加入或重新建立索引的文档数
+        """
+        if keys is None:
+            keys = row_keys(data)
+        hashes = content_hashes(data)
+        ids = self.doc_ids(keys)
+        changed = ids >= 0
+        changed[changed] = np.asarray(self.hashes)[ids[changed]] != hashes[changed]
+        new = (ids < 0) | changed
+        if not new.any():
+            return 0
+        if changed.any():
+            self._drop(ids[changed])
+
+        first_doc = len(self.keys)
+        terms, codes = _ngram_postings([data[field].to_numpy()[new] for field in FIELDS], first_doc)
+        term_ids = self._term_ids
+        ids = np.fromiter((term_ids.setdefault(term, len(term_ids)) for term in terms),
+                          dtype=np.int64, count=len(terms))
+        self.terms.extend(list(term_ids)[len(self.terms):])
+
+        # 新文档的文档号都大于已有文档，按(词项, 位置编码)排序后每个词项的倒排表仍然有序
+        old_ids = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        all_ids = np.concatenate([old_ids, ids])
+        all_codes = np.concatenate([np.asarray(self.postings), codes])
+        order = np.lexsort((all_codes, all_ids))
+        self.postings = all_codes[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(all_ids, minlength=len(self.terms)))])
+
+        if dates is None:
+            new_dates = np.full(int(new.sum()), np.datetime64('NaT'), dtype=self.dates.dtype)
+        else:
+            new_dates = np.asarray(dates, dtype=self.dates.dtype)[new]
+        self.dates = np.concatenate([np.asarray(self.dates), new_dates])
+        self.hashes = np.concatenate([np.asarray(self.hashes), hashes[new]])
+        links = data['link'].astype(object).to_numpy()[new]
+        for key, link in zip(np.asarray(keys)[new], links):
+            self._doc_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.links.append(link if isinstance(link, str) else None)
+        return int(new.sum())
+
+    def _postings(self, term):
+        i = self._term_ids.get(term)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def occurrences(self, keyword):
+        """
+        关键词每次出现的位置编码（不区分大小写）
+
+        用起始双字词项的位置依次与后续双字词项的位置（加上偏移）求交集，
+        双字词项以步长2覆盖整个关键词，最后一个词项对齐到关键词末尾。
+        """
+        keyword = keyword.lower()
+        if len(keyword) < 2:
+            return np.asarray(self._postings(keyword))
+        offsets = list(range(0, len(keyword) - 1, 2))
+        if offsets[-1] != len(keyword) - 2:
+            offsets.append(len(keyword) - 2)
+        # 从最短的倒排表开始求交集
+        lists = sorted(((np.asarray(self._postings(keyword[o:o + 2])), o) for o in offsets),
+                       key=lambda item: len(item[0]))
+        first, first_offset = lists[0]
+        candidates = first - first_offset
+        for postings, offset in lists[1:]:
+            if len(candidates) == 0:
+                break
+            target = candidates + offset
+            idx = np.searchsorted(postings, target)
+            hit = idx < len(postings)
+            hit[hit] = postings[idx[hit]] == target[hit]
+            candidates = candidates[hit]
+        return candidates
+
+    def search(self, keyword):
+        """标题或正文包含关键词的文档号（升序）"""
+        return np.unique(self.occurrences(keyword) >> DOC_SHIFT)
+
+    def search_any(self, keywords):
+        """包含任意一个关键词的文档号"""
+        docs = [self.search(keyword) for keyword in keywords]
+        return np.unique(np.concatenate(docs)) if docs else np.empty(0, dtype=np.int64)
+
+    def search_all(self, keywords):
+        """包含全部关键词的文档号"""
+        docs = None
+        for keyword in keywords:
+            found = self.search(keyword)
+            docs = found if docs is None else np.intersect1d(docs, found, assume_unique=True)
+        return docs if docs is not None else np.arange(len(self), dtype=np.int64)
+
+    def filter_dates(self, docs, start=None, end=None):
+        """按日期范围（闭区间）过滤文档号"""
+        dates = np.asarray(self.dates)[docs]
+        keep = ~np.isnat(dates)
+        if start is not None:
+            keep &= dates >= np.datetime64(pd.Timestamp(start), 'us')
+        if end is not None:
+            keep &= dates <= np.datetime64(pd.Timestamp(end), 'us')
+        return docs[keep]
+
+    def count(self, keywords, start=None, end=None):
+        """
+        统计同时包含全部关键词、日期在范围内的新闻数量
+
+        例如 index.count('实习基地', '2023-01-01', '2023-12-31')
+        """
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        return len(self.filter_dates(self.search_all(keywords), start, end))
+
+    def doc_ids(self, keys):
+        """行键（见row_keys）对应的文档号，不在索引中的为-1"""
+        return np.fromiter((self._doc_ids.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def group_masks(self, groups, keys=None):
+        """
+        由倒排表计算每篇文档的关键词组位掩码，位号与KeywordMatcher(groups)一致
+
+        参数:
+        groups: dict - {组名: 关键词列表}
+        keys: 序列 - 需要返回掩码的文档的行键（见row_keys），None时按文档号顺序返回全部文档
+
+        返回:
+        ndarray - int64位掩码；不在索引中的行掩码为0
+        """
+        masks = np.zeros(len(self), dtype=np.int64)
+        for bit, keywords in enumerate(groups.values()):
+            masks[self.search_any([k for k in keywords if k])] |= 1 << bit
+        if keys is None:
+            return masks
+        ids = self.doc_ids(keys)
+        return np.where(ids >= 0, masks[np.maximum(ids, 0)], 0)
+
+
+def open_index(csv_path, data=None, dates=None):
+    """
+    打开新闻CSV的索引，传入data时先把未见过或内容变化的行更新进索引并保存
+
+    返回:
+    NewsIndex
+    """
+    index = NewsIndex(index_dir_for(csv_path))
+    if data is not None:
+        added = index.update(data, dates)
+        if added:
+            index.save()
+            print(f"索引新增或更新{added}篇新闻，共{len(index)}篇")
+    return index
+
+
+def check_against_scan(data, index_dir):
+    """
+    在index_dir中建立或更新data的索引并保存，比较倒排表得到的关键词组位掩码与逐篇扫描的结果
+
+    返回:
+    tuple - (位掩码不一致的行数, 索引中的文档数)
+    """
+    from university_industry_cooperation_analysis import UniversityIndustryCooperationAnalyzer as Analyzer
+
+    index = NewsIndex(index_dir)
+    index.update(data)
+    index.save()
+    expected = Analyzer.build_matcher().scan_documents(data['title'].to_numpy(), data['text'].to_numpy())
+    return int((index.group_masks(Analyzer.keyword_groups(), row_keys(data)) != expected).sum()), len(index)
+
+
+def check_with_duplicates(news):
+    """
+    在追加了重复link和缺失link（正文各不相同）的语料上核对索引与逐篇扫描，
+    再修改其中几行的标题或正文，核对更新后的索引（旧版本的文档应已删去，文档数与行数相同）
+
+    返回:
+    dict - {检查项: 不一致的行数（文档数一项为多出或缺少的文档数）}
+    """
+    import tempfile
+
+    news = news.reset_index(drop=True)
+    extra = news.iloc[[1, 2, 3, 4]].copy()
+    extra['link'] = [news['link'].iloc[0], np.nan, news['link'].iloc[0], np.nan]
+    corpus = pd.concat([news, extra], ignore_index=True)
+    with tempfile.TemporaryDirectory() as index_dir:
+        report = {}
+        report['重复和缺失link'], _ = check_against_scan(corpus, index_dir)
+        corpus.loc[len(news):, 'text'] = news['text'].iloc[5:9].to_numpy()
+        corpus.loc[0, 'title'] = news['title'].iloc[9]
+        report['内容变化后更新'], n_docs = check_against_scan(corpus, index_dir)
+        report['更新后的文档数'] = abs(n_docs - len(corpus))
+    return report
+
+
+if __name__ == "__main__":
+    from university_industry_cooperation_analysis import parse_news_dates
+
+    parser = argparse.ArgumentParser(description='查询swufe_news新闻倒排索引')
+    parser.add_argument('keywords', nargs='*', help='关键词（同时包含全部关键词）')
+    parser.add_argument('--check', action='store_true',
+                        help='在含重复和缺失link的语料上核对索引与逐篇扫描的关键词匹配结果')
+    parser.add_argument('--start', help='起始日期，如2023-01-01')
+    parser.add_argument('--end', help='结束日期，如2023-12-31')
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       '..', '..', 'data', 'swufe', 'swufe_news.csv'),
+                        help='新闻CSV路径')
+    args = parser.parse_args()
+
+    news = pd.read_csv(args.data)
+    if args.check:
+        for item, mismatches in check_with_duplicates(news).items():
+            print(f"{item}：{'一致' if not mismatches else f'{mismatches}处不一致'}")
+        raise SystemExit
+    if not args.keywords:
+        parser.error('请指定关键词')
+    index = open_index(args.data, news, parse_news_dates(news['date'])[0])
+    docs = index.filter_dates(index.search_all(args.keywords), args.start, args.end)
+    print(f"同时包含{'、'.join(args.keywords)}的新闻共{len(docs)}条")
+    for doc in docs[:20]:
+        print(f"  {np.datetime_as_string(index.dates[doc], unit='D')}  {index.links[doc]}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""多指标月度面板构建
+
+把national_data中任意多个月度指标对齐到同一个月份索引上，一次性写入一个连续的float64二维数组，
+代替逐个pd.merge（N个指标需要N-1次合并，每次都会产生中间副本）。
+
+对齐方式:
+- outer: 所有指标月份的并集，缺失处为NaN
+- inner: 所有指标都有数据的月份
+- asof: 在目标月份上取各指标最近一期（不晚于该月）的数值，可限制最多回溯的月数
+"""
+
+import numpy as np
+import pandas as pd
+
+from national_data_catalog import DATE_COLUMN, get_catalog
+
+ALIGNMENTS = ('outer', 'inner', 'asof')
+
+
+def month_keys(dates):
+    """把日期转换为整数月份编号（年*12+月-1），便于排序和二分查找"""
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year.to_numpy(dtype=np.int64) * 12 + dates.month.to_numpy(dtype=np.int64) - 1)
+
+
+def keys_to_months(keys):
+    """把整数月份编号还原为每月第一天的日期索引"""
+    keys = np.asarray(keys, dtype=np.int64)
+    return pd.to_datetime({'year': keys // 12, 'month': keys % 12 + 1, 'day': 1})
+
+
+class Panel:
+    """
+    对齐后的宽面板
+
+    属性:
+    values: ndarray - 形状为(月份数, 列数)的C连续float64数组
+    months: DatetimeIndex - 行索引（每月第一天）
+    columns: MultiIndex - 列索引，两层分别为(指标名称, 原始列名)
+    """
+
+    def __init__(self, values, months, columns):
+        self.values = values
+        self.months = months
+        self.columns = columns
+
+    def __repr__(self):
+        return f"Panel({self.values.shape[0]}个月份 × {self.values.shape[1]}列)"
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def column_position(self, indicator, column):
+        """返回某列在values中的列号"""
+        return self.columns.get_loc((indicator, column))
+
+    def to_frame(self):
+        """包装为DataFrame（不复制values）"""
+        return pd.DataFrame(self.values, index=self.months, columns=self.columns, copy=False)
+
+
+def _prepare(series, columns):
+    """取出一个指标的月份编号和数值矩阵，同一月份重复时保留最后一条"""
+    df = series.frame
+    if columns is None:
+        columns = series.column_names()
+    keys = month_keys(df[DATE_COLUMN])
+    data = df[columns].to_numpy(dtype=np.float64)
+    # 目录中的数据已按时间升序排列，这里只需去掉重复月份
+    keep = np.ones(len(keys), dtype=bool)
+    keep[:-1] = keys[1:] != keys[:-1]
+    return keys[keep], data[keep], list(columns)
+
+
+def _merge_index(all_keys, how):
+    """
+    对各指标已排序的月份编号做一次多路归并，得到共同的月份索引
+
+    各段本身有序，稳定排序（timsort）会识别这些有序段并逐段归并；没有指标时返回空索引
+    """
+    if not all_keys:
+        return np.empty(0, dtype=np.int64)
+    merged = np.sort(np.concatenate(all_keys), kind='stable')
+    if len(merged) == 0:
+        return merged
+    starts = np.empty(len(merged), dtype=bool)
+    starts[0] = True
+    starts[1:] = merged[1:] != merged[:-1]
+    unique = merged[starts]
+    if how == 'inner':
+        # 每个指标中月份唯一，出现次数等于指标个数即为交集
+        counts = np.diff(np.append(np.flatnonzero(starts), len(merged)))
+        unique = unique[counts == len(all_keys)]
+    return unique
+
+
+def build_panel(indicators, how='outer', months=None, tolerance=None, catalog=None):
+    """
+    构建多指标月度面板
+
+    参数:
+    indicators: list或dict - 指标名称列表（取全部数据列），或{指标名称: 列名列表}
+    how: str - 对齐方式，'outer'、'inner'或'asof'
+    months: 可选的目标月份序列，仅对asof有效，默认为所有指标月份的并集
+    tolerance: int - asof对齐时最多向前回溯的月数，None表示不限制
+    catalog: NationalDataCatalog - 默认使用get_catalog()返回的共享目录
+
+    返回:
+    Panel - 对齐后的面板
+    """
+    if how not in ALIGNMENTS:
+        raise ValueError(f"不支持的对齐方式'{how}'，可选：{', '.join(ALIGNMENTS)}")
+    if catalog is None:
+        catalog = get_catalog()
+    if not isinstance(indicators, dict):
+        indicators = {name: None for name in indicators}
+
+    prepared = []
+    for name, columns in indicators.items():
+        series = catalog[name]
+        prepared.append((series.name,) + _prepare(series, columns))
+
+    all_keys = [keys for _, keys, _, _ in prepared]
+    if how == 'asof' and months is not None:
+        index = np.unique(month_keys(months))
+    else:
+        index = _merge_index(all_keys, 'inner' if how == 'inner' else 'outer')
+
+    n_cols = sum(len(columns) for _, _, _, columns in prepared)
+    values = np.full((len(index), n_cols), np.nan, dtype=np.float64)
+    column_tuples = []
+
+    # 每个指标只做一次二分查找和一次按位置写入，总成本与指标个数成线性关系
+    start = 0
+    for name, keys, data, columns in prepared:
+        stop = start + len(columns)
+        if len(keys) == 0:
+            # 没有任何数据的指标保留全为NaN的列
+            pass
+        elif how == 'asof':
+            pos = np.searchsorted(keys, index, side='right') - 1
+            valid = pos >= 0
+            if tolerance is not None:
+                valid &= (index - keys[np.maximum(pos, 0)]) <= tolerance
+            values[valid, start:stop] = data[pos[valid]]
+        else:
+            pos = np.searchsorted(index, keys)
+            found = pos < len(index)
+            found[found] = index[pos[found]] == keys[found]
+            values[pos[found], start:stop] = data[found]
+        column_tuples.extend((name, column) for column in columns)
+        start = stop
+
+    columns = pd.MultiIndex.from_tuples(column_tuples, names=['指标', '列名'])
+    return Panel(values, pd.DatetimeIndex(keys_to_months(index)), columns)
+
+
+def check_against_merge(indicators, catalog=None):
+    """
+    用逐个pd.merge的参考实现核对outer/inner对齐的结果，并检查没有指标时返回空面板
+
+    返回:
+    dict - {检查项: 是否一致}
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    report = {}
+    for how in ('outer', 'inner'):
+        reference = None
+        for name in indicators:
+            df = catalog[name].frame
+            df = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].dt.to_period('M').dt.to_timestamp()})
+            df = df.drop_duplicates(DATE_COLUMN, keep='last').set_index(DATE_COLUMN)
+            df.columns = pd.MultiIndex.from_product([[name], df.columns], names=['指标', '列名'])
+            reference = df if reference is None else reference.join(df, how=how)
+        reference = reference.sort_index().astype(np.float64)
+        frame = build_panel(indicators, how=how, catalog=catalog).to_frame()
+        report[how] = (frame.columns.equals(reference.columns)
+                       and np.array_equal(frame.index.to_numpy(), reference.index.to_numpy())
+                       and np.allclose(frame.to_numpy(), reference.to_numpy(), equal_nan=True))
+    empty = build_panel([], catalog=catalog)
+    report['empty'] = empty.shape == (0, 0) and len(empty.to_frame()) == 0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='构建多指标月度面板并与逐个合并的结果核对')
+    parser.add_argument('indicators', nargs='*', default=['国家财政预算收入', '国家财政支出', '发电量'],
+                        help='指标名称')
+    args = parser.parse_args()
+
+    report = check_against_merge(args.indicators)
+    for item, ok in report.items():
+        print(f"{item}: {'一致' if ok else '不一致'}")
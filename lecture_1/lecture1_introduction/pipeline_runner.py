@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""校企合作分析的进程内DAG执行器
+
+把UniversityIndustryCooperationAnalyzer的各个步骤组织为依赖图：
+load -> preprocess -> trend / models / institutions -> evaluate -> 导出和可视化。
+每个步骤的结果以其输入和参数的内容哈希为键保存（源数据以文件sha1参与哈希），
+哈希不变且产物仍然有效时直接跳过该步骤；互不依赖的分支在线程池中并行执行。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from data_cache import cache_dir_for, file_signature
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 产物格式版本号，格式变化时递增即可让所有旧产物失效
+PIPELINE_VERSION = 1
+
+
+class Step:
+    """
+    DAG中的一个步骤
+
+    参数:
+    name: str - 步骤名称
+    func: callable - 以依赖步骤的结果为位置参数、params为关键字参数调用
+    deps: tuple - 依赖的步骤名称
+    params: dict - 参与内容哈希的参数（需可JSON序列化）
+    outputs: list - 步骤写出的文件，缓存命中还要求这些文件未被改动
+    """
+
+    def __init__(self, name, func, deps=(), params=None, outputs=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = params or {}
+        self.outputs = [os.path.abspath(path) for path in outputs or []]
+
+    def __repr__(self):
+        return f"Step({self.name!r}, deps={self.deps})"
+
+
+def _file_sha1(path):
+    return file_signature(path)['sha1']
+
+
+class PipelineRunner:
+    """
+    带内容哈希缓存的DAG执行器
+
+    参数:
+    steps: list - Step列表，依赖必须先于使用者出现
+    cache_dir: str - 产物缓存目录
+    salt: str - 参与所有哈希的附加内容（如代码版本）
+    max_workers: int - 并行执行的线程数
+    """
+
+    def __init__(self, steps, cache_dir, salt='', max_workers=4):
+        self.steps = {step.name: step for step in steps}
+        self.cache_dir = cache_dir
+        self.salt = salt
+        self.max_workers = max_workers
+        for step in steps:
+            for dep in step.deps:
+                if dep not in self.steps or list(self.steps).index(dep) > list(self.steps).index(step.name):
+                    raise ValueError(f"步骤'{step.name}'的依赖'{dep}'不存在或未排在其前面")
+
+    def keys(self):
+        """每个步骤的内容哈希：由步骤名称、参数和依赖步骤的哈希决定"""
+        keys = {}
+        for name, step in self.steps.items():
+            payload = [PIPELINE_VERSION, self.salt, name, step.params, [keys[dep] for dep in step.deps]]
+            keys[name] = hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True,
+                                                 default=str).encode('utf-8')).hexdigest()
+        return keys
+
+    def _artifact_path(self, name, key):
+        return os.path.join(self.cache_dir, f'{name}-{key[:16]}.pkl')
+
+    def _is_cached(self, step, key):
+        path = self._artifact_path(step.name, key)
+        if not os.path.exists(path):
+            return False
+        if not step.outputs:
+            return True
+        # 写出文件的步骤：产物记录了文件哈希，文件缺失或被改动时重新执行
+        try:
+            with open(path, 'rb') as f:
+                recorded = pickle.load(f)['outputs']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            return False
+        return all(os.path.exists(output) and recorded.get(output) == _file_sha1(output)
+                   for output in step.outputs)
+
+    def _load_value(self, name, key):
+        with open(self._artifact_path(name, key), 'rb') as f:
+            return pickle.load(f)['value']
+
+    def _execute(self, step, key, args):
+        start = time.perf_counter()
+        value = step.func(*args, **step.params)
+        elapsed = time.perf_counter() - start
+
+        artifact = {'value': value,
+                    'outputs': {output: _file_sha1(output) for output in step.outputs if os.path.exists(output)}}
+        path = self._artifact_path(step.name, key)
+        tmp_path = path + f'.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return value, elapsed
+
+    def run(self, force=False):
+        """
+        执行DAG
+
+        参数:
+        force: bool - True时忽略缓存，全部重新执行
+
+        返回:
+        dict - {步骤名称: {'status': '缓存'|'执行', 'seconds': 耗时}}
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = self.keys()
+        cached = {name for name, step in self.steps.items() if not force and self._is_cached(step, keys[name])}
+        pending = [step for name, step in self.steps.items() if name not in cached]
+        report = {name: {'status': '缓存', 'seconds': 0.0} for name in cached}
+        values = {}
+
+        def value_of(name):
+            # 命中缓存的依赖只在确实有下游步骤需要执行时才从磁盘读取
+            if name not in values:
+                values[name] = self._load_value(name, keys[name])
+            return values[name]
+
+        done = set(cached)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for step in list(pending):
+                    if all(dep in done for dep in step.deps):
+                        args = [value_of(dep) for dep in step.deps]
+                        running[executor.submit(self._execute, step, keys[step.name], args)] = step
+                        pending.remove(step)
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    values[step.name], elapsed = future.result()
+                    report[step.name] = {'status': '执行', 'seconds': elapsed}
+                    done.add(step.name)
+        return {name: report[name] for name in self.steps}
+
+
+def _analyzer(**state):
+    """创建分析器并填入上游步骤的结果"""
+    from university_industry_cooperation_analysis import UniversityIndustryCooperationAnalyzer
+    analyzer = UniversityIndustryCooperationAnalyzer()
+    for name, value in state.items():
+        setattr(analyzer, name, value)
+    return analyzer
+
+
+def load_step(data_path, source_sha1=None):
+    analyzer = _analyzer(data_path=data_path)
+    if not analyzer.load_data():
+        raise RuntimeError(f"加载数据失败：{data_path}")
+    return analyzer.data
+
+
+def preprocess_step(data):
+    analyzer = _analyzer(data=data)
+    analyzer.preprocess_data()
+    return {'filtered_data': analyzer.filtered_data, 'keyword_masks': analyzer.keyword_masks}
+
+
+def trend_step(preprocessed):
+    analyzer = _analyzer(filtered_data=preprocessed['filtered_data'].copy())
+    analyzer.analyze_trend()
+    return {'filtered_data': analyzer.filtered_data, 'trend_data': analyzer.trend_data}
+
+
+def models_step(preprocessed):
+    analyzer = _analyzer(filtered_data=preprocessed['filtered_data'].copy(),
+                         keyword_masks=preprocessed['keyword_masks'])
+    analyzer.analyze_cooperation_models()
+    return analyzer.cooperation_model_data
+
+
+def institutions_step(preprocessed):
+    analyzer = _analyzer(filtered_data=preprocessed['filtered_data'].copy(),
+                         keyword_masks=preprocessed['keyword_masks'])
+    analyzer.analyze_institution_types()
+    return analyzer.institution_type_data
+
+
+def evaluate_step(trend, models, institutions):
+    analyzer = _analyzer(filtered_data=trend['filtered_data'], trend_data=trend['trend_data'],
+                         cooperation_model_data=models, institution_type_data=institutions)
+    analyzer.evaluate_implementation()
+    return analyzer.implementation_evaluation
+
+
+def export_step(trend):
+    _analyzer(filtered_data=trend['filtered_data']).export_filtered_data()
+
+
+def trend_charts_step(trend):
+    _analyzer(trend_data=trend['trend_data']).visualize_trend()
+
+
+def implementation_charts_step(models, institutions, evaluation):
+    _analyzer(cooperation_model_data=models, institution_type_data=institutions,
+              implementation_evaluation=evaluation).visualize_implementation()
+
+
+def build_analysis_pipeline(data_path=None, max_workers=4):
+    """
+    构建校企合作分析的DAG
+
+    参数:
+    data_path: str - 新闻CSV路径，默认与分析器相同
+    max_workers: int - 并行执行的线程数
+
+    返回:
+    PipelineRunner
+    """
+    from university_industry_cooperation_analysis import UniversityIndustryCooperationAnalyzer
+    if data_path is None:
+        data_path = UniversityIndustryCooperationAnalyzer().data_path
+    data_path = os.path.abspath(data_path)
+    # 分析代码本身也参与哈希，修改代码后产物自动失效
+    salt = ''.join(_file_sha1(os.path.join(MODULE_DIR, name))
+                   for name in ('university_industry_cooperation_analysis.py', 'keyword_matcher.py',
+                                'chart_export.py', 'pipeline_runner.py'))
+    steps = [
+        Step('load', load_step, params={'data_path': data_path, 'source_sha1': _file_sha1(data_path)}),
+        Step('preprocess', preprocess_step, ['load']),
+        Step('trend', trend_step, ['preprocess']),
+        Step('models', models_step, ['preprocess']),
+        Step('institutions', institutions_step, ['preprocess']),
+        Step('evaluate', evaluate_step, ['trend', 'models', 'institutions']),
+        Step('export', export_step, ['trend'], outputs=['results/filtered_cooperation_data.csv']),
+        # 图表由chart_export在子进程中用面向对象的Agg接口绘制，两个图表步骤可以同时执行
+        Step('trend_charts', trend_charts_step, ['trend'],
+             outputs=['results/monthly_trend.png', 'results/yearly_trend.png']),
+        Step('implementation_charts', implementation_charts_step, ['models', 'institutions', 'evaluate'],
+             outputs=['results/cooperation_model_distribution.png',
+                      'results/institution_type_distribution.png',
+                      'results/implementation_radar_chart.png']),
+    ]
+    return PipelineRunner(steps, os.path.join(cache_dir_for(data_path), 'pipeline'), salt, max_workers)
+
+
+def run_pipeline(data_path=None, force=False, max_workers=4):
+    """执行校企合作分析DAG并打印各步骤的状态和耗时，返回执行报告"""
+    if not os.path.exists('results'):
+        os.makedirs('results')
+    runner = build_analysis_pipeline(data_path, max_workers)
+    start = time.perf_counter()
+    report = runner.run(force=force)
+    print("\n===== 步骤执行情况 =====")
+    for name, item in report.items():
+        print(f"{name:<24}{item['status']}  {item['seconds']:.3f}秒")
+    print(f"总耗时{time.perf_counter() - start:.3f}秒")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='以DAG方式执行校企合作分析')
+    parser.add_argument('--data', help='新闻CSV路径')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新执行')
+    parser.add_argument('--workers', type=int, default=4, help='并行执行的线程数')
+    args = parser.parse_args()
+    run_pipeline(args.data, args.force, args.workers)
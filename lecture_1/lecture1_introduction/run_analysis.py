@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 """西南财经大学与金融机构校企合作模式分析执行脚本"""
 
+import argparse
 import os
 import subprocess
 import sys
 
-def run_jupyter_notebook():
+# 执行分析所需的本地模块；只有这些模块本身缺失时才提示“找不到模块”
+ANALYSIS_MODULES = ('university_industry_cooperation_analysis', 'pipeline_runner')
+
+def run_jupyter_notebook(incremental=False, force=False, workers=4):
     """运行Jupyter Notebook中的数据分析流程"""
     print("===== 开始运行校企合作数据分析 ====")
     
@@ -37,14 +41,23 @@ def run_jupyter_notebook():
         os.makedirs('results')
         print("创建results文件夹用于存储分析结果")
     
-    # 运行Python分析脚本
+    # 在当前进程中执行分析：默认按DAG执行（输入未变的步骤直接使用缓存），
+    # 增量模式只处理上次运行之后新抓取的新闻
     try:
-        print("正在运行数据分析脚本...")
+        print("正在运行数据分析...")
         # 获取当前脚本所在目录
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        analysis_script = os.path.join(script_dir, 'university_industry_cooperation_analysis.py')
-        subprocess.check_call([sys.executable, analysis_script])
-        print("数据分析脚本运行完成")
+        if script_dir not in sys.path:
+            sys.path.insert(0, script_dir)
+        if incremental:
+            from university_industry_cooperation_analysis import UniversityIndustryCooperationAnalyzer
+            analyzer = UniversityIndustryCooperationAnalyzer()
+            if not analyzer.load_data() or not analyzer.run_incremental():
+                return False
+        else:
+            from pipeline_runner import run_pipeline
+            run_pipeline(force=force, max_workers=workers)
+        print("数据分析运行完成")
         
         # 提示用户查看结果
         print("\n===== 数据分析完成 ====")
@@ -55,15 +68,24 @@ def run_jupyter_notebook():
         print("\n建议在Jupyter Notebook中查看详细分析结果和图表：week1_homework.ipynb")
         
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"数据分析脚本运行失败：{e}")
+    except ImportError as e:
+        if e.name not in ANALYSIS_MODULES:
+            # 分析模块内部的导入错误（如依赖缺失或拼写错误）不应被当作模块缺失
+            raise
+        print(f"找不到数据分析模块，请确保university_industry_cooperation_analysis.py文件存在：{e}")
         return False
-    except FileNotFoundError:
-        print("找不到数据分析脚本，请确保university_industry_cooperation_analysis.py文件存在")
+    except Exception as e:
+        print(f"数据分析运行失败：{e}")
         return False
 
 if __name__ == "__main__":
-    success = run_jupyter_notebook()
+    parser = argparse.ArgumentParser(description='运行校企合作数据分析')
+    parser.add_argument('--incremental', action='store_true', help='增量分析：只处理上次运行之后新增的新闻')
+    parser.add_argument('--force', action='store_true', help='忽略步骤缓存，全部重新执行')
+    parser.add_argument('--workers', type=int, default=4, help='并行执行的线程数')
+    args = parser.parse_args()
+    
+    success = run_jupyter_notebook(args.incremental, args.force, args.workers)
     if not success:
         print("\n分析过程中出现错误，请检查上述错误信息并尝试解决问题后重新运行。")
     
@@ -2,41 +2,296 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import re
-from datetime import datetime
 import os
+import argparse
+import hashlib
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from chart_export import DEFAULT_DPI, PREVIEW_DPI, export_charts
+from data_cache import cache_dir_for
+import instrumentation
+from instrumentation import instrumented
+from keyword_matcher import KeywordMatcher
+from news_index import open_index, row_keys
 
 # 设置中文显示 - 优先使用Windows系统常用字体
 plt.rcParams["font.family"] = ["SimHei"]
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
+# 新闻日期格式：按分隔符识别，含'.'的优先按'%Y.%m.%d'解析
+NEWS_DATE_FORMATS = [('.', '%Y.%m.%d'), ('-', '%Y-%m-%d')]
+
+# 已解析日期字符串的缓存（字符串 -> datetime64，无法解析的记为NaT），新闻日期大量重复
+_date_cache = pd.Series(dtype='datetime64[us]')
+DATE_CACHE_LIMIT = 100000
+
+
+@instrumented('parse_news_dates', rows=lambda result, dates: len(dates))
+def parse_news_dates(dates):
+    """
+    向量化解析新闻日期
+    
+    只解析去重后的日期字符串，并跳过缓存中已有的；未见过的字符串按分隔符分组，
+    每组用pd.to_datetime整体转换。不是字符串、没有可识别分隔符或格式不符的记为NaT。
+    
+    参数:
+    dates: Series - 原始日期列
+    
+    返回:
+    tuple - (datetime64类型的Series，无法解析的记录数)
+    """
+    global _date_cache
+    codes, uniques = pd.factorize(dates)
+    uniques = pd.Series(uniques, dtype=object)
+    
+    known = uniques.isin(_date_cache.index)
+    unseen = uniques[~known]
+    if len(unseen):
+        parsed = pd.Series(pd.NaT, index=unseen.index, dtype=_date_cache.dtype)
+        is_text = np.fromiter((isinstance(v, str) for v in unseen), dtype=bool, count=len(unseen))
+        text = unseen[is_text].astype(str)
+        unmatched = pd.Series(True, index=text.index)
+        for separator, date_format in NEWS_DATE_FORMATS:
+            group = unmatched & text.str.contains(separator, regex=False)
+            if group.any():
+                parsed[group[group].index] = pd.to_datetime(text[group], format=date_format, errors='coerce')
+            unmatched &= ~group
+        if len(_date_cache) + len(unseen) > DATE_CACHE_LIMIT:
+            _date_cache = _date_cache.iloc[:0]
+        _date_cache = pd.concat([_date_cache, pd.Series(parsed.to_numpy(), index=unseen.to_numpy())])
+    
+    values = _date_cache.reindex(uniques.to_numpy()).to_numpy()
+    # factorize把缺失值编码为-1，对应结果为NaT
+    result = np.full(len(codes), np.datetime64('NaT'), dtype=values.dtype)
+    result[codes >= 0] = values[codes[codes >= 0]]
+    result = pd.Series(result, index=dates.index, name=dates.name)
+    return result, int(result.isna().sum())
+
+
+def category_labels(matcher, masks, categories, prefix, default):
+    """
+    由关键词位掩码得到分类标签
+    
+    参数:
+    matcher: KeywordMatcher - 编译好的关键词自动机
+    masks: ndarray - 文档位掩码
+    categories: dict - {类别: 关键词列表}，关键词为空的类别不参与匹配
+    prefix: str - 类别在自动机中的组名前缀
+    default: str - 未命中任何类别时的标签
+    """
+    names = [prefix + name for name, keywords in categories.items() if keywords]
+    labels = matcher.classify(masks, names, default)
+    return [label.replace(prefix, '', 1) for label in labels]
+
+
+def category_codes(matcher, masks, categories, prefix, default):
+    """
+    与category_labels的分类规则相同，但直接生成以categories的键为类别的Categorical，
+    每行只存一个int8编码，不生成逐行的字符串
+    """
+    names = list(categories)
+    codes = np.full(len(masks), names.index(default), dtype=np.int8)
+    for code, (name, keywords) in enumerate(categories.items()):
+        if keywords:
+            codes[matcher.has(masks, prefix + name)] = code
+    return pd.Categorical.from_codes(codes, categories=names)
+
+
+def lean_string_dtype():
+    """精简模式下文本列的类型：安装了pyarrow时为Arrow字符串，否则返回None（保持默认类型）"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype('pyarrow')
+
+
+# 并行模式下工作进程持有的关键词自动机，由进程池的initializer在每个进程中设置一次
+_shard_matcher = None
+
+
+def _init_shard_worker(matcher):
+    global _shard_matcher
+    _shard_matcher = matcher
+
+
+def _classify_shard(shard_id, offset, titles, texts):
+    """
+    在工作进程中处理一个分片：筛选合作新闻并分类合作模式和机构类型
+    
+    返回:
+    dict - 命中行在全体数据中的位置、位掩码、两类标签、分片行数、耗时和进程号
+    """
+    start = time.perf_counter()
+    cls = UniversityIndustryCooperationAnalyzer
+    masks = _shard_matcher.scan_documents(titles, texts)
+    keep = _shard_matcher.has(masks, '金融机构') & _shard_matcher.has(masks, '合作')
+    matched = masks[keep]
+    return {
+        'shard': shard_id,
+        'positions': np.flatnonzero(keep) + offset,
+        'masks': matched,
+        'cooperation_model': category_labels(_shard_matcher, matched, cls.COOPERATION_PATTERNS, '模式:', '其他合作'),
+        'institution_type': category_labels(_shard_matcher, matched, cls.INSTITUTION_TYPES, '机构:', '其他金融机构'),
+        'rows': len(titles),
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid()
+    }
+
+
 class UniversityIndustryCooperationAnalyzer:
     """西南财经大学与金融机构合作模式分析工具"""
     
+    # 金融机构关键词和合作关键词
+    FINANCIAL_INSTITUTIONS = ['银行', '保险', '证券', '基金', '金融', '银保监', '税务局', '财税', '投资', '会计师事务所', '财经', '民生银行', '四川银行']
+    COOPERATION_TERMS = ['合作', '协议', '签署', '共建', '战略', '基地', '产学研']
+    
+    # 合作模式分类（后面的类别优先，未命中任何类别时为'其他合作'）
+    COOPERATION_PATTERNS = {
+        '战略合作协议': ['战略', '合作协议', '战略合作'],
+        '产学研合作': ['产学研', '研究', '协同创新'],
+        '实习基地': ['实习', '实践', '基地'],
+        '人才培养': ['人才', '培养', '教育', '教学'],
+        '科研项目': ['科研', '项目', '课题', '研究'],
+        '其他合作': []
+    }
+    
+    # 机构类型关键词（后面的类别优先，未命中任何类别时为'其他金融机构'）
+    INSTITUTION_TYPES = {
+        '银行': ['银行', '银保监'],
+        '保险机构': ['保险', '财险', '寿险'],
+        '证券/基金': ['证券', '基金', '券商'],
+        '会计师事务所': ['会计师事务所', '审计', '会计'],
+        '政府部门': ['税务局', '财税', '财政', '政府'],
+        '其他金融机构': []
+    }
+    
+    # 分类阶段追加的列
+    LABEL_COLUMNS = ['cooperation_model', 'institution_type']
+    
+    # 流式模式下每次读取的行数
+    DEFAULT_CHUNK_SIZE = 10000
+    
+    # 增量分析检查点格式版本号
+    CHECKPOINT_VERSION = 2
+    
+    # 精简模式下以Arrow字符串读取的文本列
+    LEAN_STRING_COLUMNS = ['title', 'text']
+    
     def __init__(self):
         self.data = None
         self.filtered_data = None
         self.trend_data = None
+        self.keyword_masks = None
+        self.index = None
+        self.loaded_path = None
+        self.unparseable_dates = 0
+        # 图表输出格式、分辨率和绘图进程数（None表示每张图表一个进程）
+        self.chart_format = 'png'
+        self.chart_dpi = DEFAULT_DPI
+        self.chart_workers = None
+        # 精简模式：文本列用Arrow字符串、分类标签用Categorical、年份用int16，预处理不复制整个语料
+        self.lean = False
         self.data_path = "../data/swufe/swufe_news.csv"
-        
+        self.alternate_data_path = "c:\\Users\\Nanzheng\\大二上\\金融数据分析与可视化\\第一周\\financial_data_analysis\\financial_data_analysis\\data\\swufe\\swufe_news.csv"
+        self.matcher = self.build_matcher()
+    
+    @classmethod
+    def keyword_groups(cls):
+        """筛选和两类分类用到的全部关键词组，组的顺序决定位掩码中的位号"""
+        groups = {'金融机构': cls.FINANCIAL_INSTITUTIONS, '合作': cls.COOPERATION_TERMS}
+        for model, keywords in cls.COOPERATION_PATTERNS.items():
+            if keywords:
+                groups['模式:' + model] = keywords
+        for inst_type, keywords in cls.INSTITUTION_TYPES.items():
+            if keywords:
+                groups['机构:' + inst_type] = keywords
+        return groups
+    
+    @classmethod
+    def build_matcher(cls):
+        """把全部关键词组编译为一个自动机"""
+        return KeywordMatcher(cls.keyword_groups())
+    
+    def _filtered_keyword_masks(self):
+        """返回与filtered_data逐行对应的关键词组位掩码，缺失时重新扫描"""
+        index = self.filtered_data.index
+        if self.keyword_masks is None or not index.isin(self.keyword_masks.index).all():
+            masks = self.matcher.scan_documents(self.filtered_data['title'].to_numpy(),
+                                                self.filtered_data['text'].to_numpy())
+            self.keyword_masks = pd.Series(masks, index=index)
+        # filtered_data排序后行顺序会变化，按索引取回对应的掩码
+        return self.keyword_masks.reindex(index).to_numpy()
+    
+    def _cooperation_model_labels(self, masks):
+        """由关键词位掩码得到合作模式标签（精简模式下为Categorical）"""
+        labels = category_codes if self.lean else category_labels
+        return labels(self.matcher, masks, self.COOPERATION_PATTERNS, '模式:', '其他合作')
+    
+    def _institution_type_labels(self, masks):
+        """由关键词位掩码得到机构类型标签（精简模式下为Categorical）"""
+        labels = category_codes if self.lean else category_labels
+        return labels(self.matcher, masks, self.INSTITUTION_TYPES, '机构:', '其他金融机构')
+    
+    @staticmethod
+    def _label_counts(labels):
+        """统计各标签的数量"""
+        if not isinstance(labels.dtype, pd.CategoricalDtype):
+            return labels.value_counts()
+        # 对编码计数：与字符串标签一样只列出出现过的类别，同数时按首次出现的顺序排列
+        counts = labels.cat.codes.value_counts()
+        counts.index = pd.Index(labels.cat.categories[counts.index.to_numpy()], name=labels.name)
+        return counts
+    
+    def _read_csv(self, path):
+        if not self.lean:
+            return pd.read_csv(path)
+        dtype = lean_string_dtype()
+        if dtype is None:
+            return pd.read_csv(path)
+        # pyarrow解析器直接生成Arrow列，文本不经过逐行的Python字符串
+        return pd.read_csv(path, engine='pyarrow', dtype={column: dtype for column in self.LEAN_STRING_COLUMNS})
+        
+    @instrumented('analyzer.load_data', rows='data')
     def load_data(self):
         """加载原始新闻数据"""
         try:
             # 读取CSV文件
-            self.data = pd.read_csv(self.data_path)
+            self.data = self._read_csv(self.data_path)
+            self.loaded_path = self.data_path
             print(f"成功加载数据，共{len(self.data)}条记录")
             return True
         except Exception as e:
             print(f"加载数据失败：{e}")
             # 尝试备用路径
             try:
-                alternate_path = "c:\\Users\\Nanzheng\\大二上\\金融数据分析与可视化\\第一周\\financial_data_analysis\\financial_data_analysis\\data\\swufe\\swufe_news.csv"
-                self.data = pd.read_csv(alternate_path)
+                self.data = self._read_csv(self.alternate_data_path)
+                self.loaded_path = self.alternate_data_path
                 print(f"成功从备用路径加载数据，共{len(self.data)}条记录")
                 return True
             except Exception as e2:
                 print(f"备用路径加载失败：{e2}")
                 return False
     
+    @instrumented('analyzer.load_index', rows='index')
+    def load_index(self):
+        """
+        打开新闻倒排索引（见news_index.py），首次调用时建立，之后只加入未见过或内容变化的新闻
+        
+        加载索引后，preprocess_data的关键词筛选改为求倒排表的交集，不再扫描文本
+        """
+        if self.data is None:
+            print("请先加载数据")
+            return False
+        dates, _ = parse_news_dates(self.data['date'])
+        self.index = open_index(self.loaded_path, self.data, dates)
+        print(f"倒排索引已加载：{len(self.index)}篇新闻，{len(self.index.terms)}个词项")
+        return True
+    
+    @instrumented('analyzer.preprocess_data', rows='filtered_data')
     def preprocess_data(self):
         """数据预处理"""
         if self.data is None:
@@ -44,44 +299,383 @@ class UniversityIndustryCooperationAnalyzer:
             return False
         
         # 1. 数据清洗
-        # 复制数据以避免修改原始数据
-        cleaned_data = self.data.copy()
+        # 复制数据以避免修改原始数据；精简模式不复制，解析后的日期只写入筛选结果
+        cleaned_data = self.data if self.lean else self.data.copy()
         
         # 2. 处理日期格式
-        def parse_date(date_str):
-            try:
-                # 尝试多种日期格式
-                if '.' in date_str:
-                    return datetime.strptime(date_str, '%Y.%m.%d')
-                elif '-' in date_str:
-                    return datetime.strptime(date_str, '%Y-%m-%d')
-                else:
-                    return None
-            except:
-                return None
-        
-        cleaned_data['date'] = cleaned_data['date'].apply(parse_date)
+        dates, self.unparseable_dates = parse_news_dates(cleaned_data['date'])
+        if not self.lean:
+            cleaned_data['date'] = dates
+        if self.unparseable_dates:
+            print(f"有{self.unparseable_dates}条记录的日期无法解析")
         
         # 3. 过滤出校企合作相关的新闻
-        # 定义金融机构关键词和合作关键词
-        financial_institutions = ['银行', '保险', '证券', '基金', '金融', '银保监', '税务局', '财税', '投资', '会计师事务所', '财经', '民生银行', '四川银行']
-        cooperation_terms = ['合作', '协议', '签署', '共建', '战略', '基地', '产学研']
-        
-        # 创建正则表达式模式
-        finance_pattern = '|'.join(financial_institutions)
-        cooperation_pattern = '|'.join(cooperation_terms)
+        # 每篇新闻的标题和正文只扫描一遍，得到全部关键词组的命中位掩码；已加载倒排索引时直接查询倒排表
+        if self.index is not None:
+            # 行键由原始日期字符串计算，因此使用self.data而不是已替换日期的cleaned_data
+            masks = self.index.group_masks(self.keyword_groups(), row_keys(self.data))
+        elif self.lean:
+            # 直接迭代Arrow字符串列，不先转换为整列的object数组
+            masks = self.matcher.scan_documents(cleaned_data['title'], cleaned_data['text'])
+        else:
+            masks = self.matcher.scan_documents(cleaned_data['title'].to_numpy(), cleaned_data['text'].to_numpy())
         
         # 筛选包含金融机构和合作关键词的新闻
-        filtered_mask = (cleaned_data['title'].str.contains(finance_pattern, case=False, na=False) | 
-                         cleaned_data['text'].str.contains(finance_pattern, case=False, na=False)) & (cleaned_data['title'].str.contains(cooperation_pattern, case=False, na=False) |
-                         cleaned_data['text'].str.contains(cooperation_pattern, case=False, na=False))
-        
-        self.filtered_data = cleaned_data[filtered_mask].copy()
+        filtered_mask = self.matcher.has(masks, '金融机构') & self.matcher.has(masks, '合作')
+        
+        if self.lean:
+            # 布尔索引本身只生成命中行的新DataFrame，不需要再复制
+            self.filtered_data = cleaned_data[filtered_mask].assign(date=dates[filtered_mask])
+        else:
+            self.filtered_data = cleaned_data[filtered_mask].copy()
+        # 保留位掩码供后续分类使用，按索引与filtered_data对齐
+        self.keyword_masks = pd.Series(masks[filtered_mask], index=self.filtered_data.index)
         self.filtered_data = self.filtered_data.sort_values('date')
         
         print(f"筛选出校企合作相关新闻{len(self.filtered_data)}条")
         return True
     
+    def _read_chunks(self, chunk_size):
+        """按块读取原始新闻数据"""
+        path = self.data_path if os.path.exists(self.data_path) else self.alternate_data_path
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            self.streamed_rows += len(chunk)
+            yield chunk
+    
+    def _parse_chunks(self, chunks):
+        """解析每块的日期，累计无法解析的记录数"""
+        for chunk in chunks:
+            chunk['date'], unparseable = parse_news_dates(chunk['date'])
+            self.unparseable_dates += unparseable
+            yield chunk
+    
+    def _filter_chunks(self, chunks):
+        """只保留同时包含金融机构和合作关键词的新闻，连同其关键词位掩码一起向下传递"""
+        for chunk in chunks:
+            masks = self.matcher.scan_documents(chunk['title'].to_numpy(), chunk['text'].to_numpy())
+            keep = self.matcher.has(masks, '金融机构') & self.matcher.has(masks, '合作')
+            yield chunk[keep].copy(), masks[keep]
+    
+    def _classify_chunks(self, chunks):
+        """为每块筛选结果标注合作模式和机构类型"""
+        for chunk, masks in chunks:
+            # 显式指定字符串类型，使空块与非空块拼接后的列类型与逐步执行时一致
+            chunk['cooperation_model'] = pd.Series(self._cooperation_model_labels(masks), index=chunk.index, dtype=str)
+            chunk['institution_type'] = pd.Series(self._institution_type_labels(masks), index=chunk.index, dtype=str)
+            yield chunk, masks
+    
+    @instrumented('analyzer.process_streaming', rows='filtered_data')
+    def process_streaming(self, chunk_size=None):
+        """
+        流式处理模式：按块读取CSV，经 解析 -> 筛选 -> 分类 -> 汇总 的生成器流水线处理
+        
+        内存中只保留月度/年度计数和筛选出的新闻，峰值内存与语料规模无关；
+        完成后filtered_data、trend_data、cooperation_model_data和institution_type_data
+        与逐步调用load_data、preprocess_data、analyze_trend、analyze_cooperation_models、
+        analyze_institution_types的结果相同。
+        
+        参数:
+        chunk_size: int - 每块的行数，默认DEFAULT_CHUNK_SIZE
+        """
+        chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self.streamed_rows = 0
+        self.unparseable_dates = 0
+        
+        monthly = Counter()
+        yearly = Counter()
+        matched = []
+        matched_masks = []
+        try:
+            pipeline = self._classify_chunks(self._filter_chunks(self._parse_chunks(self._read_chunks(chunk_size))))
+            for chunk, masks in pipeline:
+                monthly.update(chunk['date'].dt.to_period('M').value_counts().to_dict())
+                yearly.update(chunk['date'].dt.year.value_counts().to_dict())
+                matched.append(chunk)
+                matched_masks.append(pd.Series(masks, index=chunk.index))
+        except Exception as e:
+            print(f"流式处理失败：{e}")
+            return False
+        
+        if not matched:
+            print("没有读取到任何记录")
+            return False
+        print(f"成功处理数据，共{self.streamed_rows}条记录")
+        if self.unparseable_dates:
+            print(f"有{self.unparseable_dates}条记录的日期无法解析")
+        
+        # 列顺序与逐步执行时一致：原始列、趋势分析列、分类列
+        filtered_data = pd.concat(matched).sort_values('date')
+        base_columns = [c for c in filtered_data.columns if c not in self.LABEL_COLUMNS]
+        filtered_data['year_month'] = filtered_data['date'].dt.to_period('M')
+        filtered_data['year'] = filtered_data['date'].dt.year
+        self.filtered_data = filtered_data[base_columns + ['year_month', 'year'] + self.LABEL_COLUMNS]
+        self.keyword_masks = pd.concat(matched_masks)
+        print(f"筛选出校企合作相关新闻{len(self.filtered_data)}条")
+        
+        months = sorted(monthly)
+        monthly_counts = pd.DataFrame({
+            'year_month': pd.array(months, dtype='period[M]'),
+            'count': np.array([monthly[m] for m in months], dtype=np.int64)
+        })
+        monthly_counts['date'] = monthly_counts['year_month'].dt.to_timestamp()
+        years = sorted(yearly)
+        yearly_counts = pd.DataFrame({
+            'year': np.array(years, dtype=self.filtered_data['year'].dtype),
+            'count': np.array([yearly[y] for y in years], dtype=np.int64)
+        })
+        self.trend_data = {
+            'monthly': monthly_counts,
+            'yearly': yearly_counts
+        }
+        print("时间趋势分析完成")
+        
+        self._summarize_cooperation_models()
+        self._summarize_institution_types()
+        return True
+    
+    @instrumented('analyzer.process_parallel', rows='filtered_data')
+    def process_parallel(self, workers=None, shards=None):
+        """
+        并行处理模式：把语料按行切分为若干分片，在进程池中分别完成筛选、合作模式分类和机构类型分类
+        
+        关键词自动机通过进程池的initializer在每个工作进程中只传递一次；各分片的结果按分片顺序合并，
+        与工作进程数和完成顺序无关。完成后filtered_data、cooperation_model_data和institution_type_data
+        与依次调用preprocess_data、analyze_cooperation_models、analyze_institution_types的结果相同。
+        
+        参数:
+        workers: int - 工作进程数，默认为CPU核数
+        shards: int - 分片数，默认为工作进程数的4倍
+        """
+        if self.data is None:
+            print("请先加载数据")
+            return False
+        
+        workers = workers or os.cpu_count() or 1
+        shards = max(1, min(shards or workers * 4, len(self.data)))
+        
+        cleaned_data = self.data.copy()
+        cleaned_data['date'], self.unparseable_dates = parse_news_dates(cleaned_data['date'])
+        if self.unparseable_dates:
+            print(f"有{self.unparseable_dates}条记录的日期无法解析")
+        
+        titles = cleaned_data['title'].to_numpy()
+        texts = cleaned_data['text'].to_numpy()
+        bounds = np.linspace(0, len(cleaned_data), shards + 1).astype(int)
+        
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker,
+                                 initargs=(self.matcher,)) as executor:
+            futures = [executor.submit(_classify_shard, i, lo, titles[lo:hi], texts[lo:hi])
+                       for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))]
+            results = sorted((future.result() for future in futures), key=lambda r: r['shard'])
+        elapsed = time.perf_counter() - start
+        
+        positions = np.concatenate([r['positions'] for r in results])
+        filtered_data = cleaned_data.iloc[positions].copy()
+        for column in self.LABEL_COLUMNS:
+            labels = [label for r in results for label in r[column]]
+            filtered_data[column] = pd.Series(labels, index=filtered_data.index, dtype=str)
+        self.keyword_masks = pd.Series(np.concatenate([r['masks'] for r in results]), index=filtered_data.index)
+        self.filtered_data = filtered_data.sort_values('date')
+        
+        self.shard_timings = pd.DataFrame([{
+            '分片': r['shard'], '进程': r['pid'], '行数': r['rows'],
+            '命中数': len(r['positions']), '耗时(秒)': round(r['seconds'], 4)
+        } for r in results])
+        busy = self.shard_timings['耗时(秒)'].sum()
+        print(f"{workers}个工作进程处理{shards}个分片，总耗时{elapsed:.3f}秒，"
+              f"分片耗时合计{busy:.3f}秒（并行度{busy / max(elapsed, 1e-9):.2f}）")
+        print(self.shard_timings.to_string(index=False))
+        print(f"筛选出校企合作相关新闻{len(self.filtered_data)}条")
+        
+        self._summarize_cooperation_models()
+        self._summarize_institution_types()
+        return True
+    
+    def checkpoint_dir(self):
+        """增量分析检查点目录：新闻CSV解析缓存目录下的analysis_state/"""
+        return os.path.join(cache_dir_for(self.loaded_path), 'analysis_state')
+    
+    def _config_hash(self):
+        """关键词配置和检查点格式的哈希，任一变化后旧检查点失效"""
+        config = json.dumps([self.CHECKPOINT_VERSION, self.keyword_groups()], ensure_ascii=False)
+        return hashlib.sha1(config.encode('utf-8')).hexdigest()
+    
+    def _load_checkpoint(self):
+        """读取检查点，返回(状态, 已匹配新闻)；没有可用检查点时返回(None, None)"""
+        checkpoint_dir = self.checkpoint_dir()
+        try:
+            with open(os.path.join(checkpoint_dir, 'state.json'), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('config') != self._config_hash():
+                print("关键词配置或检查点格式已变化，检查点失效")
+                return None, None
+            matched = pd.read_pickle(os.path.join(checkpoint_dir, 'matched.pkl'))
+        except (OSError, ValueError, KeyError, EOFError):
+            return None, None
+        return state, matched
+    
+    def _save_checkpoint(self, state, matched):
+        checkpoint_dir = self.checkpoint_dir()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        matched.to_pickle(os.path.join(checkpoint_dir, 'matched.pkl'))
+        # 状态文件最后写入，存在状态文件即表示检查点完整
+        tmp_path = os.path.join(checkpoint_dir, 'state.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(checkpoint_dir, 'state.json'))
+    
+    def _empty_state(self):
+        return {
+            'version': self.CHECKPOINT_VERSION,
+            'config': self._config_hash(),
+            # 已处理新闻的键（见news_index.row_keys）
+            'links': [],
+            # 月度计数及其一阶、二阶和，用于增量计算持续性指标
+            'monthly': {},
+            'monthly_sum': 0,
+            'monthly_sum_sq': 0,
+            'yearly': {},
+            'cooperation_model': {},
+            'institution_type': {},
+            'charts': {}
+        }
+    
+    @staticmethod
+    def _count_series(counter, labels, name):
+        """由计数字典得到与value_counts相同排列的计数序列（计数降序，同数时按首次出现的顺序）"""
+        counts = pd.Series({label: counter[label] for label in pd.unique(labels)}, dtype=np.int64)
+        counts.index.name = name
+        return counts.sort_values(ascending=False).rename('count')
+    
+    def _chart_inputs(self):
+        """每张图表的输入数据，用于判断图表是否需要重新生成"""
+        evaluation = self.implementation_evaluation
+        return {
+            'monthly_trend': self.trend_data['monthly'][['year_month', 'count']].astype(str).values.tolist(),
+            'yearly_trend': self.trend_data['yearly'].astype(str).values.tolist(),
+            'cooperation_model_distribution': list(self.cooperation_model_data['counts'].astype(int).items()),
+            'institution_type_distribution': list(self.institution_type_data['counts'].astype(int).items()),
+            'implementation_radar_chart': [round(float(evaluation[key]), 10) for key in
+                                           ('model_diversity', 'institution_diversity', 'continuity_score')]
+        }
+    
+    @instrumented('analyzer.run_incremental', rows='filtered_data')
+    def run_incremental(self):
+        """
+        增量分析：只处理检查点之后新出现的新闻（按link判断，见news_index.row_keys）
+        
+        检查点保存已处理新闻的键、已匹配的新闻以及月度、年度、合作模式和机构类型的计数；
+        本次运行只对新增新闻做日期解析、关键词筛选和分类，再把结果累加到各项计数上，
+        评估指标由累加后的计数直接算出。只有输入发生变化（或文件缺失）的图表才重新生成。
+        数据中有检查点记录过、但已被删除的新闻时退回全量分析。
+        """
+        if self.data is None and not self.load_data():
+            return False
+        
+        state, matched = self._load_checkpoint()
+        keys = row_keys(self.data)
+        if state is not None and not pd.Index(state['links']).isin(keys).all():
+            print("检查点中的部分新闻已不在数据中，重新全量分析")
+            state = None
+        if state is None:
+            state, matched = self._empty_state(), None
+        
+        is_new = ~keys.isin(state['links'])
+        new_data = self.data[is_new].copy()
+        new_keys = keys[is_new]
+        print(f"检查点中已处理{len(state['links'])}条新闻，本次新增{len(new_data)}条")
+        
+        # 只对新增新闻做解析、筛选和分类
+        new_data['date'], self.unparseable_dates = parse_news_dates(new_data['date'])
+        if self.unparseable_dates:
+            print(f"有{self.unparseable_dates}条新增记录的日期无法解析")
+        masks = self.matcher.scan_documents(new_data['title'].to_numpy(), new_data['text'].to_numpy())
+        keep = self.matcher.has(masks, '金融机构') & self.matcher.has(masks, '合作')
+        new_matched = new_data[keep].set_axis(new_keys[keep])
+        new_matched['cooperation_model'] = pd.Series(self._cooperation_model_labels(masks[keep]),
+                                                     index=new_matched.index, dtype=str)
+        new_matched['institution_type'] = pd.Series(self._institution_type_labels(masks[keep]),
+                                                    index=new_matched.index, dtype=str)
+        print(f"新增校企合作相关新闻{len(new_matched)}条")
+        
+        # 累加各项计数
+        monthly = state['monthly']
+        for month, k in new_matched['date'].dt.strftime('%Y-%m').value_counts().items():
+            c = monthly.get(month, 0)
+            monthly[month] = c + int(k)
+            state['monthly_sum'] += int(k)
+            state['monthly_sum_sq'] += (c + int(k)) ** 2 - c ** 2
+        for year, k in new_matched['date'].dt.year.dropna().astype(int).value_counts().items():
+            state['yearly'][str(year)] = state['yearly'].get(str(year), 0) + int(k)
+        for column in self.LABEL_COLUMNS:
+            for label, k in new_matched[column].value_counts().items():
+                state[column][label] = state[column].get(label, 0) + int(k)
+        state['links'].extend(new_keys.tolist())
+        
+        # 检查点中的已匹配新闻以键为索引；分析结果按其在当前数据中的行号排列后再按日期排序，
+        # 与全量分析的行顺序一致
+        matched = new_matched if matched is None else pd.concat([matched, new_matched])
+        self._save_checkpoint(state, matched)
+        positions = pd.Series(np.arange(len(self.data)), index=keys)
+        
+        base_columns = [c for c in matched.columns if c not in self.LABEL_COLUMNS]
+        filtered_data = matched.set_axis(positions.reindex(matched.index).to_numpy())
+        filtered_data = filtered_data.sort_index().sort_values('date')
+        filtered_data['year_month'] = filtered_data['date'].dt.to_period('M')
+        filtered_data['year'] = filtered_data['date'].dt.year
+        self.filtered_data = filtered_data[base_columns + ['year_month', 'year'] + self.LABEL_COLUMNS]
+        self.keyword_masks = None
+        print(f"筛选出校企合作相关新闻{len(self.filtered_data)}条")
+        
+        months = sorted(monthly)
+        monthly_counts = pd.DataFrame({
+            'year_month': pd.PeriodIndex(months, freq='M') if months else pd.PeriodIndex([], freq='M'),
+            'count': np.array([monthly[m] for m in months], dtype=np.int64)
+        })
+        monthly_counts['date'] = monthly_counts['year_month'].dt.to_timestamp()
+        years = sorted(state['yearly'], key=int)
+        yearly_counts = pd.DataFrame({
+            'year': np.array([int(y) for y in years], dtype=self.filtered_data['year'].dtype),
+            'count': np.array([state['yearly'][y] for y in years], dtype=np.int64)
+        })
+        self.trend_data = {
+            'monthly': monthly_counts,
+            'yearly': yearly_counts
+        }
+        self.cooperation_model_data = {
+            'counts': self._count_series(state['cooperation_model'], self.filtered_data['cooperation_model'],
+                                         'cooperation_model')
+        }
+        self.institution_type_data = {
+            'counts': self._count_series(state['institution_type'], self.filtered_data['institution_type'],
+                                         'institution_type')
+        }
+        
+        # 由月度计数的一阶、二阶和得到均值和样本标准差
+        n = len(monthly)
+        s1, s2 = state['monthly_sum'], state['monthly_sum_sq']
+        monthly_mean = s1 / n if n else np.nan
+        monthly_std = np.sqrt((n * s2 - s1 * s1) / (n * (n - 1))) if n > 1 else np.nan
+        self._record_evaluation(monthly_std, monthly_mean)
+        
+        # 只重新生成输入有变化的图表（输出格式和分辨率也参与判断）
+        updated = []
+        for name, inputs in self._chart_inputs().items():
+            inputs = [self.chart_format, self.chart_dpi, inputs]
+            digest = hashlib.sha1(json.dumps(inputs, ensure_ascii=False).encode('utf-8')).hexdigest()
+            if state['charts'].get(name) != digest or not os.path.exists(f'results/{name}.{self.chart_format}'):
+                state['charts'][name] = digest
+                updated.append(name)
+        if updated:
+            self.render_charts(updated)
+        if len(new_matched) or not os.path.exists('results/filtered_cooperation_data.csv'):
+            self.export_filtered_data(exclude=self.LABEL_COLUMNS)
+        self._save_checkpoint(state, matched)
+        print(f"重新生成的图表：{', '.join(updated) if updated else '无'}")
+        return True
+    
+    @instrumented('analyzer.analyze_trend', rows='filtered_data')
     def analyze_trend(self):
         """进行时间趋势分析"""
         if self.filtered_data is None:
@@ -90,7 +684,11 @@ class UniversityIndustryCooperationAnalyzer:
         
         # 按年份和月份统计合作数量
         self.filtered_data['year_month'] = self.filtered_data['date'].dt.to_period('M')
-        self.filtered_data['year'] = self.filtered_data['date'].dt.year
+        years = self.filtered_data['date'].dt.year
+        if self.lean:
+            # 有无法解析的日期时年份含缺失值，使用可空整数类型
+            years = years.astype('Int16' if years.isna().any() else 'int16')
+        self.filtered_data['year'] = years
         
         # 按月统计趋势
         monthly_counts = self.filtered_data.groupby('year_month').size().reset_index(name='count')
@@ -107,57 +705,44 @@ class UniversityIndustryCooperationAnalyzer:
         print("时间趋势分析完成")
         return True
     
+    def _chart_data(self, name):
+        """各图表的绘制数据，见chart_export.CHARTS"""
+        return {
+            'monthly_trend': lambda: self.trend_data['monthly'],
+            'yearly_trend': lambda: self.trend_data['yearly'],
+            'cooperation_model_distribution': lambda: self.cooperation_model_data['counts'],
+            'institution_type_distribution': lambda: self.institution_type_data['counts'],
+            'implementation_radar_chart': lambda: self.implementation_evaluation
+        }[name]()
+    
+    def render_charts(self, names):
+        """在进程池中绘制指定图表（每个进程一张），按chart_format和chart_dpi保存到results文件夹"""
+        timings = export_charts({name: self._chart_data(name) for name in names}, 'results',
+                                self.chart_format, self.chart_dpi, self.chart_workers)
+        for name, item in timings.items():
+            print(f"  {os.path.basename(item['path'])} 绘制耗时{item['seconds']:.3f}秒")
+        return timings
+    
+    @instrumented('analyzer.visualize_trend')
     def visualize_trend(self):
         """可视化时间趋势"""
         if self.trend_data is None:
             print("请先进行趋势分析")
             return False
         
-        # 创建结果文件夹
-        if not os.path.exists('results'):
-            os.makedirs('results')
-        
-        # 1. 月度趋势图
-        plt.figure(figsize=(14, 6))
-        plt.plot(self.trend_data['monthly']['date'], self.trend_data['monthly']['count'], 
-                 marker='o', linestyle='-', color='#1f77b4')
-        plt.title('西南财经大学与金融机构合作月度趋势（2020-2025）', fontsize=16)
-        plt.xlabel('日期', fontsize=12)
-        plt.ylabel('合作数量', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        
-        # 设置x轴刻度为每个数据点对应的月份
-        plt.xticks(self.trend_data['monthly']['date'], 
-                  [date.strftime('%Y-%m') for date in self.trend_data['monthly']['date']],
-                  rotation=45, ha='right', fontsize=8)
-        
-        plt.tight_layout()
-        plt.savefig('results/monthly_trend.png', dpi=300)
-        plt.close()
-        
-        # 2. 年度趋势图
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(self.trend_data['yearly']['year'].astype(str), self.trend_data['yearly']['count'], 
-                      color='#2ca02c', alpha=0.8)
-        plt.title('西南财经大学与金融机构合作年度趋势（2020-2025）', fontsize=16)
-        plt.xlabel('年份', fontsize=12)
-        plt.ylabel('合作数量', fontsize=12)
-        
-        # 在柱状图上添加数值标签
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1, 
-                     f'{int(height)}', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        plt.savefig('results/yearly_trend.png', dpi=300)
-        plt.close()
+        self.render_charts(['monthly_trend', 'yearly_trend'])
         
         print("趋势可视化完成，图表已保存到results文件夹")
         return True
     
-    def export_filtered_data(self):
-        """导出筛选后的数据"""
+    @instrumented('analyzer.export_filtered_data', rows='filtered_data')
+    def export_filtered_data(self, exclude=None):
+        """
+        导出筛选后的数据
+        
+        参数:
+        exclude: list - 不导出的列，流式模式用它去掉分类列，使导出文件与逐步执行时一致
+        """
         if self.filtered_data is None:
             print("没有可导出的数据")
             return False
@@ -167,40 +752,26 @@ class UniversityIndustryCooperationAnalyzer:
             os.makedirs('results')
         
         # 导出筛选后的数据
-        self.filtered_data.to_csv('results/filtered_cooperation_data.csv', index=False, encoding='utf-8-sig')
+        export_data = self.filtered_data if not exclude else self.filtered_data.drop(columns=exclude)
+        export_data.to_csv('results/filtered_cooperation_data.csv', index=False, encoding='utf-8-sig')
         print("筛选后的数据已导出到results/filtered_cooperation_data.csv")
         return True
     
+    @instrumented('analyzer.analyze_cooperation_models', rows='filtered_data')
     def analyze_cooperation_models(self):
         """分析校企合作模式"""
         if self.filtered_data is None:
             print("请先进行数据预处理")
             return False
         
-        # 定义合作模式分类
-        cooperation_patterns = {
-            '战略合作协议': ['战略', '合作协议', '战略合作'],
-            '产学研合作': ['产学研', '研究', '协同创新'],
-            '实习基地': ['实习', '实践', '基地'],
-            '人才培养': ['人才', '培养', '教育', '教学'],
-            '科研项目': ['科研', '项目', '课题', '研究'],
-            '其他合作': []
-        }
-        
-        # 为每条新闻分类合作模式
-        self.filtered_data['cooperation_model'] = '其他合作'
-        
-        for model, keywords in cooperation_patterns.items():
-            if model == '其他合作':
-                continue
-            
-            pattern = '|'.join(keywords)
-            mask = (self.filtered_data['title'].str.contains(pattern, case=False, na=False) |
-                   self.filtered_data['text'].str.contains(pattern, case=False, na=False))
-            self.filtered_data.loc[mask, 'cooperation_model'] = model
-        
+        # 为每条新闻分类合作模式：由预处理时得到的关键词位掩码直接推导，不再扫描文本
+        self.filtered_data['cooperation_model'] = self._cooperation_model_labels(self._filtered_keyword_masks())
+        self._summarize_cooperation_models()
+        return True
+    
+    def _summarize_cooperation_models(self):
         # 统计各合作模式数量
-        model_counts = self.filtered_data['cooperation_model'].value_counts()
+        model_counts = self._label_counts(self.filtered_data['cooperation_model'])
         
         # 保存分析结果
         self.cooperation_model_data = {
@@ -210,38 +781,22 @@ class UniversityIndustryCooperationAnalyzer:
         print("合作模式分析完成")
         print("各合作模式数量：")
         print(model_counts)
-        return True
     
+    @instrumented('analyzer.analyze_institution_types', rows='filtered_data')
     def analyze_institution_types(self):
         """分析合作机构类型分布"""
         if self.filtered_data is None:
             print("请先进行数据预处理")
             return False
         
-        # 定义机构类型关键词
-        institution_types = {
-            '银行': ['银行', '银保监'],
-            '保险机构': ['保险', '财险', '寿险'],
-            '证券/基金': ['证券', '基金', '券商'],
-            '会计师事务所': ['会计师事务所', '审计', '会计'],
-            '政府部门': ['税务局', '财税', '财政', '政府'],
-            '其他金融机构': []
-        }
-        
-        # 为每条新闻分类机构类型
-        self.filtered_data['institution_type'] = '其他金融机构'
-        
-        for inst_type, keywords in institution_types.items():
-            if inst_type == '其他金融机构':
-                continue
-            
-            pattern = '|'.join(keywords)
-            mask = (self.filtered_data['title'].str.contains(pattern, case=False, na=False) |
-                   self.filtered_data['text'].str.contains(pattern, case=False, na=False))
-            self.filtered_data.loc[mask, 'institution_type'] = inst_type
-        
+        # 为每条新闻分类机构类型：由预处理时得到的关键词位掩码直接推导，不再扫描文本
+        self.filtered_data['institution_type'] = self._institution_type_labels(self._filtered_keyword_masks())
+        self._summarize_institution_types()
+        return True
+    
+    def _summarize_institution_types(self):
         # 统计各机构类型数量
-        institution_counts = self.filtered_data['institution_type'].value_counts()
+        institution_counts = self._label_counts(self.filtered_data['institution_type'])
         
         # 保存分析结果
         self.institution_type_data = {
@@ -251,8 +806,8 @@ class UniversityIndustryCooperationAnalyzer:
         print("机构类型分析完成")
         print("各机构类型数量：")
         print(institution_counts)
-        return True
     
+    @instrumented('analyzer.evaluate_implementation')
     def evaluate_implementation(self):
         """成果落地评估"""
         if not hasattr(self, 'cooperation_model_data'):
@@ -263,6 +818,13 @@ class UniversityIndustryCooperationAnalyzer:
             print("请先分析机构类型")
             return False
         
+        # 计算月度合作数量的均值和标准差，用于持续性指标
+        monthly_std = self.trend_data['monthly']['count'].std()
+        monthly_mean = self.trend_data['monthly']['count'].mean()
+        self._record_evaluation(monthly_std, monthly_mean)
+        return True
+    
+    def _record_evaluation(self, monthly_std, monthly_mean):
         # 1. 计算合作深度指标
         # 计算合作模式多样性（熵值）
         model_probs = self.cooperation_model_data['counts'] / len(self.filtered_data)
@@ -274,8 +836,6 @@ class UniversityIndustryCooperationAnalyzer:
         
         # 2. 计算合作持续性指标（基于时间分布）
         # 计算月度合作数量的变异系数
-        monthly_std = self.trend_data['monthly']['count'].std()
-        monthly_mean = self.trend_data['monthly']['count'].mean()
         continuity_score = 1 - (monthly_std / (monthly_mean + 1e-9)) if monthly_mean > 0 else 0
         
         # 确保持续性得分在0-1之间
@@ -299,113 +859,115 @@ class UniversityIndustryCooperationAnalyzer:
         print(f"合作持续性得分: {continuity_score:.4f}")
         print(f"总体评估得分: {implementation_score:.4f}")
         print("========================")
-        
-        return True
     
+    @instrumented('analyzer.visualize_implementation')
     def visualize_implementation(self):
         """可视化成果落地评估结果"""
         if not hasattr(self, 'implementation_evaluation'):
             print("请先进行成果落地评估")
             return False
         
-        # 创建结果文件夹
-        if not os.path.exists('results'):
-            os.makedirs('results')
-        
-        # 1. 合作模式饼图
-        plt.figure(figsize=(10, 8))
-        model_counts = self.cooperation_model_data['counts']
-        plt.pie(model_counts.values, labels=model_counts.index, autopct='%1.1f%%',
-               startangle=90, shadow=True)
-        plt.title('西南财经大学与金融机构合作模式分布', fontsize=16)
-        plt.axis('equal')
-        plt.tight_layout()
-        plt.savefig('results/cooperation_model_distribution.png', dpi=300)
-        plt.close()
-        
-        # 2. 机构类型柱状图
-        plt.figure(figsize=(12, 6))
-        inst_counts = self.institution_type_data['counts']
-        bars = plt.bar(inst_counts.index, inst_counts.values, color='#9467bd', alpha=0.8)
-        plt.title('合作金融机构类型分布', fontsize=16)
-        plt.xlabel('机构类型', fontsize=12)
-        plt.ylabel('合作数量', fontsize=12)
-        
-        # 在柱状图上添加数值标签
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                     f'{int(height)}', ha='center', va='bottom')
-        
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.savefig('results/institution_type_distribution.png', dpi=300)
-        plt.close()
-        
-        # 3. 评估指标雷达图
-        metrics = ['模式多样性', '机构多样性', '合作持续性']
-        scores = [
-            self.implementation_evaluation['model_diversity'] / max(2, self.implementation_evaluation['model_diversity']),
-            self.implementation_evaluation['institution_diversity'] / max(2, self.implementation_evaluation['institution_diversity']),
-            self.implementation_evaluation['continuity_score']
-        ]
-        
-        # 确保所有得分在0-1之间
-        scores = [min(1, max(0, score)) for score in scores]
-        
-        # 雷达图数据准备
-        angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False).tolist()
-        scores = scores + scores[:1]
-        angles = angles + angles[:1]
-        metrics = metrics + metrics[:1]
-        
-        plt.figure(figsize=(10, 8))
-        ax = plt.subplot(111, polar=True)
-        ax.plot(angles, scores, 'o-', linewidth=2, color='#e377c2')
-        ax.fill(angles, scores, alpha=0.25, color='#e377c2')
-        ax.set_thetagrids(np.degrees(angles[:-1]), metrics[:-1])
-        ax.set_ylim(0, 1)
-        plt.title('校企合作成果落地评估雷达图', fontsize=16, pad=20)
-        plt.tight_layout()
-        plt.savefig('results/implementation_radar_chart.png', dpi=300)
-        plt.close()
+        self.render_charts(['cooperation_model_distribution', 'institution_type_distribution',
+                            'implementation_radar_chart'])
         
         print("成果落地评估可视化完成，图表已保存到results文件夹")
         return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='西南财经大学与金融机构合作模式分析')
+    parser.add_argument('--stream', action='store_true', help='流式处理模式：按块读取数据，峰值内存与语料规模无关')
+    parser.add_argument('--chunk-size', type=int, default=UniversityIndustryCooperationAnalyzer.DEFAULT_CHUNK_SIZE,
+                        help='流式处理模式下每块的行数')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量分析：只处理上次运行之后新增的新闻，只重新生成输入有变化的图表')
+    parser.add_argument('--index', action='store_true',
+                        help='使用新闻倒排索引完成关键词筛选（首次运行时建立索引，之后增量更新）')
+    parser.add_argument('--chart-format', choices=['png', 'svg', 'pdf'], default='png', help='图表输出格式')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help='图表分辨率')
+    parser.add_argument('--preview', action='store_true', help='快速预览：以低分辨率输出图表')
+    parser.add_argument('--chart-workers', type=int, default=None, help='绘图进程数，默认每张图表一个进程')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='并行处理模式的工作进程数，大于0时启用（筛选和分类在进程池中按分片执行）')
+    parser.add_argument('--lean', action='store_true',
+                        help='精简内存模式：Arrow字符串、Categorical标签、int16年份，预处理不复制语料')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+    
     # 创建分析器实例
     analyzer = UniversityIndustryCooperationAnalyzer()
+    analyzer.chart_format = args.chart_format
+    analyzer.chart_dpi = PREVIEW_DPI if args.preview else args.dpi
+    analyzer.chart_workers = args.chart_workers
+    analyzer.lean = args.lean
     
     # 执行数据读取、预处理和趋势分析
     print("===== 开始校企合作数据分析 ====")
-    print("1. 加载数据...")
-    analyzer.load_data()
-    
-    print("\n2. 数据预处理...")
-    analyzer.preprocess_data()
-    
-    print("\n3. 时间趋势分析...")
-    analyzer.analyze_trend()
-    
-    print("\n4. 可视化时间趋势...")
-    analyzer.visualize_trend()
-    
-    print("\n5. 导出处理后的数据...")
-    analyzer.export_filtered_data()
-    
-    # 成果落地评估部分
-    print("\n===== 开始成果落地评估 ====")
-    print("6. 分析合作模式...")
-    analyzer.analyze_cooperation_models()
-    
-    print("\n7. 分析机构类型分布...")
-    analyzer.analyze_institution_types()
-    
-    print("\n8. 成果落地评估计算...")
-    analyzer.evaluate_implementation()
+    if args.incremental:
+        print("1. 加载数据...")
+        analyzer.load_data()
+        
+        print("\n2-9. 增量分析...")
+        analyzer.run_incremental()
+    elif args.stream:
+        print("1-3. 流式读取、预处理并汇总...")
+        analyzer.process_streaming(args.chunk_size)
+        
+        print("\n4. 可视化时间趋势...")
+        analyzer.visualize_trend()
+        
+        print("\n5. 导出处理后的数据...")
+        analyzer.export_filtered_data(exclude=analyzer.LABEL_COLUMNS)
+        
+        print("\n===== 开始成果落地评估 ====")
+    elif args.workers > 0:
+        print("1. 加载数据...")
+        analyzer.load_data()
+        
+        print("\n2. 并行预处理与分类...")
+        analyzer.process_parallel(args.workers)
+        
+        print("\n3. 时间趋势分析...")
+        analyzer.analyze_trend()
+        
+        print("\n4. 可视化时间趋势...")
+        analyzer.visualize_trend()
+        
+        print("\n5. 导出处理后的数据...")
+        analyzer.export_filtered_data(exclude=analyzer.LABEL_COLUMNS)
+        
+        print("\n===== 开始成果落地评估 ====")
+    else:
+        print("1. 加载数据...")
+        analyzer.load_data()
+        if args.index:
+            analyzer.load_index()
+        
+        print("\n2. 数据预处理...")
+        analyzer.preprocess_data()
+        
+        print("\n3. 时间趋势分析...")
+        analyzer.analyze_trend()
+        
+        print("\n4. 可视化时间趋势...")
+        analyzer.visualize_trend()
+        
+        print("\n5. 导出处理后的数据...")
+        analyzer.export_filtered_data()
+        
+        # 成果落地评估部分
+        print("\n===== 开始成果落地评估 ====")
+        print("6. 分析合作模式...")
+        analyzer.analyze_cooperation_models()
+        
+        print("\n7. 分析机构类型分布...")
+        analyzer.analyze_institution_types()
     
-    print("\n9. 可视化评估结果...")
-    analyzer.visualize_implementation()
+    if not args.incremental:
+        print("\n8. 成果落地评估计算...")
+        analyzer.evaluate_implementation()
+        
+        print("\n9. 可视化评估结果...")
+        analyzer.visualize_implementation()
     
-    print("\n===== 全部分析完成 ====")
\ No newline at end of file
+    print("\n===== 全部分析完成 ====")
@@ -0,0 +1,169 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# 与页面中原有图表一致的尺寸和分辨率
+FIGSIZE = (12, 6)
+DPI = 100
+
+
+def lttb(x, y, threshold):
+    """
+    最大三角形三桶（LTTB）降采样
+
+    保留首尾两点，其余数据均分为threshold-2个桶，每个桶中选出与前一个选中点、
+    下一个桶均值点构成三角形面积最大的点，尽量保留曲线的视觉形状。
+
+    参数:
+    x, y: 数值数组（日期需先转换为数值）
+    threshold: int - 目标点数
+
+    返回:
+    ndarray - 选中点的下标（升序）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的均值点
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = np.nanmean(y[avg_start:avg_end]) if np.any(~np.isnan(y[avg_start:avg_end])) else y[a]
+
+        # 当前桶中与前一个选中点、下一桶均值点构成面积最大的点
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs((x[a] - avg_x) * (y[range_start:range_end] - y[a])
+                      - (x[a] - x[range_start:range_end]) * (avg_y - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = range_start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def downsample(times, values, max_points):
+    """对时间序列做LTTB降采样，返回(时间, 数值)"""
+    times = np.asarray(times)
+    values = np.asarray(values, dtype=np.float64)
+    if max_points is None or len(times) <= max_points:
+        return times, values
+    x = (times - times[0]).astype('timedelta64[s]').astype(np.float64)
+    index = lttb(x, values, max_points)
+    return times[index], values[index]
+
+
+def _to_png(fig):
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=DPI)
+    return buffer.getvalue()
+
+
+def render_trend_chart(times, income, expense, max_points=None):
+    """绘制财政收支折线图，返回PNG字节"""
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.add_subplot()
+
+    # 绘制收入和支出的折线图
+    ax.plot(*downsample(times, income, max_points), label='财政收入(亿元)', linewidth=2)
+    ax.plot(*downsample(times, expense, max_points), label='财政支出(亿元)', linewidth=2)
+
+    # 设置图表属性
+    ax.set_xlabel('时间', fontsize=12)
+    ax.set_ylabel('金额(亿元)', fontsize=12)
+    ax.set_title('国家财政收支趋势', fontsize=14)
+    ax.legend(fontsize=10)
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    # 自动调整x轴标签，避免重叠
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_deficit_chart(times, deficit, rate, max_points=None):
+    """绘制财政赤字柱状图和赤字率折线（双Y轴），返回PNG字节"""
+    fig = Figure(figsize=FIGSIZE)
+    ax1 = fig.add_subplot()
+
+    # 绘制财政赤字
+    color = 'tab:red'
+    ax1.set_xlabel('时间', fontsize=12)
+    ax1.set_ylabel('财政赤字(亿元)', color=color, fontsize=12)
+    ax1.bar(*downsample(times, deficit, max_points), label='财政赤字(亿元)', alpha=0.7, color=color)
+    ax1.tick_params(axis='y', labelcolor=color)
+
+    # 创建第二个Y轴用于赤字率
+    ax2 = ax1.twinx()
+    color = 'tab:blue'
+    ax2.set_ylabel('赤字率(%)', color=color, fontsize=12)
+    ax2.plot(*downsample(times, rate, max_points), label='赤字率(%)', color=color, linewidth=2, marker='o', markersize=4)
+    ax2.tick_params(axis='y', labelcolor=color)
+
+    # 设置标题
+    fig.suptitle('国家财政赤字与赤字率变化', fontsize=14)
+
+    # 自动调整x轴标签，避免重叠
+    ax1.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+class ChartCache:
+    """
+    渲染结果缓存（LRU）
+
+    键由调用方给出（数据版本、时间区间、图表类型、像素宽度等），
+    同时记录命中次数和最近一次渲染耗时，供页面展示。
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.last_render_seconds = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render, *args, **kwargs):
+        """
+        返回缓存的图表；未命中时调用render(*args, **kwargs)渲染并缓存
+
+        返回:
+        tuple - (PNG字节, 是否命中缓存, 本次耗时秒数)
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], True, time.perf_counter() - start
+
+        image = render(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.last_render_seconds = seconds
+            self._entries[key] = image
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image, False, seconds
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -4,6 +4,11 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from matplotlib.font_manager import FontProperties
 import numpy as np
+import os
+
+from fiscal_charts import ChartCache, render_deficit_chart, render_trend_chart
+from range_stats import RangeStats
+from table_view import paginated_table
 
 # 设置中文显示
 try:
@@ -17,22 +22,64 @@ except Exception:
 # 设置页面标题
 st.title('国家财政数据分析')
 
+data_file = 'fiscal_merged.xlsx'
+
+# 需要区间统计的数值列
+value_columns = ['国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)', '财政赤字(亿元)', '赤字率(%)']
+
 # 读取数据
-@st.cache_data
+# 使用cache_resource：每次重新运行时直接返回同一份数据，不经过序列化复制（调用方不得原地修改）
+@st.cache_resource
 
-def load_data():
+def load_data(data_version):
+    # data_version只作为缓存键，数据文件变化后自动重新读取
     try:
-        df = pd.read_excel('fiscal_merged.xlsx')
+        df = pd.read_excel(data_file)
         # 转换时间列为日期类型，确保可以正确排序
         df['时间'] = pd.to_datetime(df['时间'], format='%Y年%m月', errors='coerce')
         # 按时间排序
-        df = df.sort_values('时间')
-        return df
+        df = df.sort_values('时间').reset_index(drop=True)
+        # 预先计算区间统计结构，时间筛选时无需再扫描整张表
+        range_stats = RangeStats(df['时间'], df, value_columns)
+        # 预先格式化时间标签，表格分页显示时直接按行号切片使用
+        time_labels = df['时间'].dt.strftime('%Y年%m月').to_numpy()
+        return df, range_stats, time_labels
     except Exception as e:
         st.error(f"读取数据时出错: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, None
+
+def get_data_version():
+    """以数据文件的修改时间和大小作为数据版本"""
+    try:
+        stat = os.stat(data_file)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return 'missing'
+
+# 图表缓存在所有会话间共享
+@st.cache_resource
+
+def get_chart_cache():
+    return ChartCache()
+
+data_version = get_data_version()
+df, range_stats, time_labels = load_data(data_version)
+chart_cache = get_chart_cache()
+
+# 图表降采样的目标点数：与图表像素宽度相当（12英寸 × 100dpi）
+max_points = st.sidebar.slider('图表最大绘制点数', min_value=50, max_value=1200, value=1200, step=50)
+
 
-df = load_data()
+def show_chart(kind, render, lo, hi, *series):
+    """按(数据版本, 区间, 图表类型, 点数)缓存渲染结果，并显示渲染耗时与缓存命中率"""
+    key = (data_version, kind, lo, hi, max_points)
+    times = df['时间'].to_numpy()[lo:hi]
+    arrays = [df[column].to_numpy()[lo:hi] for column in series]
+    image, hit, seconds = chart_cache.get_or_render(key, render, times, *arrays, max_points=max_points)
+    st.image(image, use_container_width=True)
+    status = '缓存命中' if hit else '重新渲染'
+    st.caption(f"{status}，耗时 {seconds * 1000:.1f} 毫秒；图表缓存命中率 {chart_cache.hit_rate:.0%}"
+               f"（命中 {chart_cache.hits} 次 / 渲染 {chart_cache.misses} 次）")
 
 # 显示数据信息
 if not df.empty:
@@ -42,70 +89,25 @@ if not df.empty:
     
     # 数据展示部分
     st.subheader('财政数据表格')
-    # 显示时间、收入、支出、赤字和赤字率的表格
-    display_columns = ['时间', '国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)', '财政赤字(亿元)', '赤字率(%)']
-    df_display = df.copy()
-    # 将时间列格式化为更友好的显示方式
-    df_display['时间'] = df_display['时间'].dt.strftime('%Y年%m月')
-    st.dataframe(df_display[display_columns])
+    # 分页显示时间、收入、支出、赤字和赤字率的表格（只格式化当前页）
+    paginated_table(df, time_labels, value_columns, key='full_table')
     
     # 可视化部分
     st.subheader('财政收支趋势分析')
     
-    # 创建图表区域
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    # 绘制收入和支出的折线图
-    ax.plot(df['时间'], df['国家财政收入累计值(亿元)'], label='财政收入(亿元)', linewidth=2)
-    ax.plot(df['时间'], df['国家财政支出(不含债务还本)累计值(亿元)'], label='财政支出(亿元)', linewidth=2)
-    
-    # 设置图表属性
-    ax.set_xlabel('时间', fontsize=12)
-    ax.set_ylabel('金额(亿元)', fontsize=12)
-    ax.set_title('国家财政收支趋势', fontsize=14)
-    ax.legend(fontsize=10)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    
-    # 自动调整x轴标签，避免重叠
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    
-    # 显示图表
-    st.pyplot(fig)
+    # 绘制收入和支出的折线图（按像素宽度降采样，结果缓存）
+    show_chart('trend', render_trend_chart, 0, len(df),
+               '国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)')
     
     # 财政赤字和赤字率图表
     st.subheader('财政赤字与赤字率分析')
     
-    # 创建双Y轴图表
-    fig, ax1 = plt.subplots(figsize=(12, 6))
-    
-    # 绘制财政赤字
-    color = 'tab:red'
-    ax1.set_xlabel('时间', fontsize=12)
-    ax1.set_ylabel('财政赤字(亿元)', color=color, fontsize=12)
-    ax1.bar(df['时间'], df['财政赤字(亿元)'], label='财政赤字(亿元)', alpha=0.7, color=color)
-    ax1.tick_params(axis='y', labelcolor=color)
-    
-    # 创建第二个Y轴用于赤字率
-    ax2 = ax1.twinx()
-    color = 'tab:blue'
-    ax2.set_ylabel('赤字率(%)', color=color, fontsize=12)
-    ax2.plot(df['时间'], df['赤字率(%)'], label='赤字率(%)', color=color, linewidth=2, marker='o', markersize=4)
-    ax2.tick_params(axis='y', labelcolor=color)
-    
-    # 设置标题
-    fig.suptitle('国家财政赤字与赤字率变化', fontsize=14)
-    
-    # 自动调整x轴标签，避免重叠
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    
-    # 显示图表
-    st.pyplot(fig)
+    # 绘制财政赤字柱状图与赤字率折线（双Y轴）
+    show_chart('deficit', render_deficit_chart, 0, len(df), '财政赤字(亿元)', '赤字率(%)')
     
     # 数据统计摘要
     st.subheader('数据统计摘要')
-    stats_df = df[['国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)', '财政赤字(亿元)', '赤字率(%)']].describe()
+    stats_df = df[value_columns].describe()
     st.dataframe(stats_df)
     
     # 数据筛选器
@@ -128,23 +130,26 @@ if not df.empty:
     start_date = pd.to_datetime(start_date)
     end_date = pd.to_datetime(end_date)
     
-    # 筛选数据
-    filtered_df = df[(df['时间'] >= start_date) & (df['时间'] <= end_date)]
+    # 筛选数据：数据已按时间排序，用二分查找定位区间端点，取连续切片
+    lo, hi = range_stats.locate(start_date, end_date)
     
     # 显示筛选后的数据
-    st.write(f"筛选后的数据包含 {len(filtered_df)} 条记录")
+    st.write(f"筛选后的数据包含 {hi - lo} 条记录")
     
-    # 显示筛选后的数据表格
-    filtered_df_display = filtered_df.copy()
-    filtered_df_display['时间'] = filtered_df_display['时间'].dt.strftime('%Y年%m月')
-    st.dataframe(filtered_df_display[display_columns])
+    # 分页显示筛选后的数据表格
+    paginated_table(df, time_labels, value_columns, lo, hi, key='filtered_table')
     
-    # 筛选后数据的基本统计
+    # 筛选后数据的基本统计（由前缀和与稀疏表直接得到，不扫描数据）
     st.write("筛选后数据的基本统计:")
-    st.write(f"平均财政收入: {filtered_df['国家财政收入累计值(亿元)'].mean():.2f} 亿元")
-    st.write(f"平均财政支出: {filtered_df['国家财政支出(不含债务还本)累计值(亿元)'].mean():.2f} 亿元")
-    st.write(f"平均财政赤字: {filtered_df['财政赤字(亿元)'].mean():.2f} 亿元")
-    st.write(f"平均赤字率: {filtered_df['赤字率(%)'].mean():.2f}%")
+    st.write(f"平均财政收入: {range_stats.mean('国家财政收入累计值(亿元)', lo, hi):.2f} 亿元")
+    st.write(f"平均财政支出: {range_stats.mean('国家财政支出(不含债务还本)累计值(亿元)', lo, hi):.2f} 亿元")
+    st.write(f"平均财政赤字: {range_stats.mean('财政赤字(亿元)', lo, hi):.2f} 亿元")
+    st.write(f"平均赤字率: {range_stats.mean('赤字率(%)', lo, hi):.2f}%")
+    st.dataframe(pd.DataFrame(range_stats.summary(lo, hi)).T)
+    
+    # 筛选区间内的收支趋势
+    show_chart('trend', render_trend_chart, lo, hi,
+               '国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)')
 
 else:
     st.warning("未加载到数据，请检查数据文件是否存在。")
\ No newline at end of file
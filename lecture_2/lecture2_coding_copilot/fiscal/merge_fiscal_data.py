@@ -1,46 +1,169 @@
 import pandas as pd
+import argparse
+import json
 import os
+import sys
+
+# 复用第一周的national_data指标目录（惰性加载、带解析缓存）
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', '..', '..', 'lecture_1', 'lecture1_introduction'))
+from national_data_catalog import format_month_labels, get_catalog
+import instrumentation
+from instrumentation import instrumented, stage
 
 # 设置文件路径
-income_file = 'e:/Study/2-1/finance_analysis/data/national_data/国家财政预算收入.xls'
-expense_file = 'e:/Study/2-1/finance_analysis/data/national_data/国家财政支出.xls'
-
-# 读取财政收入数据
-print("读取国家财政预算收入数据...")
-income_df = pd.read_excel(income_file)
-
-# 读取财政支出数据
-print("读取国家财政支出数据...")
-expense_df = pd.read_excel(expense_file)
-
-# 合并数据
-print("合并数据...")
-# 使用'时间'列进行合并
-fiscal_merged = pd.merge(income_df, expense_df, on='时间', how='inner')
-
-# 计算财政赤字（支出-收入）
-fiscal_merged['财政赤字(亿元)'] = fiscal_merged['国家财政支出(不含债务还本)累计值(亿元)'] - fiscal_merged['国家财政收入累计值(亿元)']
-
-# 计算赤字率（赤字/收入 * 100%）
-# 添加一个小值避免除以零的情况
-fiscal_merged['赤字率(%)'] = (fiscal_merged['财政赤字(亿元)'] / (fiscal_merged['国家财政收入累计值(亿元)'] + 1e-10)) * 100
-
-# 显示合并后的前10行数据
-print(f"\n合并后的数据形状: {fiscal_merged.shape}")
-print("合并后的数据前10行:")
-print(fiscal_merged.head(10))
-
-# 显示合并后的列名
-print("\n合并后的列名:")
-print(fiscal_merged.columns.tolist())
-
-# 保存合并后的数据
-output_file = 'e:/Study/2-1/finance_analysis/lecture_2/lecture2_coding_copilot/fiscal/fiscal_merged.xlsx'
-fiscal_merged.to_excel(output_file, index=False)
-print(f"\n合并后的数据已保存至: {output_file}")
-
-# 显示一些统计信息
-print("\n数据统计信息:")
-print(f"数据时间范围: 从 {fiscal_merged['时间'].min()} 到 {fiscal_merged['时间'].max()}")
-print(f"平均财政赤字: {fiscal_merged['财政赤字(亿元)'].mean():.2f} 亿元")
-print(f"平均赤字率: {fiscal_merged['赤字率(%)'].mean():.2f}%")
\ No newline at end of file
+output_file = os.path.join(SCRIPT_DIR, 'fiscal_merged.xlsx')
+# 记录已合并到的最新月份（水位线），供增量模式使用
+state_file = os.path.join(SCRIPT_DIR, 'fiscal_merged_state.json')
+
+INCOME_COLUMN = '国家财政收入累计值(亿元)'
+EXPENSE_COLUMN = '国家财政支出(不含债务还本)累计值(亿元)'
+
+
+@instrumented('fiscal.load_sources', rows='result')
+def load_sources():
+    """读取财政收入和支出数据（时间列已解析为日期并升序排列）"""
+    catalog = get_catalog()
+
+    # 读取财政收入数据
+    print("读取国家财政预算收入数据...")
+    income_df = catalog['国家财政预算收入'].frame
+
+    # 读取财政支出数据
+    print("读取国家财政支出数据...")
+    expense_df = catalog['国家财政支出'].frame
+    return income_df, expense_df
+
+
+@instrumented('fiscal.merge_and_compute', rows='result')
+def merge_and_compute(income_df, expense_df):
+    """按时间内连接收入和支出数据，并计算财政赤字和赤字率"""
+    # 使用'时间'列进行合并
+    fiscal_merged = pd.merge(income_df, expense_df, on='时间', how='inner')
+
+    # 计算财政赤字（支出-收入）
+    fiscal_merged['财政赤字(亿元)'] = fiscal_merged[EXPENSE_COLUMN] - fiscal_merged[INCOME_COLUMN]
+
+    # 计算赤字率（赤字/收入 * 100%）
+    # 添加一个小值避免除以零的情况
+    fiscal_merged['赤字率(%)'] = (fiscal_merged['财政赤字(亿元)'] / (fiscal_merged[INCOME_COLUMN] + 1e-10)) * 100
+    return fiscal_merged
+
+
+@instrumented('fiscal.to_output_format', rows='result')
+def to_output_format(fiscal_merged):
+    """与源数据保持一致：时间按'2025年6月'样式保存，最新月份在前"""
+    fiscal_output = fiscal_merged.sort_values('时间', ascending=False)
+    fiscal_output['时间'] = format_month_labels(fiscal_output['时间'])
+    return fiscal_output
+
+
+def read_watermark():
+    """
+    读取已合并的最新月份
+
+    合并结果不存在时返回None（即使有状态文件，水位线也不可信）；
+    没有状态文件但已有合并结果时，只读取合并结果的时间列来确定水位线
+    """
+    if not os.path.exists(output_file):
+        return None
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return pd.Timestamp(json.load(f)['watermark'])
+    months = pd.read_excel(output_file, usecols=['时间'])['时间']
+    return pd.to_datetime(months, format='%Y年%m月').max()
+
+
+def write_watermark(watermark, rows):
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump({'watermark': watermark.strftime('%Y-%m'), 'rows': int(rows)}, f, ensure_ascii=False, indent=2)
+
+
+@instrumented('fiscal.full_rebuild')
+def full_rebuild():
+    """重新合并全部数据并覆盖保存"""
+    income_df, expense_df = load_sources()
+
+    # 合并数据
+    print("合并数据...")
+    fiscal_merged = merge_and_compute(income_df, expense_df)
+
+    # 显示合并后的前10行数据
+    print(f"\n合并后的数据形状: {fiscal_merged.shape}")
+    print("合并后的数据前10行:")
+    print(fiscal_merged.head(10))
+
+    # 显示合并后的列名
+    print("\n合并后的列名:")
+    print(fiscal_merged.columns.tolist())
+
+    # 保存合并后的数据
+    with stage('fiscal.write_excel', rows=len(fiscal_merged)):
+        to_output_format(fiscal_merged).to_excel(output_file, index=False)
+    write_watermark(fiscal_merged['时间'].max(), len(fiscal_merged))
+    print(f"\n合并后的数据已保存至: {output_file}")
+
+    # 显示一些统计信息
+    print("\n数据统计信息:")
+    print(f"数据时间范围: 从 {fiscal_merged['时间'].min()} 到 {fiscal_merged['时间'].max()}")
+    print(f"平均财政赤字: {fiscal_merged['财政赤字(亿元)'].mean():.2f} 亿元")
+    print(f"平均赤字率: {fiscal_merged['赤字率(%)'].mean():.2f}%")
+
+
+@instrumented('fiscal.incremental_update')
+def incremental_update():
+    """
+    只合并水位线之后新发布的月份，并插入到已有合并结果的开头
+
+    注意：水位线之前的源数据如果被修订，需要使用--full重新合并
+    """
+    watermark = read_watermark()
+    if watermark is None:
+        print("未找到已合并的数据，执行全量合并...")
+        full_rebuild()
+        return
+
+    income_df, expense_df = load_sources()
+
+    # 源数据按时间升序排列，用二分查找定位水位线之后的行
+    income_new = income_df.iloc[income_df['时间'].searchsorted(watermark, side='right'):]
+    expense_new = expense_df.iloc[expense_df['时间'].searchsorted(watermark, side='right'):]
+    print(f"水位线: {watermark.strftime('%Y年%m月')}，新增收入数据{len(income_new)}行，新增支出数据{len(expense_new)}行")
+
+    # 只对新增行计算财政赤字和赤字率
+    fiscal_new = merge_and_compute(income_new, expense_new)
+    if fiscal_new.empty:
+        print("没有新的月份需要合并")
+        return
+
+    from openpyxl import load_workbook
+
+    # 合并结果最新月份在前：在表头之后插入新行，保持原有排列顺序
+    fiscal_output = to_output_format(fiscal_new)
+    with stage('fiscal.write_excel', rows=len(fiscal_output)):
+        workbook = load_workbook(output_file)
+        sheet = workbook.active
+        header = [cell.value for cell in sheet[1]]
+        sheet.insert_rows(2, amount=len(fiscal_output))
+        for offset, row in enumerate(fiscal_output[header].itertuples(index=False)):
+            for col, value in enumerate(row, start=1):
+                sheet.cell(row=2 + offset, column=col, value=value)
+        workbook.save(output_file)
+
+    total_rows = sheet.max_row - 1
+    write_watermark(fiscal_new['时间'].max(), total_rows)
+    print(f"已追加{len(fiscal_new)}个月份至: {output_file}（共{total_rows}行）")
+    print(fiscal_output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='合并国家财政收入与支出数据')
+    parser.add_argument('--full', action='store_true', help='忽略水位线，重新合并全部数据')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+
+    if args.full:
+        full_rebuild()
+    else:
+        incremental_update()
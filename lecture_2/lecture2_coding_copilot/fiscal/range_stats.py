@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class RangeStats:
+    """
+    按时间排序的数据上的区间统计结构
+
+    构建时一次性计算前缀和（求和、均值）和稀疏表（最小值、最大值），
+    之后任意时间区间的端点用二分查找定位，统计量以O(1)得到，与数据长度无关。
+    缺失值的处理与pandas一致：统计时跳过NaN。
+    """
+
+    def __init__(self, times, frame, columns):
+        """
+        参数:
+        times: 已按升序排列的时间序列（NaT只能出现在末尾）
+        frame: DataFrame - 与times逐行对应的数据
+        columns: list - 需要支持区间统计的列
+        """
+        times = np.asarray(times, dtype='datetime64[ns]')
+        # 排序后NaT位于末尾，只对有效时间部分建立索引
+        self.n = int(np.count_nonzero(~np.isnat(times)))
+        self.times = times[:self.n]
+        self.columns = list(columns)
+        self._prefix_sum = {}
+        self._prefix_count = {}
+        self._min_table = {}
+        self._max_table = {}
+
+        for column in self.columns:
+            values = frame[column].to_numpy(dtype=np.float64)[:self.n]
+            valid = ~np.isnan(values)
+            self._prefix_sum[column] = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+            self._prefix_count[column] = np.concatenate(([0], np.cumsum(valid)))
+            self._min_table[column] = self._sparse_table(np.where(valid, values, np.inf), np.minimum)
+            self._max_table[column] = self._sparse_table(np.where(valid, values, -np.inf), np.maximum)
+
+    @staticmethod
+    def _sparse_table(values, combine):
+        """第k层第i个元素为区间[i, i+2^k)上的最值"""
+        table = [values]
+        width = 1
+        while width * 2 <= len(values):
+            previous = table[-1]
+            table.append(combine(previous[:-width], previous[width:]))
+            width *= 2
+        return table
+
+    def locate(self, start, end):
+        """
+        用二分查找定位闭区间[start, end]对应的行号范围
+
+        返回:
+        tuple - (lo, hi)，对应行为iloc[lo:hi]
+        """
+        lo = int(np.searchsorted(self.times, np.datetime64(start, 'ns'), side='left'))
+        hi = int(np.searchsorted(self.times, np.datetime64(end, 'ns'), side='right'))
+        return lo, max(lo, hi)
+
+    def count(self, column, lo, hi):
+        return int(self._prefix_count[column][hi] - self._prefix_count[column][lo])
+
+    def sum(self, column, lo, hi):
+        return float(self._prefix_sum[column][hi] - self._prefix_sum[column][lo])
+
+    def mean(self, column, lo, hi):
+        count = self.count(column, lo, hi)
+        return self.sum(column, lo, hi) / count if count else np.nan
+
+    def _query(self, table, lo, hi, combine):
+        if hi <= lo:
+            return np.nan
+        level = (hi - lo).bit_length() - 1
+        result = combine(table[level][lo], table[level][hi - (1 << level)])
+        return float(result) if np.isfinite(result) else np.nan
+
+    def min(self, column, lo, hi):
+        return self._query(self._min_table[column], lo, hi, min)
+
+    def max(self, column, lo, hi):
+        return self._query(self._max_table[column], lo, hi, max)
+
+    def summary(self, lo, hi):
+        """返回区间内各列的均值、合计、最小值和最大值"""
+        return {
+            column: {
+                '均值': self.mean(column, lo, hi),
+                '合计': self.sum(column, lo, hi),
+                '最小值': self.min(column, lo, hi),
+                '最大值': self.max(column, lo, hi),
+            }
+            for column in self.columns
+        }
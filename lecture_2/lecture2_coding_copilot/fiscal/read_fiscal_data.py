@@ -1,13 +1,16 @@
-import pandas as pd
 import os
+import sys
 
-# 设置文件路径
-income_file = 'e:/Study/2-1/finance_analysis/data/national_data/国家财政预算收入.xls'
-expense_file = 'e:/Study/2-1/finance_analysis/data/national_data/国家财政支出.xls'
+# 复用第一周的national_data指标目录（惰性加载、带解析缓存）
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', '..', '..', 'lecture_1', 'lecture1_introduction'))
+from national_data_catalog import get_catalog
+
+catalog = get_catalog()
 
 # 读取财政收入数据
 print("读取国家财政预算收入数据...")
-income_df = pd.read_excel(income_file)
+income_df = catalog['国家财政预算收入'].frame
 print(f"收入数据形状: {income_df.shape}")
 print("收入数据前5行:")
 print(income_df.head())
@@ -17,7 +20,7 @@ print("\n")
 
 # 读取财政支出数据
 print("读取国家财政支出数据...")
-expense_df = pd.read_excel(expense_file)
+expense_df = catalog['国家财政支出'].frame
 print(f"支出数据形状: {expense_df.shape}")
 print("支出数据前5行:")
 print(expense_df.head())
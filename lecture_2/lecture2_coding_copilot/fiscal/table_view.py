@@ -0,0 +1,45 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = (20, 50, 100, 200)
+
+
+def paginated_table(frame, time_labels, columns, lo=0, hi=None, key='table', default_page_size=50):
+    """
+    分页显示数据表
+
+    只取出当前页对应的行并组装成小表交给st.dataframe，
+    时间列直接使用加载数据时预先格式化好的标签，不复制、不格式化整张表。
+
+    参数:
+    frame: DataFrame - 按时间排序的完整数据
+    time_labels: ndarray - 与frame逐行对应的时间标签（如'2025年06月'）
+    columns: list - 需要显示的数值列
+    lo, hi: int - 只显示frame.iloc[lo:hi]范围内的行（例如时间筛选结果）
+    key: str - 控件键前缀，同一页面上的多个表格需不同
+    default_page_size: int - 默认每页行数
+    """
+    hi = len(frame) if hi is None else hi
+    total = max(0, hi - lo)
+
+    size_col, page_col = st.columns(2)
+    page_size = size_col.selectbox('每页行数', PAGE_SIZES, index=PAGE_SIZES.index(default_page_size),
+                                   key=f'{key}_page_size')
+    pages = max(1, math.ceil(total / page_size))
+    # 总页数变化（例如修改了筛选区间）时重置页码控件
+    page = page_col.number_input(f'页码（共{pages}页）', min_value=1, max_value=pages, value=1,
+                                 key=f'{key}_page_{pages}')
+
+    start = lo + (page - 1) * page_size
+    stop = min(hi, start + page_size)
+    page_frame = pd.DataFrame({'时间': time_labels[start:stop]}, index=pd.RangeIndex(start - lo, stop - lo))
+    for column in columns:
+        page_frame[column] = frame[column].to_numpy()[start:stop]
+
+    st.dataframe(page_frame)
+    if total:
+        st.caption(f"第 {page}/{pages} 页，显示第 {start - lo + 1}-{stop - lo} 条，共 {total} 条")
+    else:
+        st.caption("没有符合条件的数据")
@@ -1,37 +1,281 @@
 import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import sys
 
-# 读取合并后的数据
-merged_file = 'e:/Study/2-1/finance_analysis/lecture_2/lecture2_coding_copilot/fiscal/fiscal_merged.xlsx'
-print("读取合并后的数据...")
-fiscal_merged = pd.read_excel(merged_file)
-
-# 显示基本信息
-print(f"合并后的数据形状: {fiscal_merged.shape}")
-print("\n合并后的数据列名:")
-print(fiscal_merged.columns.tolist())
-
-# 显示前15行数据
-print("\n合并后的数据前15行:")
-print(fiscal_merged.head(15))
-
-# 显示计算的财政赤字和赤字率列
-print("\n财政赤字和赤字率数据预览:")
-print(fiscal_merged[['时间', '国家财政收入累计值(亿元)', '国家财政支出(不含债务还本)累计值(亿元)', '财政赤字(亿元)', '赤字率(%)']].head(10))
-
-# 显示数据统计信息
-print("\n数据统计信息:")
-print(f"数据时间范围: 从 {fiscal_merged['时间'].min()} 到 {fiscal_merged['时间'].max()}")
-print(f"财政收入最大值: {fiscal_merged['国家财政收入累计值(亿元)'].max():.2f} 亿元")
-print(f"财政支出最大值: {fiscal_merged['国家财政支出(不含债务还本)累计值(亿元)'].max():.2f} 亿元")
-print(f"财政赤字最大值: {fiscal_merged['财政赤字(亿元)'].max():.2f} 亿元")
-print(f"最高赤字率: {fiscal_merged['赤字率(%)'].max():.2f}%")
-print(f"平均财政赤字: {fiscal_merged['财政赤字(亿元)'].mean():.2f} 亿元")
-print(f"平均赤字率: {fiscal_merged['赤字率(%)'].mean():.2f}%")
-
-# 检查是否存在异常值
-print("\n异常值检查:")
-negative_deficit = fiscal_merged[fiscal_merged['财政赤字(亿元)'] < 0]
-print(f"存在财政盈余的记录数: {len(negative_deficit)}")
-if len(negative_deficit) > 0:
-    print("财政盈余记录预览:")
-    print(negative_deficit[['时间', '财政赤字(亿元)', '赤字率(%)']].head())
\ No newline at end of file
+# 校验合并后的财政数据（fiscal_merged.xlsx）
+#
+# 规则以声明式列表给出，每条规则在数据块上计算一个向量化的违规掩码，
+# 所有规则共用一次列读取；分块模式下跨块所需的状态（上一行、已出现的月份）由引擎携带，
+# 因此可以校验大于内存的数据。
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+merged_file = os.path.join(SCRIPT_DIR, 'fiscal_merged.xlsx')
+
+INCOME_COLUMN = '国家财政收入累计值(亿元)'
+EXPENSE_COLUMN = '国家财政支出(不含债务还本)累计值(亿元)'
+DEFICIT_COLUMN = '财政赤字(亿元)'
+RATE_COLUMN = '赤字率(%)'
+
+# 规则类型:
+# sorted: 时间单调（升序或降序均可，方向由数据前两期确定）
+# unique: 时间不重复
+# gap: 相邻两期之间缺失的月份（allowed_missing_months中的月份允许缺失，如1-2月合并发布的1月）
+# monotonic_within_year: 年初至今的累计值在同一年内不减
+# range: 数值位于[min, max]内（NaN不计入）
+# not_null: 非空
+# difference: column == minuend - subtrahend（容差tolerance）
+# ratio: column == numerator / denominator * scale（容差tolerance）
+# severity为info的规则只做统计，不影响校验结论
+RULES = [
+    {'name': '时间有序', 'type': 'sorted', 'column': '时间'},
+    {'name': '月份不重复', 'type': 'unique', 'column': '时间'},
+    # 1月数据与2月合并发布；2005-2009年和2016年的12月数据也未发布（11月之后直接是次年2月），
+    # 因此12月、1月缺失不视为错误；除1月外的全部缺失（含12月）在下一条info规则中统计
+    {'name': '月份无缺失', 'type': 'gap', 'column': '时间', 'allowed_missing_months': [12, 1]},
+    {'name': '1月以外的月份缺失', 'type': 'gap', 'column': '时间', 'allowed_missing_months': [1], 'severity': 'info'},
+    {'name': '关键列非空', 'type': 'not_null', 'columns': ['时间', INCOME_COLUMN, EXPENSE_COLUMN, DEFICIT_COLUMN, RATE_COLUMN]},
+    {'name': '财政收入年内累计不减', 'type': 'monotonic_within_year', 'column': INCOME_COLUMN},
+    {'name': '财政支出年内累计不减', 'type': 'monotonic_within_year', 'column': EXPENSE_COLUMN},
+    {'name': '赤字率取值范围', 'type': 'range', 'column': RATE_COLUMN, 'min': -100.0, 'max': 100.0},
+    {'name': '财政赤字与收支一致', 'type': 'difference', 'column': DEFICIT_COLUMN,
+     'minuend': EXPENSE_COLUMN, 'subtrahend': INCOME_COLUMN, 'tolerance': 0.01},
+    {'name': '赤字率与赤字一致', 'type': 'ratio', 'column': RATE_COLUMN,
+     'numerator': DEFICIT_COLUMN, 'denominator': INCOME_COLUMN, 'scale': 100.0, 'tolerance': 1e-6},
+    {'name': '财政盈余记录', 'type': 'range', 'column': DEFICIT_COLUMN, 'min': 0.0, 'severity': 'info'},
+]
+
+TIME_RULES = ('sorted', 'unique', 'gap', 'monotonic_within_year')
+
+
+def rule_columns(rule):
+    """规则需要读取的列"""
+    columns = []
+    if rule['type'] in TIME_RULES:
+        columns.append('时间')
+    for key in ('column', 'minuend', 'subtrahend', 'numerator', 'denominator'):
+        if key in rule:
+            columns.append(rule[key])
+    columns.extend(rule.get('columns', []))
+    return columns
+
+
+def month_keys(labels):
+    """把'2025年6月'样式的时间标签转换为整数月份编号（年*12+月-1），无法解析的为-1"""
+    dates = pd.to_datetime(pd.Series(labels), format='%Y年%m月', errors='coerce')
+    keys = dates.dt.year * 12 + dates.dt.month - 1
+    return keys.fillna(-1).to_numpy(dtype=np.int64)
+
+
+class ValidationEngine:
+    """按块执行声明式校验规则，并汇总为可机读的报告"""
+
+    def __init__(self, rules=RULES, max_samples=10):
+        self.rules = rules
+        self.max_samples = max_samples
+        self.columns = list(dict.fromkeys(c for rule in rules for c in rule_columns(rule)))
+        self.rows = 0
+        self.chunks = 0
+        self.results = {rule['name']: {'violations': 0, 'sample_rows': [], 'sample_months': []} for rule in rules}
+        # 跨块状态
+        self._prev_key = None
+        self._prev_values = {}
+        self._direction = 0
+        self._seen = np.zeros(0, dtype=bool)
+
+    def _record(self, rule, mask, row_numbers, labels):
+        result = self.results[rule['name']]
+        hits = np.flatnonzero(mask)
+        result['violations'] += int(len(hits))
+        room = self.max_samples - len(result['sample_rows'])
+        if room > 0:
+            hits = hits[:room]
+            result['sample_rows'].extend(int(r) for r in row_numbers[hits])
+            result['sample_months'].extend(str(labels[i]) for i in hits)
+
+    def check_chunk(self, chunk):
+        """对一个数据块执行全部规则"""
+        n = len(chunk)
+        if n == 0:
+            return
+        row_numbers = np.arange(self.rows, self.rows + n)
+        labels = chunk['时间'].to_numpy() if '时间' in chunk else np.full(n, '')
+        values = {c: pd.to_numeric(chunk[c], errors='coerce').to_numpy(dtype=np.float64)
+                  for c in self.columns if c != '时间' and c in chunk}
+
+        keys = month_keys(labels)
+        # 在块首拼接上一块的最后一行，使相邻行比较可以跨块进行
+        has_prev = self._prev_key is not None
+        prev_keys = np.concatenate(([self._prev_key], keys[:-1])) if has_prev else np.concatenate(([keys[0]], keys[:-1]))
+        # 两行时间都能解析时才比较相邻关系
+        pair_valid = (keys >= 0) & (prev_keys >= 0)
+        if not has_prev:
+            pair_valid[0] = False
+        step = keys - prev_keys
+        if self._direction == 0:
+            nonzero = step[pair_valid & (step != 0)]
+            if len(nonzero):
+                self._direction = 1 if nonzero[0] > 0 else -1
+        direction = self._direction or 1
+        # 时间顺序下相邻两期：earlier为较早一期
+        earlier = np.where(direction > 0, prev_keys, keys)
+        later = np.where(direction > 0, keys, prev_keys)
+        forward = (later - earlier)
+
+        for rule in self.rules:
+            kind = rule['type']
+            if kind == 'sorted':
+                mask = pair_valid & (forward < 0)
+            elif kind == 'unique':
+                # 块内重复：排序后与前一个相同；跨块重复：查已出现月份的位图
+                mask = np.zeros(n, dtype=bool)
+                order = np.argsort(keys, kind='stable')
+                sorted_keys = keys[order]
+                mask[order[1:]] = sorted_keys[1:] == sorted_keys[:-1]
+                parsed = keys >= 0
+                if parsed.any():
+                    if keys.max() >= len(self._seen):
+                        self._seen = np.concatenate((self._seen, np.zeros(keys.max() + 1 - len(self._seen), dtype=bool)))
+                    mask |= parsed & self._seen[np.maximum(keys, 0)]
+                    self._seen[keys[parsed]] = True
+                mask &= parsed
+            elif kind == 'gap':
+                allowed = set(rule.get('allowed_missing_months', []))
+                mask = pair_valid & (forward > 1)
+                if allowed:
+                    # 缺失超过11个月时必然包含不允许缺失的月份；否则逐个偏移检查缺失的月份
+                    disallowed = forward > 12
+                    for offset in range(1, 12):
+                        missing_month = (earlier + offset) % 12 + 1
+                        disallowed |= (offset < forward) & ~np.isin(missing_month, list(allowed))
+                    mask &= disallowed
+            elif kind == 'monotonic_within_year':
+                column = rule['column']
+                current = values[column]
+                previous = np.concatenate(([self._prev_values.get(column, np.nan)], current[:-1]))
+                later_value = np.where(direction > 0, current, previous)
+                earlier_value = np.where(direction > 0, previous, current)
+                same_year = (earlier // 12) == (later // 12)
+                mask = pair_valid & (forward > 0) & same_year & (later_value < earlier_value - rule.get('tolerance', 0.0))
+            elif kind == 'range':
+                column = values[rule['column']]
+                mask = np.zeros(n, dtype=bool)
+                if 'min' in rule:
+                    mask |= column < rule['min']
+                if 'max' in rule:
+                    mask |= column > rule['max']
+            elif kind == 'not_null':
+                mask = np.zeros(n, dtype=bool)
+                for column in rule['columns']:
+                    if column == '时间':
+                        mask |= keys < 0
+                    else:
+                        mask |= np.isnan(values[column]) if column in values else True
+            elif kind == 'difference':
+                expected = values[rule['minuend']] - values[rule['subtrahend']]
+                mask = ~(np.abs(values[rule['column']] - expected) <= rule.get('tolerance', 0.0))
+            elif kind == 'ratio':
+                expected = values[rule['numerator']] / (values[rule['denominator']] + 1e-10) * rule.get('scale', 1.0)
+                mask = ~(np.abs(values[rule['column']] - expected) <= rule.get('tolerance', 0.0))
+            else:
+                raise ValueError(f"未知的规则类型: {kind}")
+            self._record(rule, mask, row_numbers, labels)
+
+        self._prev_key = int(keys[-1])
+        self._prev_values = {c: v[-1] for c, v in values.items()}
+        self.rows += n
+        self.chunks += 1
+
+    def report(self, source=None):
+        """生成可机读的校验报告"""
+        rules = []
+        passed = True
+        for rule in self.rules:
+            result = self.results[rule['name']]
+            severity = rule.get('severity', 'error')
+            ok = result['violations'] == 0
+            if severity == 'error' and not ok:
+                passed = False
+            rules.append({'name': rule['name'], 'type': rule['type'], 'severity': severity,
+                          'passed': ok, **result})
+        return {'source': source, 'rows': self.rows, 'chunks': self.chunks, 'passed': passed, 'rules': rules}
+
+
+def iter_chunks(path, columns, chunk_size=None):
+    """
+    按块读取合并数据，只读取规则需要的列
+
+    chunk_size为None时整表读入（一个块）；xlsx分块时使用openpyxl只读模式逐行流式读取
+    """
+    if path.lower().endswith('.csv'):
+        if chunk_size is None:
+            yield pd.read_csv(path, usecols=lambda c: c in columns)
+        else:
+            yield from pd.read_csv(path, usecols=lambda c: c in columns, chunksize=chunk_size)
+        return
+
+    if chunk_size is None:
+        yield pd.read_excel(path, usecols=lambda c: c in columns)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows))
+        positions = [(header.index(c), c) for c in columns if c in header]
+        buffer = []
+        for row in rows:
+            buffer.append([row[i] for i, _ in positions])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=[c for _, c in positions])
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=[c for _, c in positions])
+    finally:
+        workbook.close()
+
+
+def validate(path=merged_file, chunk_size=None, rules=RULES, max_samples=10):
+    """校验数据文件，返回报告字典"""
+    engine = ValidationEngine(rules, max_samples=max_samples)
+    for chunk in iter_chunks(path, engine.columns, chunk_size):
+        engine.check_chunk(chunk)
+    return engine.report(source=path)
+
+
+def print_report(report):
+    print(f"校验文件: {report['source']}")
+    print(f"共校验 {report['rows']} 行（{report['chunks']} 个数据块）")
+    for rule in report['rules']:
+        if rule['passed']:
+            status = '通过'
+        else:
+            status = '提示' if rule['severity'] == 'info' else '失败'
+        print(f"[{status}] {rule['name']}: {rule['violations']} 条记录")
+        if rule['sample_months']:
+            print(f"    示例: {', '.join(rule['sample_months'])}")
+    print("校验结论: " + ("通过" if report['passed'] else "未通过"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='校验合并后的国家财政数据')
+    parser.add_argument('path', nargs='?', default=merged_file, help='待校验的xlsx或csv文件')
+    parser.add_argument('--chunk-size', type=int, default=None, help='分块校验时每块的行数')
+    parser.add_argument('--samples', type=int, default=10, help='每条规则最多记录的违规示例数')
+    parser.add_argument('--report', default=None, help='将JSON报告写入该文件；为"-"时输出到标准输出')
+    args = parser.parse_args()
+
+    report = validate(args.path, chunk_size=args.chunk_size, max_samples=args.samples)
+    if args.report == '-':
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"校验报告已保存至: {args.report}")
+    sys.exit(0 if report['passed'] else 1)
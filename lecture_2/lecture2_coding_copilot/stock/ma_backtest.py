@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""双均线策略的向量化参数网格回测
+
+策略：短期均线高于长期均线时持有（仓位1），否则空仓（仓位0）；信号在收盘后产生，
+次一交易日起生效，换仓时按换手量扣除交易成本。
+
+一次性计算参数网格中全部(短期, 长期)窗口组合：先对收盘价求一次累积和，
+任意窗口的均线都是累积和的差除以窗口长度，得到 窗口 × 时间 的均线矩阵；
+短期和长期均线矩阵广播比较得到 短期窗口 × 长期窗口 × 时间 的仓位，
+收益、累计收益和各项统计都沿时间轴一次算出。
+reference_backtest是逐个参数对的pandas rolling实现，用于核对结果。
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ohlcv_store import open_store
+
+TRADING_DAYS = 252
+DEFAULT_SHORT_WINDOWS = list(range(5, 31, 5))
+DEFAULT_LONG_WINDOWS = list(range(20, 121, 10))
+STAT_COLUMNS = ['total_return', 'annual_return', 'annual_volatility', 'sharpe', 'max_drawdown', 'trades']
+
+
+def moving_averages(close, windows):
+    """
+    用累积和一次计算多个窗口的简单移动平均
+
+    参数:
+    close: ndarray - 收盘价（时间升序）
+    windows: 序列 - 窗口长度
+
+    返回:
+    ndarray - 形状为(窗口数, 时间)，数据不足一个窗口的位置为NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    windows = np.asarray(windows, dtype=np.int64)
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    end = np.arange(1, len(close) + 1)
+    begin = end[None, :] - windows[:, None]
+    averages = (csum[end][None, :] - csum[np.maximum(begin, 0)]) / windows[:, None]
+    averages[begin < 0] = np.nan
+    return averages
+
+
+def summary_stats(returns, positions):
+    """
+    沿最后一个轴（时间）计算策略统计量
+
+    参数:
+    returns: ndarray - 每日策略收益
+    positions: ndarray - 每日仓位
+
+    返回:
+    dict - {统计量名称: 去掉时间轴后的数组}
+    """
+    n = returns.shape[-1]
+    equity = np.cumprod(1 + returns, axis=-1)
+    total_return = equity[..., -1] - 1
+    volatility = returns.std(axis=-1, ddof=1)
+    mean = returns.mean(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(volatility > 0, mean / volatility * np.sqrt(TRADING_DAYS), 0.0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=-1) - 1
+    # 第一天之前视为空仓，第一天建仓也计为一次交易
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0))
+    return {
+        'total_return': total_return,
+        'annual_return': (1 + total_return) ** (TRADING_DAYS / n) - 1,
+        'annual_volatility': volatility * np.sqrt(TRADING_DAYS),
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=-1),
+        'trades': turnover.sum(axis=-1),
+    }
+
+
+def backtest_grid(close, short_windows, long_windows, cost=0.0):
+    """
+    一次回测全部(短期, 长期)窗口组合
+
+    参数:
+    close: ndarray - 收盘价（时间升序）
+    short_windows, long_windows: 序列 - 候选窗口
+    cost: float - 单边交易成本（按换手量计，如0.001）
+
+    返回:
+    dict - positions/returns/cumulative为(短期数, 长期数, 时间)数组，
+           valid为短期窗口小于长期窗口的组合，stats为按(short, long)索引的统计表
+    """
+    close = np.asarray(close, dtype=np.float64)
+    short_windows = np.asarray(short_windows, dtype=np.int64)
+    long_windows = np.asarray(long_windows, dtype=np.int64)
+    short_ma = moving_averages(close, short_windows)
+    long_ma = moving_averages(close, long_windows)
+
+    # 均线为NaN时比较结果为False，即数据不足时空仓
+    signal = short_ma[:, None, :] > long_ma[None, :, :]
+    positions = np.zeros(signal.shape, dtype=np.int8)
+    positions[..., 1:] = signal[..., :-1]
+
+    asset_returns = np.zeros(len(close))
+    asset_returns[1:] = close[1:] / close[:-1] - 1
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0))
+    returns = positions * asset_returns - cost * turnover
+    cumulative = np.cumprod(1 + returns, axis=-1) - 1
+
+    valid = short_windows[:, None] < long_windows[None, :]
+    stats = summary_stats(returns, positions)
+    index = pd.MultiIndex.from_product([short_windows, long_windows], names=['short', 'long'])
+    table = pd.DataFrame({name: values.ravel() for name, values in stats.items()}, index=index)
+    table = table[valid.ravel()]
+    return {'short': short_windows, 'long': long_windows, 'valid': valid, 'positions': positions,
+            'returns': returns, 'cumulative': cumulative, 'stats': table}
+
+
+def reference_backtest(close, short, long, cost=0.0):
+    """逐个参数对的pandas实现（rolling均线），用于核对backtest_grid"""
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+    short_ma = close.rolling(short).mean()
+    long_ma = close.rolling(long).mean()
+    positions = (short_ma > long_ma).astype(np.int64).shift(1, fill_value=0)
+    turnover = positions.diff().fillna(positions).abs()
+    returns = positions * close.pct_change().fillna(0.0) - cost * turnover
+    stats = summary_stats(returns.to_numpy(), positions.to_numpy())
+    return {'positions': positions.to_numpy(), 'returns': returns.to_numpy(),
+            'cumulative': ((1 + returns).cumprod() - 1).to_numpy(),
+            'stats': {name: float(value) for name, value in stats.items()}}
+
+
+def verify_against_reference(close, grid, cost=0.0, atol=1e-9):
+    """
+    逐个参数对用reference_backtest重新计算并与网格结果比较
+
+    累积和均线与rolling均线的舍入误差不同，两条均线几乎相等的日期上信号可能不同，
+    这样的日期单独计数（不视为错误）；其余日期的仓位必须一致，收益和统计量在容差内一致。
+
+    返回:
+    dict - {'pairs': 核对的组合数, 'ties': 均线近似相等导致信号不同的天数, 'mismatches': 不一致的组合}
+    """
+    close = np.asarray(close, dtype=np.float64)
+    short_ma = moving_averages(close, grid['short'])
+    long_ma = moving_averages(close, grid['long'])
+    ties = 0
+    mismatches = []
+    for i, short in enumerate(grid['short']):
+        for j, long in enumerate(grid['long']):
+            if not grid['valid'][i, j]:
+                continue
+            expected = reference_backtest(close, short, long, cost)
+            differs = np.flatnonzero(grid['positions'][i, j] != expected['positions'])
+            # 仓位在信号产生的次日生效，对应信号日为前一天
+            gap = np.abs(short_ma[i, differs - 1] - long_ma[j, differs - 1])
+            near_tie = gap <= 1e-9 * np.abs(long_ma[j, differs - 1])
+            ties += int(near_tie.sum())
+            if not near_tie.all():
+                mismatches.append((int(short), int(long)))
+            elif not len(differs):
+                actual = grid['stats'].loc[(short, long)]
+                if not (np.allclose(grid['returns'][i, j], expected['returns'], rtol=0, atol=atol)
+                        and all(np.isclose(actual[name], expected['stats'][name], rtol=1e-9, atol=atol)
+                                for name in STAT_COLUMNS)):
+                    mismatches.append((int(short), int(long)))
+    return {'pairs': int(grid['valid'].sum()), 'ties': ties, 'mismatches': mismatches}
+
+
+def stock_pro_bar_tickers(store):
+    """stock_pro_bar.csv中的全部股票代码"""
+    return [ts_code for ts_code, part in store.partitions.items() if part['source'] == 'stock_pro_bar.csv']
+
+
+def run_grid(store, tickers, short_windows, long_windows, cost=0.0):
+    """
+    对多只股票分别运行参数网格回测
+
+    返回:
+    DataFrame - 每行为一只股票的一个(short, long)组合及其统计量
+    """
+    tables = []
+    for ts_code in tickers:
+        close = store.read(ts_code, columns=['close'])['close']
+        table = backtest_grid(close, short_windows, long_windows, cost)['stats']
+        tables.append(table.reset_index().assign(ts_code=ts_code))
+    result = pd.concat(tables, ignore_index=True)
+    return result[['ts_code', 'short', 'long'] + STAT_COLUMNS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='双均线策略参数网格回测')
+    parser.add_argument('--tickers', nargs='+', help='股票代码，默认为stock_pro_bar.csv中的全部股票')
+    parser.add_argument('--all', action='store_true', help='回测列式存储中的全部代码')
+    parser.add_argument('--short', type=int, nargs='+', default=DEFAULT_SHORT_WINDOWS, help='短期均线窗口')
+    parser.add_argument('--long', type=int, nargs='+', default=DEFAULT_LONG_WINDOWS, help='长期均线窗口')
+    parser.add_argument('--cost', type=float, default=0.0, help='单边交易成本，如0.001')
+    parser.add_argument('--top', type=int, default=5, help='每只股票显示夏普比率最高的组合数')
+    parser.add_argument('--no-check', action='store_true', help='跳过与逐对参考实现的核对')
+    args = parser.parse_args()
+
+    store = open_store()
+    tickers = store.tickers if args.all else args.tickers or stock_pro_bar_tickers(store)
+
+    start = time.perf_counter()
+    results = run_grid(store, tickers, args.short, args.long, args.cost)
+    grid_seconds = time.perf_counter() - start
+    print(f"{len(tickers)}只股票 × {len(results) // len(tickers)}个参数组合，网格回测耗时{grid_seconds * 1000:.1f}毫秒")
+
+    for ts_code, table in results.groupby('ts_code', sort=False):
+        print(f"\n{ts_code} 夏普比率最高的{args.top}个组合：")
+        print(table.nlargest(args.top, 'sharpe').to_string(index=False, float_format=lambda x: f'{x:.4f}'))
+
+    if not args.no_check:
+        start = time.perf_counter()
+        for ts_code in tickers:
+            close = store.read(ts_code, columns=['close'])['close']
+            report = verify_against_reference(close, backtest_grid(close, args.short, args.long, args.cost), args.cost)
+            status = '一致' if not report['mismatches'] else f"不一致：{report['mismatches']}"
+            print(f"核对{ts_code}：{report['pairs']}个组合与逐对参考实现{status}（均线近似相等的信号差异{report['ties']}天）")
+        print(f"逐对参考实现耗时{(time.perf_counter() - start) * 1000:.1f}毫秒")
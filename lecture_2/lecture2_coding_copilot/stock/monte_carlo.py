@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""分块、可复现的随机游走 / 几何布朗运动价格模拟
+
+漂移和波动率由一只股票的历史收盘价估计：几何布朗运动（gbm）使用日对数收益率，
+随机游走（random_walk）使用日价格变动。路径按固定大小分块生成，第i块总是使用
+SeedSequence(seed).spawn的第i个独立随机数流，各块的统计量按块的顺序归并，
+因此结果只取决于seed和路径数，与进程数无关。
+
+每块在时间步上逐步推进，只保存当前价格和路径上的最高/最低价；到期收益率计入
+固定分箱的直方图（附带每箱收益率之和），由此得到分位数、VaR和CVaR，
+触及概率按路径计数。内存占用只与块大小和分箱数有关，不随路径数×步数增长。
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ohlcv_store import open_store
+
+MODELS = ('gbm', 'random_walk')
+DEFAULT_CHUNK_SIZE = 20000
+DEFAULT_BINS = 20000
+# 直方图覆盖的范围：漂移加减若干倍的到期标准差
+HISTOGRAM_SIGMAS = 10
+DEFAULT_BARRIERS = [-0.2, -0.1, 0.1, 0.2]
+DEFAULT_LEVELS = [0.95, 0.99]
+DEFAULT_QUANTILES = [0.01, 0.05, 0.5, 0.95, 0.99]
+
+
+def calibrate(close, model='gbm'):
+    """
+    由收盘价估计模型参数
+
+    参数:
+    close: ndarray - 时间升序的收盘价
+    model: str - gbm（日对数收益率~N(drift, volatility²)）或random_walk（日价格变动~N(drift, volatility²)）
+
+    返回:
+    dict - {'model', 's0': 最新收盘价, 'drift', 'volatility'}
+    """
+    if model not in MODELS:
+        raise ValueError(f"不支持的模型：{model}，可选：{', '.join(MODELS)}")
+    close = np.asarray(close, dtype=np.float64)
+    steps = np.diff(np.log(close)) if model == 'gbm' else np.diff(close)
+    return {'model': model, 's0': float(close[-1]), 'drift': float(steps.mean()),
+            'volatility': float(steps.std(ddof=1))}
+
+
+def histogram_edges(params, horizon, bins=DEFAULT_BINS):
+    """到期收益率直方图的分箱边界，范围超出部分计入两端的溢出箱"""
+    drift, spread = params['drift'] * horizon, HISTOGRAM_SIGMAS * params['volatility'] * np.sqrt(horizon)
+    if params['model'] == 'gbm':
+        low, high = max(np.expm1(drift - spread), -1.0), np.expm1(drift + spread)
+    else:
+        low, high = (drift - spread) / params['s0'], (drift + spread) / params['s0']
+    return np.linspace(low, high, bins + 1)
+
+
+class PathStats:
+    """
+    可归并的路径统计量
+
+    参数:
+    edges: ndarray - 到期收益率直方图的分箱边界
+    barriers: list - 相对初始价格的涨跌幅阈值（如-0.1表示下跌10%）
+    """
+
+    def __init__(self, edges, barriers):
+        self.edges = edges
+        self.barriers = np.asarray(barriers, dtype=np.float64)
+        # 第0箱和最后一箱分别是下溢和上溢
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.sums = np.zeros(len(edges) + 1)
+        self.hits = np.zeros(len(self.barriers), dtype=np.int64)
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, returns, path_max, path_min):
+        """加入一块路径：到期收益率及路径上的最高、最低收益率"""
+        bins = np.searchsorted(self.edges, returns, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.sums += np.bincount(bins, weights=returns, minlength=len(self.sums))
+        for i, barrier in enumerate(self.barriers):
+            self.hits[i] += int(np.count_nonzero(path_max >= barrier if barrier > 0 else path_min <= barrier))
+        self.n += len(returns)
+        self.total += float(returns.sum())
+        self.total_sq += float(np.square(returns).sum())
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.sums += other.sums
+        self.hits += other.hits
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        return self
+
+    def quantile(self, q):
+        """由直方图线性插值得到到期收益率的q分位数"""
+        target = q * self.n
+        cumulative = np.cumsum(self.counts)
+        i = min(int(np.searchsorted(cumulative, target, side='left')), len(self.counts) - 1)
+        if i == 0 or i == len(self.counts) - 1:
+            # 落在溢出箱中时用该箱的平均值
+            return float(self.sums[i] / max(self.counts[i], 1))
+        before = cumulative[i - 1]
+        fraction = (target - before) / self.counts[i]
+        return float(self.edges[i - 1] + fraction * (self.edges[i] - self.edges[i - 1]))
+
+    def tail_mean(self, q):
+        """最差的q比例路径的平均到期收益率（CVaR对应的收益率）"""
+        target = q * self.n
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, target, side='left'))
+        before = cumulative[i - 1] if i > 0 else 0
+        partial = (target - before) / self.counts[i] * self.sums[i] if self.counts[i] else 0.0
+        return float((self.sums[:i].sum() + partial) / target)
+
+    def summary(self, s0, levels=DEFAULT_LEVELS, quantiles=DEFAULT_QUANTILES):
+        """
+        汇总统计量
+
+        返回:
+        dict - 到期价格的均值、标准差和分位数，各置信水平的VaR/CVaR（以初始价格的比例表示的损失），
+               各阈值的触及概率
+        """
+        mean = self.total / self.n
+        std = np.sqrt(max(self.total_sq / self.n - mean ** 2, 0.0) * self.n / max(self.n - 1, 1))
+        return {
+            'paths': self.n,
+            'terminal_mean': s0 * (1 + mean),
+            'terminal_std': s0 * std,
+            'terminal_quantiles': {q: s0 * (1 + self.quantile(q)) for q in quantiles},
+            'var': {level: -self.quantile(1 - level) for level in levels},
+            'cvar': {level: -self.tail_mean(1 - level) for level in levels},
+            'hit_probability': {float(b): hits / self.n for b, hits in zip(self.barriers, self.hits)},
+        }
+
+
+def simulate_chunk(params, seed_sequence, n_paths, horizon, edges, barriers):
+    """
+    用一个独立的随机数流生成一块路径并返回其统计量
+
+    参数:
+    params: dict - calibrate的结果
+    seed_sequence: SeedSequence - 本块的种子
+    n_paths: int - 本块路径数
+    horizon: int - 模拟的交易日数
+    """
+    rng = np.random.Generator(np.random.PCG64(seed_sequence))
+    drift, volatility = params['drift'], params['volatility']
+    # gbm在对数价格上累加，random_walk在以初始价格为单位的价格上累加
+    if params['model'] == 'random_walk':
+        drift, volatility = drift / params['s0'], volatility / params['s0']
+    state = np.zeros(n_paths)
+    high = np.zeros(n_paths)
+    low = np.zeros(n_paths)
+    shock = np.empty(n_paths)
+    for _ in range(horizon):
+        rng.standard_normal(out=shock)
+        state += drift + volatility * shock
+        np.maximum(high, state, out=high)
+        np.minimum(low, state, out=low)
+    if params['model'] == 'gbm':
+        state, high, low = np.expm1(state), np.expm1(high), np.expm1(low)
+    stats = PathStats(edges, barriers)
+    stats.add(state, high, low)
+    return stats
+
+
+def _chunk_task(args):
+    return simulate_chunk(*args)
+
+
+def simulate(params, n_paths, horizon, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1,
+             barriers=DEFAULT_BARRIERS, bins=DEFAULT_BINS):
+    """
+    分块模拟n_paths条路径
+
+    参数:
+    params: dict - calibrate的结果
+    n_paths: int - 路径数
+    horizon: int - 模拟的交易日数
+    seed: int - 随机种子
+    chunk_size: int - 每块路径数（固定后结果与workers无关）
+    workers: int - 进程数
+    barriers: list - 触及概率的涨跌幅阈值
+    bins: int - 到期收益率直方图的分箱数
+
+    返回:
+    PathStats
+    """
+    edges = histogram_edges(params, horizon, bins)
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(params, seed_sequence, size, horizon, edges, barriers) for seed_sequence, size in zip(seeds, sizes)]
+
+    total = PathStats(edges, barriers)
+    if workers <= 1:
+        for task in tasks:
+            total.merge(_chunk_task(task))
+    else:
+        # map按提交顺序返回结果，浮点累加的顺序与单进程时相同
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for stats in executor.map(_chunk_task, tasks):
+                total.merge(stats)
+    return total
+
+
+def print_summary(summary, ts_code, params, horizon):
+    print(f"\n{ts_code} {params['model']}模型：初始价格{params['s0']:.2f}，"
+          f"日漂移{params['drift']:.6f}，日波动率{params['volatility']:.6f}，模拟{horizon}个交易日")
+    print(f"路径数{summary['paths']:,}，到期价格均值{summary['terminal_mean']:.2f}，标准差{summary['terminal_std']:.2f}")
+    print("到期价格分位数：" + '，'.join(f"{q:.0%}: {value:.2f}" for q, value in summary['terminal_quantiles'].items()))
+    for level in summary['var']:
+        print(f"{level:.0%} VaR: {summary['var'][level]:.2%}，CVaR: {summary['cvar'][level]:.2%}")
+    print("触及概率：" + '，'.join(f"{barrier:+.0%}: {p:.2%}" for barrier, p in summary['hit_probability'].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='基于历史数据校准的随机游走/几何布朗运动蒙特卡洛模拟')
+    parser.add_argument('--ts-code', default='600519.SH', help='股票或指数代码')
+    parser.add_argument('--model', choices=MODELS, default='gbm', help='价格模型')
+    parser.add_argument('--lookback', type=int, default=750, help='用于估计参数的最近交易日数，0表示全部历史')
+    parser.add_argument('--paths', type=int, default=1000000, help='路径数')
+    parser.add_argument('--horizon', type=int, default=250, help='模拟的交易日数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块路径数')
+    parser.add_argument('--workers', type=int, default=1, help='进程数')
+    parser.add_argument('--check', action='store_true', help='以不同进程数重复模拟，检查结果完全一致')
+    args = parser.parse_args()
+
+    close = np.asarray(open_store().read(args.ts_code, columns=['close'])['close'], dtype=np.float64)
+    if args.lookback:
+        close = close[-(args.lookback + 1):]
+    params = calibrate(close, args.model)
+
+    start = time.perf_counter()
+    stats = simulate(params, args.paths, args.horizon, args.seed, args.chunk_size, args.workers)
+    seconds = time.perf_counter() - start
+    summary = stats.summary(params['s0'])
+    print_summary(summary, args.ts_code, params, args.horizon)
+    print(f"耗时{seconds:.2f}秒（{args.paths * args.horizon / seconds / 1e6:.1f}百万步/秒）")
+
+    if params['model'] == 'gbm':
+        expected = params['s0'] * np.exp((params['drift'] + params['volatility'] ** 2 / 2) * args.horizon)
+        print(f"到期价格均值的理论值{expected:.2f}，模拟值{summary['terminal_mean']:.2f}")
+
+    if args.check:
+        other_workers = 2 if args.workers == 1 else 1
+        other = simulate(params, args.paths, args.horizon, args.seed, args.chunk_size, other_workers)
+        same = (np.array_equal(stats.counts, other.counts) and np.array_equal(stats.sums, other.sums)
+                and np.array_equal(stats.hits, other.hits) and stats.total == other.total)
+        print(f"{args.workers}个进程与{other_workers}个进程的结果{'完全一致' if same else '不一致'}")
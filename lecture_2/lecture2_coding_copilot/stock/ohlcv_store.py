@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""data/cn_stock日线数据的列式内存映射存储
+
+600519.csv、688256.csv、index_sh.csv、house_index.csv和stock_pro_bar.csv
+都是tushare日线格式（ts_code, trade_date, open, high, low, close, pre_close,
+change, pct_chg, vol, amount），按日期降序保存，部分文件带BOM，列顺序也不完全相同。
+
+ingest把它们合并为列式二进制存储：每列一个.npy文件，各股票的数据按ts_code分区
+连续存放，分区内trade_date升序（int32，如20250908），价格列为float64（可选float32），
+成交量和成交额为float64。同一股票同一交易日重复出现的行只保留第一次。
+OHLCVStore以内存映射方式打开这些文件，读取一只股票或一个日期区间只需切片，
+不解析任何文本；源文件未变化时ingest直接复用已有存储。
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', '..', '..', 'lecture_1', 'lecture1_introduction'))
+from data_cache import CACHE_DIR_NAME, file_signature
+
+STOCK_DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..', 'data', 'cn_stock'))
+SOURCES = ['600519.csv', '688256.csv', 'index_sh.csv', 'house_index.csv', 'stock_pro_bar.csv']
+STORE_DIR = os.path.join(STOCK_DATA_DIR, CACHE_DIR_NAME, 'ohlcv_store')
+
+# 存储格式版本号，格式变化时递增即可让旧存储失效
+STORE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg']
+VOLUME_COLUMNS = ['vol', 'amount']
+VALUE_COLUMNS = PRICE_COLUMNS + VOLUME_COLUMNS
+SCHEMA = ['ts_code', 'trade_date'] + VALUE_COLUMNS
+
+
+def int_to_datetime64(dates):
+    """把int32日期（如20250908）转换为datetime64[D]"""
+    dates = np.asarray(dates, dtype=np.int64)
+    years = dates // 10000
+    months = dates // 100 % 100
+    days = dates % 100
+    month_starts = (years - 1970) * 12 + (months - 1)
+    return month_starts.astype('datetime64[M]').astype('datetime64[D]') + (days - 1).astype('timedelta64[D]')
+
+
+def _to_int_date(value):
+    """接受20250908、'2025-09-08'、Timestamp等形式的日期，返回int日期"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).strftime('%Y%m%d'))
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _sources_unchanged(manifest, paths):
+    """修改时间和大小都没变时视为未变化，否则比较内容哈希"""
+    recorded = manifest.get('sources', {})
+    if set(recorded) != {os.path.basename(path) for path in paths}:
+        return False
+    for path in paths:
+        cached = recorded[os.path.basename(path)]
+        current = file_signature(path, with_hash=False)
+        if current['mtime_ns'] == cached['mtime_ns'] and current['size'] == cached['size']:
+            continue
+        if file_signature(path)['sha1'] != cached['sha1']:
+            return False
+    return True
+
+
+def _read_source(path):
+    """读取一个tushare日线CSV（utf-8-sig同时兼容有无BOM），按列名取出统一的列顺序"""
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype={'ts_code': str, 'trade_date': np.int32})
+    missing = set(SCHEMA) - set(df.columns)
+    if missing:
+        raise ValueError(f"{os.path.basename(path)}缺少列：{', '.join(sorted(missing))}")
+    return df[SCHEMA]
+
+
+def ingest(sources=None, store_dir=STORE_DIR, price_dtype='float64', force=False):
+    """
+    把日线CSV转换为列式存储
+
+    参数:
+    sources: list - 源文件路径，默认为data/cn_stock下的SOURCES
+    store_dir: str - 存储目录
+    price_dtype: str - 价格列类型，float64或float32
+    force: bool - 忽略已有存储，重新转换
+
+    返回:
+    OHLCVStore
+    """
+    if price_dtype not in ('float64', 'float32'):
+        raise ValueError(f"不支持的价格类型：{price_dtype}")
+    paths = [os.path.abspath(path) for path in sources or [os.path.join(STOCK_DATA_DIR, name) for name in SOURCES]]
+
+    manifest = _read_manifest(store_dir)
+    if (not force and manifest is not None and manifest.get('version') == STORE_VERSION
+            and manifest.get('price_dtype') == price_dtype and _sources_unchanged(manifest, paths)):
+        return OHLCVStore(store_dir)
+
+    frames = []
+    for path in paths:
+        df = _read_source(path)
+        df['source'] = os.path.basename(path)
+        frames.append(df)
+    data = pd.concat(frames, ignore_index=True)
+    duplicated = data.duplicated(['ts_code', 'trade_date'])
+    if duplicated.any():
+        print(f"丢弃{int(duplicated.sum())}行重复的（ts_code, trade_date）记录")
+    data = data[~duplicated].sort_values(['ts_code', 'trade_date'], kind='stable')
+
+    # 先写到临时目录，全部完成后再替换旧存储
+    tmp_dir = store_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'trade_date.npy'), data['trade_date'].to_numpy(dtype=np.int32))
+    for column in VALUE_COLUMNS:
+        dtype = price_dtype if column in PRICE_COLUMNS else 'float64'
+        np.save(os.path.join(tmp_dir, f'{column}.npy'), data[column].to_numpy(dtype=dtype))
+
+    codes = data['ts_code'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+    stops = np.r_[starts[1:], len(codes)]
+    dates = data['trade_date'].to_numpy()
+    sources_of = data['source'].to_numpy()
+    partitions = {
+        str(codes[start]): {'start': int(start), 'stop': int(stop), 'first_date': int(dates[start]),
+                            'last_date': int(dates[stop - 1]), 'source': str(sources_of[start])}
+        for start, stop in zip(starts, stops)
+    }
+    manifest = {
+        'version': STORE_VERSION,
+        'price_dtype': price_dtype,
+        'rows': int(len(data)),
+        'sources': {os.path.basename(path): file_signature(path) for path in paths},
+        'partitions': partitions,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+    print(f"已写入列式存储：{len(partitions)}个代码，共{len(data)}行 -> {store_dir}")
+    return OHLCVStore(store_dir)
+
+
+class OHLCVStore:
+    """
+    列式日线存储的只读视图
+
+    参数:
+    store_dir: str - ingest写入的存储目录
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        manifest = _read_manifest(store_dir)
+        if manifest is None or manifest.get('version') != STORE_VERSION:
+            raise FileNotFoundError(f"未找到可用的列式存储，请先运行ingest：{store_dir}")
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.partitions = manifest['partitions']
+        self._columns = {}
+
+    def __repr__(self):
+        return f"OHLCVStore({self.store_dir!r}, {len(self)}个代码, {self.manifest['rows']}行)"
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def __contains__(self, ts_code):
+        return ts_code in self.partitions
+
+    @property
+    def tickers(self):
+        return list(self.partitions)
+
+    def column(self, name):
+        """整列数据（全部代码按分区连续排列）的内存映射数组"""
+        if name not in self._columns:
+            if name != 'trade_date' and name not in VALUE_COLUMNS:
+                raise KeyError(f"未知的列：{name}")
+            self._columns[name] = np.load(os.path.join(self.store_dir, f'{name}.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def _slice(self, ts_code, start=None, end=None):
+        """一只股票在日期闭区间[start, end]内的行范围"""
+        if ts_code not in self.partitions:
+            raise KeyError(f"存储中没有{ts_code}")
+        part = self.partitions[ts_code]
+        dates = self.column('trade_date')[part['start']:part['stop']]
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_int_date(start), side='left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, _to_int_date(end), side='right'))
+        return slice(part['start'] + lo, part['start'] + max(lo, hi))
+
+    def read(self, ts_code, start=None, end=None, columns=None):
+        """
+        读取一只股票（可限定日期区间）的若干列
+
+        参数:
+        ts_code: str - 如'600519.SH'
+        start, end: 日期闭区间，可为20240101、'2024-01-01'等形式，None表示不限
+        columns: list - 需要的列，默认为trade_date和全部数值列
+
+        返回:
+        dict - {列名: 内存映射数组的切片（只读，不复制）}
+        """
+        rows = self._slice(ts_code, start, end)
+        columns = columns or ['trade_date'] + VALUE_COLUMNS
+        return {name: self.column(name)[rows] for name in columns}
+
+    def frame(self, ts_code, start=None, end=None, columns=None):
+        """与read相同，但返回以交易日（datetime64）为索引的DataFrame"""
+        arrays = self.read(ts_code, start, end, columns)
+        index = pd.DatetimeIndex(int_to_datetime64(self.read(ts_code, start, end, ['trade_date'])['trade_date']),
+                                 name='trade_date')
+        return pd.DataFrame({name: np.asarray(values) for name, values in arrays.items() if name != 'trade_date'},
+                            index=index)
+
+    def matrix(self, columns, tickers=None, start=None, end=None):
+        """
+        把若干股票对齐到共同的交易日，得到 交易日 × 股票 的矩阵
+
+        参数:
+        columns: list - 需要的数值列
+        tickers: list - 股票代码，默认为全部
+        start, end: 日期闭区间
+
+        返回:
+        tuple - (int32交易日数组, 股票代码列表, {列名: float64矩阵})，某只股票当天没有数据时为NaN
+        """
+        tickers = list(tickers or self.tickers)
+        slices = [self._slice(ts_code, start, end) for ts_code in tickers]
+        all_dates = self.column('trade_date')
+        dates = np.unique(np.concatenate([all_dates[rows] for rows in slices])) if slices else np.empty(0, np.int32)
+        matrices = {name: np.full((len(dates), len(tickers)), np.nan) for name in columns}
+        for j, rows in enumerate(slices):
+            positions = np.searchsorted(dates, all_dates[rows])
+            for name in columns:
+                matrices[name][positions, j] = self.column(name)[rows]
+        return dates, tickers, matrices
+
+
+def open_store(force=False, price_dtype='float64'):
+    """打开默认的列式存储，源文件有变化或存储不存在时先重新转换"""
+    return ingest(price_dtype=price_dtype, force=force)
+
+
+def _benchmark(store):
+    """对比解析全部CSV与从列式存储读取全部数据的耗时"""
+    start = time.perf_counter()
+    for name in SOURCES:
+        _read_source(os.path.join(STOCK_DATA_DIR, name))
+    csv_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reopened = OHLCVStore(store.store_dir)
+    checksum = 0.0
+    for ts_code in reopened.tickers:
+        bars = reopened.read(ts_code)
+        checksum += float(np.asarray(bars['close'], dtype=np.float64).sum())
+    store_seconds = time.perf_counter() - start
+    print(f"解析全部CSV：{csv_seconds * 1000:.1f}毫秒；从列式存储读取全部代码：{store_seconds * 1000:.2f}毫秒"
+          f"（{csv_seconds / store_seconds:.0f}倍）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='把data/cn_stock日线CSV转换为列式内存映射存储')
+    parser.add_argument('--force', action='store_true', help='忽略已有存储，重新转换')
+    parser.add_argument('--float32', action='store_true', help='价格列以float32保存')
+    parser.add_argument('--show', metavar='TS_CODE', help='显示一只股票的数据，如600519.SH')
+    parser.add_argument('--start', help='起始日期，如20240101')
+    parser.add_argument('--end', help='结束日期，如20241231')
+    parser.add_argument('--benchmark', action='store_true', help='对比CSV解析与列式存储读取的耗时')
+    args = parser.parse_args()
+
+    store = ingest(price_dtype='float32' if args.float32 else 'float64', force=args.force)
+    print(store)
+    for ts_code, part in store.partitions.items():
+        print(f"  {ts_code:<12}{part['stop'] - part['start']:>6}行  {part['first_date']} ~ {part['last_date']}  ({part['source']})")
+    if args.show:
+        print(store.frame(args.show, args.start, args.end))
+    if args.benchmark:
+        _benchmark(store)
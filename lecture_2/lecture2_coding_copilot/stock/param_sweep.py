@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""基于共享内存进程池的策略参数扫描
+
+收盘价和成交量矩阵（交易日 × 股票，见OHLCVStore.matrix）只在主进程中放入
+multiprocessing.shared_memory一次，工作进程在initializer中按名称挂载为numpy数组，
+任务只携带(股票序号, 短期窗口, 长期窗口, 成交量窗口)元组，不再序列化价格数据。
+
+策略为双均线（见ma_backtest.py）加可选的成交量确认：成交量窗口大于0时，
+还要求当日成交量高于其均量才持有。每块任务在工作进程中向量化计算，
+只把本块夏普比率最高的k个结果传回主进程，主进程用堆做流式的top-k归并。
+"""
+
+import argparse
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ma_backtest import STAT_COLUMNS, backtest_grid, moving_averages, summary_stats
+from ohlcv_store import open_store
+
+DEFAULT_SHORT_WINDOWS = list(range(2, 61, 2))
+DEFAULT_LONG_WINDOWS = list(range(10, 251, 10))
+DEFAULT_VOLUME_WINDOWS = [0, 5, 10, 20]
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_TOP_K = 10
+
+# 工作进程挂载的共享矩阵，由进程池的initializer在每个进程中设置一次
+_shared = {}
+
+
+def _attach_shared(specs):
+    """按(名称, 形状, 类型)挂载共享内存中的矩阵"""
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def _series(ticker):
+    """一只股票有数据的交易日上的收盘价和成交量"""
+    close = _shared['close'][1][:, ticker]
+    volume = _shared['vol'][1][:, ticker]
+    valid = ~np.isnan(close)
+    return close[valid], volume[valid]
+
+
+def evaluate_jobs(close, volume, jobs, cost=0.0):
+    """
+    向量化回测同一只股票上的一组参数
+
+    参数:
+    close, volume: ndarray - 时间升序的收盘价和成交量
+    jobs: ndarray - 形状为(任务数, 3)的(短期窗口, 长期窗口, 成交量窗口)
+    cost: float - 单边交易成本
+
+    返回:
+    dict - {统计量名称: 每个任务的数值}
+    """
+    shorts, longs, volume_windows = jobs[:, 0], jobs[:, 1], jobs[:, 2]
+    price_windows = np.unique(np.concatenate([shorts, longs]))
+    price_ma = moving_averages(close, price_windows)
+    signal = price_ma[np.searchsorted(price_windows, shorts)] > price_ma[np.searchsorted(price_windows, longs)]
+
+    confirm = volume_windows > 0
+    if confirm.any():
+        windows = np.unique(volume_windows[confirm])
+        volume_ma = moving_averages(volume, windows)
+        signal[confirm] &= volume[None, :] > volume_ma[np.searchsorted(windows, volume_windows[confirm])]
+
+    positions = np.zeros(signal.shape, dtype=np.int8)
+    positions[:, 1:] = signal[:, :-1]
+    asset_returns = np.zeros(len(close))
+    asset_returns[1:] = close[1:] / close[:-1] - 1
+    returns = positions * asset_returns - cost * np.abs(np.diff(positions, axis=-1, prepend=0))
+    return summary_stats(returns, positions)
+
+
+def _run_chunk(ticker, jobs, cost, top_k, metric):
+    """工作进程中执行一块任务，只返回本块的top-k结果和任务数"""
+    close, volume = _series(ticker)
+    stats = evaluate_jobs(close, volume, jobs, cost)
+    best = np.argsort(-stats[metric], kind='stable')[:top_k]
+    return [(float(stats[metric][i]), ticker, tuple(int(v) for v in jobs[i]),
+             {name: float(stats[name][i]) for name in STAT_COLUMNS}) for i in best], len(jobs)
+
+
+def build_jobs(n_tickers, short_windows, long_windows, volume_windows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    生成任务块：每块只含同一只股票的参数组合（短期窗口小于长期窗口）
+
+    返回:
+    list - [(股票序号, (任务数, 3)的int64数组)]
+    """
+    grid = np.array([(s, l, v) for s in short_windows for l in long_windows for v in volume_windows if s < l],
+                    dtype=np.int64).reshape(-1, 3)
+    return [(ticker, grid[i:i + chunk_size]) for ticker in range(n_tickers) for i in range(0, len(grid), chunk_size)]
+
+
+class SharedMatrices:
+    """
+    把若干矩阵放入共享内存的上下文管理器，退出时释放
+
+    参数:
+    arrays: dict - {名称: ndarray}
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.blocks = []
+        self.specs = {}
+
+    def __enter__(self):
+        for key, array in self.arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+        return self.specs
+
+    def __exit__(self, *exc_info):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def sweep(specs, chunks, workers=1, cost=0.0, top_k=DEFAULT_TOP_K, metric='sharpe'):
+    """
+    在进程池中执行全部任务块，流式归并出top-k
+
+    参数:
+    specs: dict - SharedMatrices返回的共享矩阵描述
+    chunks: list - build_jobs生成的任务块
+    workers: int - 进程数
+    cost: float - 单边交易成本
+    top_k: int - 保留的最优结果数
+    metric: str - 排序依据的统计量
+
+    返回:
+    tuple - (按metric降序的[(metric值, 股票序号, (短期, 长期, 成交量窗口), 统计量)], 回测次数)
+    """
+    heap = []
+    total = 0
+    # 堆中保留(metric值, 序号)最大的k个，序号保证同值时结果与完成顺序无关
+    with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared, initargs=(specs,)) as executor:
+        futures = {executor.submit(_run_chunk, ticker, jobs, cost, top_k, metric): n
+                   for n, (ticker, jobs) in enumerate(chunks)}
+        for future in as_completed(futures):
+            results, count = future.result()
+            total += count
+            for rank, item in enumerate(results):
+                entry = (item[0], -futures[future], -rank, item)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry[:3] > heap[0][:3]:
+                    heapq.heapreplace(heap, entry)
+    return [entry[3] for entry in sorted(heap, key=lambda entry: entry[:3], reverse=True)], total
+
+
+def check_top(store_close, store_volume, top, cost=0.0):
+    """在主进程中重新回测top-k结果；成交量窗口为0的结果再与ma_backtest的网格回测比较"""
+    for value, ticker, (short, long, volume_window), stats in top:
+        valid = ~np.isnan(store_close[:, ticker])
+        close, volume = store_close[valid, ticker], store_volume[valid, ticker]
+        expected = evaluate_jobs(close, volume, np.array([[short, long, volume_window]]), cost)
+        if not all(np.isclose(stats[name], expected[name][0]) for name in STAT_COLUMNS):
+            return False
+        if volume_window == 0:
+            grid = backtest_grid(close, [short], [long], cost)['stats'].iloc[0]
+            if not all(np.isclose(stats[name], grid[name]) for name in STAT_COLUMNS):
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='基于共享内存进程池的双均线参数扫描')
+    parser.add_argument('--workers', type=int, nargs='+', help='依次测试的进程数，默认为1、2和CPU核数')
+    parser.add_argument('--short', type=int, nargs='+', default=DEFAULT_SHORT_WINDOWS, help='短期均线窗口')
+    parser.add_argument('--long', type=int, nargs='+', default=DEFAULT_LONG_WINDOWS, help='长期均线窗口')
+    parser.add_argument('--volume', type=int, nargs='+', default=DEFAULT_VOLUME_WINDOWS,
+                        help='成交量确认窗口，0表示不使用成交量确认')
+    parser.add_argument('--cost', type=float, default=0.0, help='单边交易成本，如0.001')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块的参数组合数')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP_K, help='保留的最优结果数')
+    args = parser.parse_args()
+
+    store = open_store()
+    dates, tickers, matrices = store.matrix(['close', 'vol'])
+    chunks = build_jobs(len(tickers), args.short, args.long, args.volume, args.chunk_size)
+    n_jobs = sum(len(jobs) for _, jobs in chunks)
+    matrix_mb = sum(matrix.nbytes for matrix in matrices.values()) / 1024 / 1024
+    print(f"{len(tickers)}只股票 × {len(dates)}个交易日，共享矩阵{matrix_mb:.1f}MB；"
+          f"{n_jobs}次回测，分为{len(chunks)}块")
+
+    worker_counts = args.workers or sorted({1, 2, os.cpu_count() or 1})
+    with SharedMatrices(matrices) as specs:
+        for workers in worker_counts:
+            start = time.perf_counter()
+            top, total = sweep(specs, chunks, workers, args.cost, args.top)
+            seconds = time.perf_counter() - start
+            print(f"{workers}个进程：{seconds:.2f}秒，{total / seconds:,.0f}次回测/秒")
+
+    print(f"\n夏普比率最高的{args.top}个组合：")
+    for value, ticker, (short, long, volume_window), stats in top:
+        print(f"  {tickers[ticker]:<12}短期{short:>4} 长期{long:>4} 成交量窗口{volume_window:>3}  "
+              f"夏普{value:.4f}  总收益{stats['total_return']:.2%}  最大回撤{stats['max_drawdown']:.2%}")
+    status = '一致' if check_top(matrices['close'], matrices['vol'], top, args.cost) else '不一致'
+    print(f"top-k结果与主进程重新回测及ma_backtest网格回测{status}")
@@ -0,0 +1,596 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""逐根K线O(1)更新的滚动指标
+
+每个指标是一个带__slots__的小状态对象：简单均线用环形缓冲区和滑动和，
+滚动标准差用滑动窗口的Welford更新，EMA、RSI和ATR只保存上一期的平滑值，
+滚动最高/最低价用单调队列（摊还O(1)）。每追加一根K线调用update，
+不必在整段历史上重新计算。
+
+每个指标都有向量化的batch（对整段历史一次算出全部数值）和from_history
+（用batch初始化，再把状态设置到历史末尾，之后逐根update），
+两条路径与全量重新计算的结果在浮点误差内一致（见本文件的__main__）。
+定义与pandas一致：均线和标准差为rolling(window).mean()/std()，
+EMA为ewm(span, adjust=False)，RSI和ATR为Wilder平滑 ewm(alpha=1/window, adjust=False, min_periods=window)。
+
+所有指标都把非有限值（NaN、inf）视为缺失，缺失值的处理与pandas相同：
+均线、标准差和滚动最高/最低价在窗口内有缺失时为NaN，缺失移出窗口后恢复；
+EMA、RSI和ATR在缺失处保持上一期的值，缺失期间旧值的权重照常衰减（ewm的ignore_na=False）。
+"""
+
+import argparse
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ohlcv_store import open_store
+
+NAN = float('nan')
+
+
+def _rolling_windows(values, window):
+    """长度与values相同的滑动窗口结果的前window-1个位置为NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    return sliding_window_view(values, window) if len(values) >= window else np.empty((0, window))
+
+
+def _pad(values, n):
+    return np.concatenate([np.full(n - len(values), np.nan), values])
+
+
+def _finite(values):
+    """转换为浮点数组，非有限值（inf）统一为NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, np.nan)
+
+
+def _ewm_step(value, weight, x, alpha):
+    """
+    ewm(alpha, adjust=False)的单步更新，x为NaN时保持原值（ignore_na=False）
+
+    返回:
+    tuple - (平滑值, 旧值的权重)
+    """
+    if value != value:
+        return (x, 1.0) if x == x else (value, weight)
+    weight *= 1.0 - alpha
+    if x != x:
+        return value, weight
+    if alpha == 0.5:
+        # pandas在alpha恰为0.5（span=3、com=1）时按 权重*旧值 + (1-权重)*新值 计算，缺失之后的结果与一般公式不同
+        return weight * value + (1.0 - weight) * x, 1.0
+    return (weight * value + alpha * x) / (weight + alpha), 1.0
+
+
+def _ewm_state(values, alpha):
+    """
+    ewm(alpha, adjust=False)在序列末尾的状态
+
+    返回:
+    tuple - (平滑值, 旧值的权重, 非缺失的观测数)
+    """
+    observed = np.flatnonzero(~np.isnan(values))
+    if not len(observed):
+        return NAN, 1.0, 0
+    value = float(pd.Series(values).ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+    return value, (1.0 - alpha) ** (len(values) - 1 - observed[-1]), len(observed)
+
+
+class Indicator(ABC):
+    """指标基类：子类实现update、batch和_restore"""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def update(self, *bar):
+        """追加一根K线，返回最新的指标值"""
+
+    @classmethod
+    @abstractmethod
+    def batch(cls, *series, **params):
+        """向量化地计算整段历史上的指标值"""
+
+    @abstractmethod
+    def _restore(self, *series):
+        """由历史数据的末尾部分设置状态"""
+
+    @classmethod
+    def from_history(cls, *series, **params):
+        """
+        用向量化的batch计算历史上的全部数值，并返回状态位于历史末尾的指标
+
+        返回:
+        tuple - (指标对象, 历史上每根K线的指标值)
+        """
+        indicator = cls(**params)
+        values = cls.batch(*series, **params)
+        if len(series[0]):
+            indicator._restore(*[_finite(s) for s in series])
+        return indicator, values
+
+
+class SMA(Indicator):
+    """简单移动平均：环形缓冲区 + 滑动和（只累加有限值，另计窗口内的缺失数）"""
+
+    __slots__ = ('window', 'buffer', 'head', 'count', 'missing', 'total', 'value')
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, close):
+        if self.count == self.window:
+            old = self.buffer[self.head]
+            if math.isfinite(old):
+                self.total -= old
+            else:
+                self.missing -= 1
+        else:
+            self.count += 1
+        self.buffer[self.head] = close
+        self.head = (self.head + 1) % self.window
+        if math.isfinite(close):
+            self.total += close
+        else:
+            self.missing += 1
+        self.value = self.total / self.window if self.count == self.window and not self.missing else NAN
+        return self.value
+
+    @classmethod
+    def batch(cls, close, window):
+        close = np.asarray(close, dtype=np.float64)
+        missing = ~np.isfinite(close)
+        csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, close))))
+        cmissing = np.concatenate(([0], np.cumsum(missing)))
+        if len(close) < window:
+            return _pad(np.empty(0), len(close))
+        values = (csum[window:] - csum[:-window]) / window
+        values[cmissing[window:] > cmissing[:-window]] = np.nan
+        return _pad(values, len(close))
+
+    def _restore(self, close):
+        tail = close[-self.window:]
+        finite = np.isfinite(tail)
+        self.buffer = list(tail) + [0.0] * (self.window - len(tail))
+        self.count = len(tail)
+        self.head = self.count % self.window
+        self.missing = int((~finite).sum())
+        self.total = float(tail[finite].sum())
+        self.value = self.total / self.window if self.count == self.window and not self.missing else NAN
+
+
+class RollingStd(Indicator):
+    """
+    滚动标准差：环形缓冲区上的滑动Welford更新（均值和离差平方和）
+
+    窗口内有缺失值时暂停更新，缺失值移出窗口后由缓冲区重新计算一次均值和离差平方和
+    """
+
+    __slots__ = ('window', 'ddof', 'buffer', 'head', 'count', 'missing', 'stale', 'mean', 'm2', 'value')
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.buffer = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.missing = 0
+        self.stale = False
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = NAN
+
+    def _recompute(self):
+        values = self.buffer[:self.count]
+        self.mean = math.fsum(values) / self.count
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+        self.stale = False
+
+    def update(self, close):
+        full = self.count == self.window
+        old = self.buffer[self.head]
+        if not full:
+            self.count += 1
+        elif not math.isfinite(old):
+            self.missing -= 1
+        self.buffer[self.head] = close
+        self.head = (self.head + 1) % self.window
+        if not math.isfinite(close):
+            self.missing += 1
+            self.stale = True
+        if self.missing:
+            self.value = NAN
+            return self.value
+        if self.stale:
+            self._recompute()
+        elif full:
+            old_mean = self.mean
+            self.mean += (close - old) / self.window
+            self.m2 += (close - old) * (close - self.mean + old - old_mean)
+        else:
+            delta = close - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (close - self.mean)
+        if self.count == self.window and self.window > self.ddof:
+            self.value = max(self.m2, 0.0) ** 0.5 / (self.window - self.ddof) ** 0.5
+        else:
+            self.value = NAN
+        return self.value
+
+    @classmethod
+    def batch(cls, close, window, ddof=1):
+        close = np.asarray(close, dtype=np.float64)
+        close = np.where(np.isfinite(close), close, np.nan)
+        return _pad(_rolling_windows(close, window).std(axis=1, ddof=ddof), len(close))
+
+    def _restore(self, close):
+        tail = close[-self.window:]
+        self.buffer = list(tail) + [0.0] * (self.window - len(tail))
+        self.count = len(tail)
+        self.head = self.count % self.window
+        self.missing = int((~np.isfinite(tail)).sum())
+        self.stale = bool(self.missing)
+        if not self.missing:
+            self.mean = float(tail.mean())
+            self.m2 = float(((tail - self.mean) ** 2).sum())
+        self.value = float(self.batch(tail, self.window, self.ddof)[-1])
+
+
+class EMA(Indicator):
+    """指数移动平均，与ewm(span=window, adjust=False)一致（以第一个有效值为初值）"""
+
+    __slots__ = ('window', 'alpha', 'weight', 'value')
+
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.weight = 1.0
+        self.value = NAN
+
+    def update(self, close):
+        close = close if math.isfinite(close) else NAN
+        self.value, self.weight = _ewm_step(self.value, self.weight, close, self.alpha)
+        return self.value
+
+    @classmethod
+    def batch(cls, close, window):
+        return pd.Series(_finite(close)).ewm(span=window, adjust=False).mean().to_numpy()
+
+    def _restore(self, close):
+        self.value, self.weight, _ = _ewm_state(close, self.alpha)
+
+
+def _wilder(values, window):
+    """Wilder平滑：ewm(alpha=1/window, adjust=False, min_periods=window)"""
+    return pd.Series(values, dtype=np.float64).ewm(alpha=1.0 / window, adjust=False,
+                                                    min_periods=window).mean().to_numpy()
+
+
+class RSI(Indicator):
+    """
+    相对强弱指数（Wilder平滑），累计window个有效涨跌幅后有值
+
+    收盘价缺失时，缺失当根和下一根的涨跌幅都视为缺失，与np.diff的结果一致
+    """
+
+    __slots__ = ('window', 'prev_close', 'count', 'weight', 'avg_gain', 'avg_loss', 'value')
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = NAN
+        self.count = 0
+        self.weight = 1.0
+        self.avg_gain = NAN
+        self.avg_loss = NAN
+        self.value = NAN
+
+    def update(self, close):
+        close = close if math.isfinite(close) else NAN
+        change = close - self.prev_close
+        self.prev_close = close
+        # 第一根K线的涨跌幅也是NaN，此时平滑值尚未开始，不影响状态
+        gain, loss = (max(change, 0.0), max(-change, 0.0)) if change == change else (NAN, NAN)
+        alpha = 1.0 / self.window
+        # 涨幅和跌幅同时缺失，两者旧值的权重相同
+        self.avg_gain, _ = _ewm_step(self.avg_gain, self.weight, gain, alpha)
+        self.avg_loss, self.weight = _ewm_step(self.avg_loss, self.weight, loss, alpha)
+        self.count += change == change
+        self.value = self._rsi_value(self.avg_gain, self.avg_loss) if self.count >= self.window else NAN
+        return self.value
+
+    @staticmethod
+    def _rsi_value(avg_gain, avg_loss):
+        """单根K线的RSI（标量分支，与_rsi的计算相同）"""
+        if avg_loss > 0:
+            return 100 - 100 / (1 + avg_gain / avg_loss)
+        return 100.0 if avg_gain > 0 else 50.0
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(avg_loss > 0, 100 - 100 / (1 + avg_gain / np.where(avg_loss > 0, avg_loss, 1)),
+                            np.where(avg_gain > 0, 100.0, 50.0)) * 1.0
+
+    @classmethod
+    def batch(cls, close, window=14):
+        change = np.diff(_finite(close))
+        avg_gain = _wilder(np.maximum(change, 0.0), window)
+        avg_loss = _wilder(np.maximum(-change, 0.0), window)
+        return _pad(np.where(np.isnan(avg_gain), np.nan, cls._rsi(avg_gain, avg_loss)), len(close))
+
+    def _restore(self, close):
+        change = np.diff(close)
+        self.prev_close = float(close[-1])
+        alpha = 1.0 / self.window
+        self.avg_gain, self.weight, self.count = _ewm_state(np.maximum(change, 0.0), alpha)
+        self.avg_loss, _, _ = _ewm_state(np.maximum(-change, 0.0), alpha)
+        self.value = self._rsi_value(self.avg_gain, self.avg_loss) if self.count >= self.window else NAN
+
+
+class ATR(Indicator):
+    """
+    平均真实波幅（Wilder平滑），累计window个有效真实波幅后有值
+
+    真实波幅取三个区间中非缺失的最大值：第一根K线或上一根收盘价缺失时为最高价减最低价，
+    三者都缺失时该根K线的真实波幅视为缺失
+    """
+
+    __slots__ = ('window', 'prev_close', 'count', 'weight', 'atr', 'value')
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = NAN
+        self.count = 0
+        self.weight = 1.0
+        self.atr = NAN
+        self.value = NAN
+
+    def update(self, high, low, close):
+        ranges = [r for r in (high - low, abs(high - self.prev_close), abs(low - self.prev_close)) if math.isfinite(r)]
+        true_range = max(ranges) if ranges else NAN
+        self.prev_close = close if math.isfinite(close) else NAN
+        self.atr, self.weight = _ewm_step(self.atr, self.weight, true_range, 1.0 / self.window)
+        self.count += true_range == true_range
+        self.value = self.atr if self.count >= self.window else NAN
+        return self.value
+
+    @staticmethod
+    def true_range(high, low, close):
+        high, low, close = (_finite(v) for v in (high, low, close))
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        ranges = np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+        # fmax忽略NaN，三者都为NaN时结果为NaN（不像nanmax那样发出警告）
+        return np.fmax.reduce(ranges, axis=0) if len(close) else np.empty(0)
+
+    @classmethod
+    def batch(cls, high, low, close, window=14):
+        return _wilder(cls.true_range(high, low, close), window)
+
+    def _restore(self, high, low, close):
+        true_range = self.true_range(high, low, close)
+        self.prev_close = float(close[-1])
+        self.atr, self.weight, self.count = _ewm_state(true_range, 1.0 / self.window)
+        self.value = self.atr if self.count >= self.window else NAN
+
+
+class RollingMax(Indicator):
+    """
+    滚动最大值：单调递减队列保存(序号, 数值)，队首即窗口内最大值
+
+    缺失值不入队，只记录最近一次缺失的序号，窗口内有缺失时结果为NaN
+    """
+
+    __slots__ = ('window', 'queue', 'index', 'last_missing', 'value')
+
+    sign = 1.0
+
+    def __init__(self, window):
+        self.window = window
+        self.queue = deque()
+        self.index = 0
+        self.last_missing = -1
+        self.value = NAN
+
+    def update(self, close):
+        queue = self.queue
+        if math.isfinite(close):
+            key = self.sign * close
+            while queue and queue[-1][1] <= key:
+                queue.pop()
+            queue.append((self.index, key))
+        else:
+            self.last_missing = self.index
+        if queue and queue[0][0] <= self.index - self.window:
+            queue.popleft()
+        full = self.index + 1 >= self.window and self.last_missing <= self.index - self.window
+        self.index += 1
+        self.value = self.sign * queue[0][1] if full else NAN
+        return self.value
+
+    @classmethod
+    def batch(cls, close, window):
+        windows = _rolling_windows(_finite(close), window)
+        return _pad(windows.max(axis=1) if cls.sign > 0 else windows.min(axis=1), len(close))
+
+    def _restore(self, close):
+        # 只需用最后window个数值重建队列，序号与完整历史保持一致
+        start = max(len(close) - self.window, 0)
+        self.index = start
+        self.queue = deque()
+        self.last_missing = -1
+        for value in close[start:]:
+            self.update(float(value))
+
+
+class RollingMin(RollingMax):
+    """滚动最小值：对取负后的数值维护单调队列"""
+
+    __slots__ = ()
+
+    sign = -1.0
+
+
+class RollingDrawdown(Indicator):
+    """相对滚动最高价的回撤：close / 近window根K线最高收盘价 - 1"""
+
+    __slots__ = ('peak', 'value')
+
+    def __init__(self, window):
+        self.peak = RollingMax(window)
+        self.value = NAN
+
+    def update(self, close):
+        peak = self.peak.update(close)
+        self.value = close / peak - 1
+        return self.value
+
+    @classmethod
+    def batch(cls, close, window):
+        return _finite(close) / RollingMax.batch(close, window) - 1
+
+    def _restore(self, close):
+        self.peak._restore(close)
+        self.value = float(close[-1] / self.peak.value - 1)
+
+
+# 默认指标集：名称 -> (指标类, 参数, 使用的列)
+DEFAULT_INDICATORS = {
+    'sma_20': (SMA, {'window': 20}, ['close']),
+    'std_20': (RollingStd, {'window': 20}, ['close']),
+    'ema_12': (EMA, {'window': 12}, ['close']),
+    'rsi_14': (RSI, {'window': 14}, ['close']),
+    'atr_14': (ATR, {'window': 14}, ['high', 'low', 'close']),
+    'max_60': (RollingMax, {'window': 60}, ['close']),
+    'min_60': (RollingMin, {'window': 60}, ['close']),
+    'drawdown_250': (RollingDrawdown, {'window': 250}, ['close']),
+}
+
+
+class IndicatorSet:
+    """
+    一只股票上的一组指标，追加K线时全部O(1)更新
+
+    参数:
+    specs: dict - 与DEFAULT_INDICATORS格式相同
+    """
+
+    def __init__(self, specs=None):
+        self.specs = specs or DEFAULT_INDICATORS
+        self.indicators = {name: cls(**params) for name, (cls, params, _) in self.specs.items()}
+
+    @classmethod
+    def from_history(cls, bars, specs=None):
+        """
+        用历史K线批量初始化
+
+        参数:
+        bars: dict - {列名: 时间升序数组}，如OHLCVStore.read的结果
+
+        返回:
+        tuple - (IndicatorSet, {指标名称: 历史上的指标值})
+        """
+        indicator_set = cls(specs)
+        history = {}
+        for name, (indicator_cls, params, columns) in indicator_set.specs.items():
+            indicator_set.indicators[name], history[name] = indicator_cls.from_history(
+                *[np.asarray(bars[column], dtype=np.float64) for column in columns], **params)
+        return indicator_set, history
+
+    def append(self, bar):
+        """追加一根K线（{列名: 数值}），返回各指标的最新值"""
+        return {name: self.indicators[name].update(*[bar[column] for column in columns])
+                for name, (_, _, columns) in self.specs.items()}
+
+
+def check_equivalence(bars, split, specs=None, rtol=1e-8):
+    """
+    比较三种计算方式：全量batch、从头逐根update、前split根batch初始化后逐根update
+
+    返回:
+    dict - {指标名称: (从头逐根update的最大相对误差, 初始化后逐根update的最大相对误差)}
+    """
+    specs = specs or DEFAULT_INDICATORS
+    n = len(bars['close'])
+    full = {name: indicator_cls.batch(*[bars[c] for c in columns], **params)
+            for name, (indicator_cls, params, columns) in specs.items()}
+
+    scratch = IndicatorSet(specs)
+    streamed = {name: np.empty(n) for name in specs}
+    for i in range(n):
+        for name, value in scratch.append({column: float(bars[column][i]) for column in bars}).items():
+            streamed[name][i] = value
+
+    head = {column: np.asarray(values[:split]) for column, values in bars.items()}
+    resumed, history = IndicatorSet.from_history(head, specs)
+    for name in specs:
+        history[name] = np.concatenate([history[name], np.empty(n - split)])
+    for i in range(split, n):
+        for name, value in resumed.append({column: float(bars[column][i]) for column in bars}).items():
+            history[name][i] = value
+
+    def max_error(actual, expected):
+        if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+            return np.inf
+        valid = ~np.isnan(expected)
+        scale = np.maximum(np.abs(expected[valid]), 1.0)
+        return float((np.abs(actual[valid] - expected[valid]) / scale).max(initial=0.0))
+
+    report = {name: (max_error(streamed[name], full[name]), max_error(history[name], full[name])) for name in specs}
+    report['ok'] = all(max(errors) <= rtol for errors in report.values())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='滚动指标的增量更新与全量重新计算对比')
+    parser.add_argument('--ts-code', default='000001.SH', help='股票或指数代码，默认为上证指数')
+    parser.add_argument('--append', type=int, default=250, help='批量初始化之后逐根追加的K线数')
+    args = parser.parse_args()
+
+    store = open_store()
+    bars = {column: np.asarray(values, dtype=np.float64)
+            for column, values in store.read(args.ts_code, columns=['high', 'low', 'close']).items()}
+    n = len(bars['close'])
+    split = max(n - args.append, 0)
+
+    report = check_equivalence(bars, split)
+    ok = report.pop('ok')
+    print(f"{args.ts_code}：共{n}根K线，前{split}根批量初始化，其余逐根更新")
+    for name, (scratch_error, resumed_error) in report.items():
+        print(f"  {name:<14}从头逐根更新误差{scratch_error:.2e}  初始化后逐根更新误差{resumed_error:.2e}")
+    print(f"与全量重新计算{'一致' if ok else '不一致'}")
+
+    # 注入缺失值后再比较一次：NaN、inf、连续缺失、只缺最高价，分布在批量初始化和逐根更新两部分
+    gaps = {column: values.copy() for column, values in bars.items()}
+    for column, offsets, value in (('close', (-120, -60, -59, 1, 2, 3), np.nan), ('close', (-1, 40), np.inf),
+                                   ('high', (-90, 20), np.nan)):
+        for offset in offsets:
+            if 0 <= split + offset < n:
+                gaps[column][split + offset] = value
+    report = check_equivalence(gaps, split)
+    ok = report.pop('ok')
+    worst = max(max(errors) for errors in report.values())
+    print(f"注入缺失值后与全量重新计算{'一致' if ok else '不一致'}（最大相对误差{worst:.2e}）")
+
+    # 每追加一根K线：增量更新 vs 在全部历史上重新计算
+    head = {column: values[:split] for column, values in bars.items()}
+    indicator_set, _ = IndicatorSet.from_history(head)
+    start = time.perf_counter()
+    for i in range(split, n):
+        indicator_set.append({column: float(values[i]) for column, values in bars.items()})
+    incremental = (time.perf_counter() - start) / max(n - split, 1)
+    start = time.perf_counter()
+    for i in range(split, min(split + 20, n)):
+        for indicator_cls, params, columns in DEFAULT_INDICATORS.values():
+            indicator_cls.batch(*[bars[column][:i + 1] for column in columns], **params)
+    recompute = (time.perf_counter() - start) / max(min(20, n - split), 1)
+    print(f"每根K线：增量更新{incremental * 1e6:.1f}微秒，全量重新计算{recompute * 1e6:.1f}微秒")